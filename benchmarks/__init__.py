@@ -0,0 +1 @@
+"""性能基准，见 benchmarks/run.py"""
@@ -0,0 +1,85 @@
+"""
+模拟的 Ollama 服务
+实现 /api/chat 的流式接口：从请求的 prompt 中解析文件列表，按文件名关键词分类，
+以与 Ollama 相同的逐行 JSON 格式分块返回，可设置每个请求的模型延迟。
+"""
+
+import re
+import json
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+CATEGORY_KEYWORDS = {
+    "学术论文": ("paper", "thesis", "article"),
+    "调查报告": ("report", "survey"),
+    "专业书籍": ("book", "manual", "handbook"),
+    "政策文件": ("policy", "guideline"),
+    "法规标准": ("standard", "regulation", "law"),
+}
+
+
+def classify(files: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+    """按文件名关键词分类，未命中的文件归入学术论文"""
+    result: Dict[str, List[int]] = {category: [] for category in CATEGORY_KEYWORDS}
+    for item in files:
+        name = item.get("name", "").lower()
+        category = next(
+            (c for c, keywords in CATEGORY_KEYWORDS.items() if any(k in name for k in keywords)),
+            "学术论文"
+        )
+        result[category].append(item["index"])
+    return result
+
+
+class FakeOllama:
+    """在本机随机端口上运行的模拟 Ollama 服务"""
+
+    def __init__(self, latency: float = 0.0, chunk_chars: int = 64):
+        """
+        Args:
+            latency: 每个请求返回前的等待时间（秒），模拟模型推理耗时
+            chunk_chars: 流式返回时每块的字符数
+        """
+        self.latency = latency
+        self.chunk_chars = chunk_chars
+        self.requests = 0
+        self.base_url: Optional[str] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post("/api/chat", self._chat)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _chat(self, request: web.Request) -> web.StreamResponse:
+        self.requests += 1
+        payload = await request.json()
+        prompt = payload["messages"][-1]["content"]
+        match = re.search(r"文件列表如下：\s*(\[[\s\S]*\])", prompt)
+        files = json.loads(match.group(1)) if match else []
+        answer = "```json\n" + json.dumps(classify(files), ensure_ascii=False) + "\n```"
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        model = payload.get("model", "fake")
+        for i in range(0, len(answer), self.chunk_chars):
+            chunk = {"model": model, "message": {"role": "assistant", "content": answer[i:i + self.chunk_chars]}, "done": False}
+            await response.write(json.dumps(chunk, ensure_ascii=False).encode() + b"\n")
+        await response.write(json.dumps({"model": model, "done": True}).encode() + b"\n")
+        await response.write_eof()
+        return response
@@ -0,0 +1,308 @@
+"""
+扫描 → 分类 → 导入流程的性能基准
+    python -m benchmarks.run [--depth 3] [--fanout 4] [--files-per-dir 8] [--pdf-ratio 0.8]
+                             [--repeat 3] [--only scan,classify] [--mongo-uri URI]
+                             [--output PATH] [--compare PREVIOUS.json] [--threshold 0.2]
+
+在临时目录中生成合成目录树，依次测量：
+- scan.partition / scan.collect / scan.collect_pool: 划分扫描单元、单进程和多进程收集文件
+- classify.smart_categorize: 按文件名关键词的本地分类
+- monitor.count_target_files: 目录监听统计文件数量
+- import.parse_pdf_metadata: 解析 PDF 元数据和首页文本
+- pipeline.auto_analysis: 完整的自动分析（扫描、模拟 Ollama 分类、入库、导入论文、提取特征）
+
+完整流程默认使用 mongomock-motor（见 benchmarks/requirements.txt），指定 --mongo-uri 时使用真实的 MongoDB
+（在临时数据库中运行，结束后删除）。结果写入 JSON，--compare 与之前的结果比较，
+中位数耗时增加超过 threshold 的项视为退化，退出码为 1。
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import asyncio
+import logging
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.synthetic_tree import TreeSpec, generate_tree
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+BENCHMARKS = ("scan", "classify", "monitor", "import", "pipeline")
+# 耗时低于该值的基准波动较大，比较时不判定为退化
+NOISE_FLOOR_SECONDS = 0.005
+
+logger = logging.getLogger("benchmarks")
+
+
+def _summary(samples: List[float], items: int) -> Dict[str, Any]:
+    median = statistics.median(samples)
+    return {
+        "repeat": len(samples),
+        "min": round(min(samples), 6),
+        "median": round(median, 6),
+        "mean": round(statistics.mean(samples), 6),
+        "items": items,
+        "items_per_second": round(items / median, 2) if median > 0 else None,
+    }
+
+
+def measure(func: Callable[[], Any], repeat: int, items: Callable[[Any], int]) -> Dict[str, Any]:
+    """重复执行同步函数，返回耗时统计，items 从返回值计算处理的条目数"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - started)
+    return _summary(samples, items(result))
+
+
+def _prepare_env(work_dir: str):
+    """缓存目录指向临时目录，必须在导入 services 之前调用（部分服务在导入时读取配置）"""
+    os.environ["THUMBNAIL_CACHE_DIR"] = os.path.join(work_dir, "cache", "thumbnails")
+    os.environ["TEXT_CACHE_DIR"] = os.path.join(work_dir, "cache", "text")
+    os.environ["MONITOR_INVENTORY_DIR"] = os.path.join(work_dir, "cache", "monitor")
+    # 基准只在单进程中运行，锁和任务进度保存在进程内
+    os.environ["SHARED_STATE_BACKEND"] = "memory"
+    os.environ["SCAN_MODE"] = "local"
+    os.environ["OLLAMA_MODEL"] = "fake"
+    os.environ["DEEPSEEK_API_KEY"] = ""
+
+
+def bench_scan(tree: str, repeat: int) -> Dict[str, Dict[str, Any]]:
+    import multiprocessing
+    from config import config
+    from services.distributed_scan import partition_scan_units, scan_unit, scan_unit_mp
+
+    units = partition_scan_units([tree], config.MAX_SCAN_DEPTH)
+
+    def collect_pool():
+        with multiprocessing.get_context("spawn").Pool(processes=min(config.MAX_CONCURRENT_PROCESSES, os.cpu_count() or 1)) as pool:
+            return [f for files in pool.imap_unordered(scan_unit_mp, units) for f in files]
+
+    return {
+        "scan.partition": measure(lambda: partition_scan_units([tree], config.MAX_SCAN_DEPTH), repeat, len),
+        "scan.collect": measure(lambda: [f for unit in units for f in scan_unit(*unit)], repeat, len),
+        "scan.collect_pool": measure(collect_pool, repeat, len),
+    }
+
+
+def bench_classify(tree: str, repeat: int) -> Dict[str, Dict[str, Any]]:
+    from services.resource_service import ResourceService
+
+    folders = [
+        {"name": os.path.basename(root), "path": root}
+        for root, _, _ in os.walk(tree)
+    ]
+    return {
+        "classify.smart_categorize": measure(
+            lambda: ResourceService._smart_categorize_folders(folders), repeat, lambda _: len(folders)
+        ),
+    }
+
+
+def bench_monitor(tree: str, repeat: int) -> Dict[str, Dict[str, Any]]:
+    from services.directory_monitor_service import DirectoryMonitorService
+
+    return {
+        "monitor.count_target_files": measure(
+            lambda: DirectoryMonitorService._count_target_files_sync(tree), repeat, lambda count: count
+        ),
+    }
+
+
+def bench_import(tree: str, repeat: int, sample: int) -> Dict[str, Dict[str, Any]]:
+    from services.auto_paper_import_service import AutoPaperImportService
+
+    pdfs = sorted(os.path.join(r, f) for r, _, files in os.walk(tree) for f in files if f.endswith(".pdf"))[:sample]
+    return {
+        "import.parse_pdf_metadata": measure(
+            lambda: [AutoPaperImportService.parse_pdf_metadata(path) for path in pdfs], repeat, len
+        ),
+    }
+
+
+async def _init_database(mongo_uri: Optional[str], db_name: str):
+    """初始化 Beanie，返回用于清理的客户端"""
+    from beanie import init_beanie
+    from services.database import DOCUMENT_MODELS
+
+    if mongo_uri:
+        import motor.motor_asyncio
+        client = motor.motor_asyncio.AsyncIOMotorClient(mongo_uri, serverSelectionTimeoutMS=5000)
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        client = AsyncMongoMockClient()
+    await init_beanie(database=client[db_name], document_models=DOCUMENT_MODELS)
+    return client
+
+
+async def bench_pipeline(tree: str, repeat: int, seed: int, mongo_uri: Optional[str], llm_latency: float) -> Dict[str, Dict[str, Any]]:
+    from benchmarks.fake_ollama import FakeOllama
+
+    if not mongo_uri:
+        try:
+            import mongomock_motor  # noqa: F401
+        except ImportError:
+            logger.warning("pipeline.auto_analysis skipped: install benchmarks/requirements.txt or pass --mongo-uri")
+            return {}
+
+    from models.paper import Paper
+    from services.database import Task
+    from services.resource_service import ResourceService
+    from services.pdf_feature_service import pdf_feature_service
+
+    ollama = FakeOllama(latency=llm_latency)
+    os.environ["OLLAMA_BASE_URL"] = await ollama.start()
+    samples = []
+    papers = collected = 0
+    try:
+        for run in range(repeat):
+            db_name = f"benchmark_{os.getpid()}_{run}"
+            client = await _init_database(mongo_uri, db_name)
+            # Ollama 分类时随机抽样，固定随机种子使每轮结果一致
+            random.seed(seed)
+            try:
+                started = time.perf_counter()
+                await ResourceService.auto_analyze_local_directories(base_dir=tree)
+                samples.append(time.perf_counter() - started)
+                papers = await Paper.find({"type": "valid"}).count()
+                task = await Task.find_one(Task.task_type == "auto_resource_analysis")
+                collected = sum(c["count"] for c in task.result["categories"]) if task and task.result else 0
+            finally:
+                if mongo_uri:
+                    await client.drop_database(db_name)
+                    client.close()
+    finally:
+        pdf_feature_service.shutdown()
+        await ollama.stop()
+
+    result = _summary(samples, papers)
+    result.update(papers_imported=papers, files_classified=collected, llm_requests=ollama.requests)
+    return {"pipeline.auto_analysis": result}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any], threshold: float) -> List[str]:
+    """打印与之前结果的对比，返回中位数耗时增加超过 threshold 的基准"""
+    regressions = []
+    print(f"\n{'benchmark':32} {'previous':>10} {'current':>10} {'ratio':>7}")
+    for name, result in current["results"].items():
+        before = previous.get("results", {}).get(name)
+        if not before or not before.get("median"):
+            continue
+        ratio = result["median"] / before["median"]
+        flag = ""
+        if ratio > 1 + threshold and result["median"] >= NOISE_FLOOR_SECONDS:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:32} {before['median']:>10.4f} {result['median']:>10.4f} {ratio:>7.2f}{flag}")
+    return regressions
+
+
+async def run_benchmarks(args: argparse.Namespace, tree: str) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    selected = args.only.split(",") if args.only else BENCHMARKS
+    if "scan" in selected:
+        results.update(bench_scan(tree, args.repeat))
+    if "classify" in selected:
+        results.update(bench_classify(tree, args.repeat))
+    if "monitor" in selected:
+        results.update(bench_monitor(tree, args.repeat))
+    if "import" in selected:
+        results.update(bench_import(tree, args.repeat, args.pdf_sample))
+    if "pipeline" in selected:
+        results.update(await bench_pipeline(tree, args.pipeline_repeat, args.seed, args.mongo_uri, args.llm_latency))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="扫描 → 分类 → 导入流程的性能基准")
+    parser.add_argument("--depth", type=int, default=3, help="目录树深度")
+    parser.add_argument("--fanout", type=int, default=4, help="每个目录的子目录数")
+    parser.add_argument("--files-per-dir", type=int, default=8, help="每个目录的文件数")
+    parser.add_argument("--pdf-ratio", type=float, default=0.8, help="PDF 文件的比例，其余为 JSON")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3, help="各项基准的重复次数")
+    parser.add_argument("--pipeline-repeat", type=int, default=1, help="完整流程的重复次数")
+    parser.add_argument("--pdf-sample", type=int, default=200, help="解析元数据的 PDF 数量")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="模拟 Ollama 每个请求的延迟（秒）")
+    parser.add_argument("--only", help=f"只运行指定的基准，逗号分隔: {','.join(BENCHMARKS)}")
+    parser.add_argument("--mongo-uri", help="使用真实的 MongoDB 运行完整流程，默认使用 mongomock-motor")
+    parser.add_argument("--work-dir", help="合成目录树和缓存的位置，默认使用临时目录并在结束后删除")
+    parser.add_argument("--output", help="结果 JSON 路径，默认 benchmarks/results/<时间>.json")
+    parser.add_argument("--compare", help="与之前的结果 JSON 比较")
+    parser.add_argument("--threshold", type=float, default=0.2, help="中位数耗时增加超过该比例视为退化")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    os.chdir(ROOT_DIR)
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="benchmark_")
+    _prepare_env(work_dir)
+    spec = TreeSpec(args.depth, args.fanout, args.files_per_dir, args.pdf_ratio, args.seed)
+    tree = os.path.join(work_dir, "tree")
+    try:
+        if os.path.exists(tree):
+            shutil.rmtree(tree)
+        started = time.perf_counter()
+        tree_stats = generate_tree(tree, spec)
+        print(f"Generated {tree_stats} in {time.perf_counter() - started:.1f}s")
+
+        results = asyncio.run(run_benchmarks(args, tree))
+        # 部分服务在导入时配置了根日志级别
+        logging.getLogger().setLevel(args.log_level)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "host": socket.gethostname(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "mongo": "uri" if args.mongo_uri else "mongomock",
+        "spec": spec.to_dict(),
+        "tree": tree_stats,
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"\n{'benchmark':32} {'median(s)':>10} {'items':>8} {'items/s':>10}")
+    for name, result in results.items():
+        print(f"{name:32} {result['median']:>10.4f} {result['items']:>8} {result['items_per_second'] or 0:>10.1f}")
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
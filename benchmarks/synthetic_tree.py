@@ -0,0 +1,104 @@
+"""
+合成目录树
+按深度、每层子目录数、每个目录的文件数和 PDF/JSON 比例生成测试目录，
+PDF 是只有一页文字的最小有效文件，文件名带分类关键词，首页文字各不相同（不会被去重）。
+"""
+
+import os
+import json
+import random
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List
+
+# 文件名关键词及其比例，与 ResourceService._smart_categorize_folders 的关键词对应，misc 不命中任何类别
+NAME_KEYWORDS = [("paper", 0.4), ("report", 0.15), ("book", 0.15), ("policy", 0.1), ("standard", 0.1), ("misc", 0.1)]
+
+
+@dataclass
+class TreeSpec:
+    """合成目录树参数"""
+    depth: int = 3
+    fanout: int = 4
+    files_per_dir: int = 8
+    pdf_ratio: float = 0.8
+    seed: int = 42
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def tiny_pdf(title: str, lines: List[str]) -> bytes:
+    """生成一页文字的最小 PDF，带标题元数据"""
+    content = "BT /F1 10 Tf 14 TL 40 760 Td " + " ".join(f"({_escape(line)}) '" for line in lines) + " ET"
+    stream = content.encode("latin-1")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Title (" + _escape(title).encode("latin-1") + b") /Author (Synthetic Author) >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R /Info 6 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def _vocabulary(rng: random.Random, size: int = 3000) -> List[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(4, 10))) for _ in range(size)]
+
+
+def generate_tree(root: str, spec: TreeSpec) -> Dict[str, int]:
+    """
+    在 root 下生成目录树，每个目录（包括中间层）都有 files_per_dir 个文件
+
+    Returns:
+        目录数、PDF 数、JSON 数和总字节数
+    """
+    rng = random.Random(spec.seed)
+    vocabulary = _vocabulary(rng)
+    keywords = [k for k, _ in NAME_KEYWORDS]
+    weights = [w for _, w in NAME_KEYWORDS]
+    stats = {"dirs": 0, "pdf": 0, "json": 0, "bytes": 0}
+    counter = 0
+
+    def fill(directory: str, level: int):
+        nonlocal counter
+        os.makedirs(directory, exist_ok=True)
+        stats["dirs"] += 1
+        for _ in range(spec.files_per_dir):
+            counter += 1
+            keyword = rng.choices(keywords, weights)[0]
+            title = f"{keyword} {' '.join(rng.sample(vocabulary, 4))}"
+            if rng.random() < spec.pdf_ratio:
+                words = rng.sample(vocabulary, 120)
+                data = tiny_pdf(title, [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)])
+                path = os.path.join(directory, f"{keyword}_{counter:06d}.pdf")
+                stats["pdf"] += 1
+            else:
+                data = json.dumps({"title": title, "abstract": " ".join(rng.sample(vocabulary, 40))}).encode()
+                path = os.path.join(directory, f"{keyword}_{counter:06d}.json")
+                stats["json"] += 1
+            with open(path, "wb") as f:
+                f.write(data)
+            stats["bytes"] += len(data)
+        if level < spec.depth:
+            for i in range(spec.fanout):
+                fill(os.path.join(directory, f"d{level + 1}_{i:02d}"), level + 1)
+
+    fill(root, 0)
+    return stats
@@ -44,6 +44,57 @@ class Config:
     def MONITOR_DIRS(self) -> List[str]:
         """监控目录列表（与BASE_PDF_DIRS相同）"""
         return self.BASE_PDF_DIRS
+
+    @property
+    def MONITOR_MODE(self) -> str:
+        """目录监听方式：inotify、polling，或 auto（网络文件系统使用轮询，其余使用 inotify）"""
+        return os.environ.get('MONITOR_MODE', 'auto').lower()
+
+    @property
+    def MONITOR_POLL_INTERVAL(self) -> float:
+        """轮询监听的间隔（秒）"""
+        return float(os.environ.get('MONITOR_POLL_INTERVAL', '30'))
+
+    @property
+    def MONITOR_POLL_WORKERS(self) -> int:
+        """轮询时并行检查一级子目录的线程数"""
+        return int(os.environ.get('MONITOR_POLL_WORKERS', '8'))
+
+    @property
+    def MONITOR_MAX_WATCHES(self) -> int:
+        """可使用的 inotify watch 数量，0 表示按系统上限和 MONITOR_WATCH_BUDGET_RATIO 计算"""
+        return int(os.environ.get('MONITOR_MAX_WATCHES', '0'))
+
+    @property
+    def MONITOR_WATCH_BUDGET_RATIO(self) -> float:
+        """可使用的 inotify watch 占系统上限 fs.inotify.max_user_watches 的比例，其余留给同用户的其他进程"""
+        return float(os.environ.get('MONITOR_WATCH_BUDGET_RATIO', '0.5'))
+
+    @property
+    def MONITOR_INVENTORY_DIR(self) -> str:
+        """监听目录指纹快照的保存目录，启动时据此增量检查而不是重新遍历"""
+        default_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'monitor')
+        return os.environ.get('MONITOR_INVENTORY_DIR', default_dir)
+
+    @property
+    def READINESS_REQUIRE_MONITOR(self) -> bool:
+        """/health/ready 是否要求目录监听启动完成"""
+        return os.environ.get('READINESS_REQUIRE_MONITOR', 'false').lower() in ('1', 'true', 'yes')
+
+    @property
+    def MONITOR_DEBOUNCE_SECONDS(self) -> float:
+        """子目录最后一个文件事件之后静默多少秒才提交变化"""
+        return float(os.environ.get('MONITOR_DEBOUNCE_SECONDS', '2'))
+
+    @property
+    def MONITOR_MAX_DELAY_SECONDS(self) -> float:
+        """持续有文件事件时，变化最多延迟多少秒提交"""
+        return float(os.environ.get('MONITOR_MAX_DELAY_SECONDS', '60'))
+
+    @property
+    def MONITOR_MAX_PENDING_PATHS(self) -> int:
+        """待提交文件路径的数量上限，超出后只记录子目录有变化"""
+        return int(os.environ.get('MONITOR_MAX_PENDING_PATHS', '10000'))
     
     # 数据库配置
     @property
@@ -102,30 +153,170 @@ class Config:
     def SERVER_PORT(self) -> int:
         """服务器端口"""
         return int(os.environ.get('SERVER_PORT', '8001'))
+
+    @property
+    def WORKERS(self) -> int:
+        """生产环境（serve.py）的 worker 进程数"""
+        return int(os.environ.get('WORKERS', str(min(4, os.cpu_count() or 1))))
+
+    @property
+    def WORKER_TIMEOUT(self) -> int:
+        """worker 无响应多少秒后被重启，也是优雅退出的最长等待时间"""
+        return int(os.environ.get('WORKER_TIMEOUT', '120'))
+
+    # 多 worker 共享状态配置
+    @property
+    def SHARED_STATE_BACKEND(self) -> str:
+        """共享状态的存储: mongo（多 worker 共享）或 memory（仅单进程）"""
+        return os.environ.get('SHARED_STATE_BACKEND', 'mongo').lower()
+
+    @property
+    def LEADER_LEASE_SECONDS(self) -> float:
+        """leader 租约时长，leader 失联后最多这么久由其他 worker 接手单例任务"""
+        return float(os.environ.get('LEADER_LEASE_SECONDS', '30'))
+
+    @property
+    def DISTRIBUTED_LOCK_TTL(self) -> float:
+        """耗时任务（自动分析、论文导入、特征提取）分布式锁的有效期，持有者失联后最多这么久其他 worker 可以接手"""
+        return float(os.environ.get('DISTRIBUTED_LOCK_TTL', '60'))
     
     # 日志配置
     @property
     def LOG_LEVEL(self) -> str:
         """日志级别"""
         return os.environ.get('LOG_LEVEL', 'INFO')
+
+    @property
+    def IMPORT_PROFILE(self) -> bool:
+        """启动时在后台分析模块导入耗时并写入日志，用于排查冷启动慢"""
+        return os.environ.get('IMPORT_PROFILE', 'false').lower() in ('1', 'true', 'yes')
     
     # 扫描配置
     @property
     def MAX_SCAN_DEPTH(self) -> int:
         """最大扫描深度"""
         return int(os.environ.get('MAX_SCAN_DEPTH', '2'))
+
+    @property
+    def SCAN_MODE(self) -> str:
+        """
+        自动分析的目录扫描方式：local（本机多进程）或 distributed
+        （目录子树作为工作单元写入 MongoDB，由多台机器上的扫描 worker 认领，见 scan_worker.py）
+        """
+        return os.environ.get('SCAN_MODE', 'local').lower()
+
+    @property
+    def SCAN_LOCAL_WORKERS(self) -> int:
+        """distributed 模式下协调者自身同时扫描的单元数，0 表示只由扫描 worker 扫描"""
+        return int(os.environ.get('SCAN_LOCAL_WORKERS', '4'))
+
+    @property
+    def SCAN_UNIT_LEASE_SECONDS(self) -> float:
+        """扫描单元的认领租约，扫描 worker 失联后最多这么久单元被重新认领"""
+        return float(os.environ.get('SCAN_UNIT_LEASE_SECONDS', '60'))
     
     @property
     def MAX_CONCURRENT_PROCESSES(self) -> int:
         """最大并发进程数"""
         return int(os.environ.get('MAX_CONCURRENT_PROCESSES', '16'))
     
+    @property
+    def FS_IO_THREADS(self) -> int:
+        """文件系统I/O线程池大小"""
+        return int(os.environ.get('FS_IO_THREADS', '8'))
+    
     # 缓存配置
     @property
     def CACHE_DURATION_HOURS(self) -> int:
         """缓存持续时间（小时）"""
         return int(os.environ.get('CACHE_DURATION_HOURS', '1'))
 
+    # 任务进度配置
+    @property
+    def PROGRESS_FLUSH_INTERVAL_MS(self) -> int:
+        """任务进度写入数据库的最小间隔（毫秒），状态变化时立即写入"""
+        return int(os.environ.get('PROGRESS_FLUSH_INTERVAL_MS', '1000'))
+
+    @property
+    def PROGRESS_RELAY_INTERVAL_MS(self) -> int:
+        """多 worker 时进度事件转发给其他 worker 的合并间隔（毫秒）"""
+        return int(os.environ.get('PROGRESS_RELAY_INTERVAL_MS', '200'))
+
+    @property
+    def PROGRESS_RELAY_COLLECTION_MB(self) -> int:
+        """进度转发使用的固定集合大小（MB），写满后覆盖最旧的事件"""
+        return int(os.environ.get('PROGRESS_RELAY_COLLECTION_MB', '16'))
+
+    # PDF 处理配置
+    @property
+    def PDF_EXTRACT_WORKERS(self) -> int:
+        """同时进行的 PDF 文本提取数量上限"""
+        return int(os.environ.get('PDF_EXTRACT_WORKERS', '2'))
+
+    @property
+    def FEATURE_EXTRACT_WORKERS(self) -> int:
+        """PDF 特征提取的进程数，默认等于 CPU 核数"""
+        return int(os.environ.get('FEATURE_EXTRACT_WORKERS', str(os.cpu_count() or 1)))
+
+    @property
+    def THUMBNAIL_CACHE_DIR(self) -> str:
+        """论文缩略图和公式截图的缓存目录"""
+        default_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'thumbnails')
+        return os.environ.get('THUMBNAIL_CACHE_DIR', default_dir)
+
+    @property
+    def THUMBNAIL_CACHE_MAX_MB(self) -> int:
+        """缩略图缓存占用磁盘的上限（MB），超出后按最近使用时间淘汰"""
+        return int(os.environ.get('THUMBNAIL_CACHE_MAX_MB', '512'))
+
+    @property
+    def THUMBNAIL_WIDTH(self) -> int:
+        """论文首页缩略图宽度（像素）"""
+        return int(os.environ.get('THUMBNAIL_WIDTH', '320'))
+
+    @property
+    def ARCHIVE_MAX_CONCURRENT(self) -> int:
+        """同时进行的论文批量打包下载数量上限"""
+        return int(os.environ.get('ARCHIVE_MAX_CONCURRENT', '2'))
+
+    @property
+    def TEXT_CACHE_DIR(self) -> str:
+        """PDF 提取文本的缓存目录"""
+        default_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'text')
+        return os.environ.get('TEXT_CACHE_DIR', default_dir)
+
+    @property
+    def TEXT_CACHE_MAX_MB(self) -> int:
+        """文本缓存占用磁盘的上限（MB），超出后按最近使用时间淘汰"""
+        return int(os.environ.get('TEXT_CACHE_MAX_MB', '1024'))
+
+    @property
+    def TEXT_CACHE_WARM_ON_IMPORT(self) -> bool:
+        """导入论文时是否预先提取文本写入缓存"""
+        return os.environ.get('TEXT_CACHE_WARM_ON_IMPORT', 'false').lower() in ('1', 'true', 'yes')
+
+    # 论文去重配置
+    @property
+    def DEDUP_NUM_PERM(self) -> int:
+        """MinHash 签名长度（哈希函数个数），修改后需要清空已保存的签名"""
+        return int(os.environ.get('DEDUP_NUM_PERM', '128'))
+
+    @property
+    def DEDUP_BANDS(self) -> int:
+        """LSH 分段数，需整除 DEDUP_NUM_PERM；段数越多召回越高、候选越多"""
+        return int(os.environ.get('DEDUP_BANDS', '16'))
+
+    @property
+    def DEDUP_THRESHOLD(self) -> float:
+        """首页文本相似度（Jaccard 估计值）达到该值时视为重复论文"""
+        return float(os.environ.get('DEDUP_THRESHOLD', '0.8'))
+
+    # 导出配置
+    @property
+    def EXPORT_BATCH_SIZE(self) -> int:
+        """流式导出时每批从数据库读取并写出的记录数"""
+        return int(os.environ.get('EXPORT_BATCH_SIZE', '500'))
+
 
 # 创建全局配置实例
 config = Config()
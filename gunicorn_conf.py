@@ -0,0 +1,30 @@
+"""
+gunicorn 配置（生产环境）
+由 serve.py 使用，也可以直接运行: gunicorn -c gunicorn_conf.py main:app
+
+每个 worker 是独立的进程，跨 worker 的运行标记、任务进度和缓存保存在共享状态中（services/shared_state.py），
+目录监听等单例任务由 leader 选举决定在哪个 worker 上运行（services/leader_election.py）。
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import config
+
+bind = f"{config.SERVER_HOST}:{config.SERVER_PORT}"
+workers = config.WORKERS
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# worker 无响应超时后被重启；收到退出信号后最多等待这么久完成请求和清理（释放 leader 租约等）
+timeout = config.WORKER_TIMEOUT
+graceful_timeout = config.WORKER_TIMEOUT
+keepalive = 5
+
+# 每个 worker 各自导入应用：数据库客户端、线程池和事件循环不能在 fork 前创建
+preload_app = False
+
+accesslog = "-"
+errorlog = "-"
+loglevel = config.LOG_LEVEL.lower()
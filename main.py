@@ -1,12 +1,16 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
 import os
 import logging
 import sys
+import asyncio
 from contextlib import asynccontextmanager
+from config import config
 from services.init_services import initialize_services, cleanup_services
 from services.database import init_db
+from services.readiness import readiness
 from routers.data_factory_api import router as data_factory_router
 from routers import processing_db
 # 添加当前目录到Python路径
@@ -24,14 +28,27 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     # 启动时执行
     logger.info("Application startup: initializing services...")
+    readiness.register("database")
     await init_db()
+    readiness.mark_ready("database")
     await initialize_services()
     logger.info("Services initialized successfully")
+    if config.IMPORT_PROFILE:
+        asyncio.create_task(_log_import_profile())
     yield
     # 关闭时执行
     logger.info("Application shutdown: cleaning up resources...")
     await cleanup_services()
 
+async def _log_import_profile():
+    """在子进程中分析模块导入耗时，不影响当前进程"""
+    from utils.import_profiler import profile_imports, format_report
+    try:
+        report = await asyncio.to_thread(profile_imports, "main")
+        logger.info(format_report(report))
+    except Exception as e:
+        logger.error(f"Import profiling failed: {e}")
+
 # 导入路由
 try:
     from routers import analysis
@@ -116,6 +133,47 @@ try:
 except ImportError as e:
     logger.error(f"Failed to import data display modal API router: {e}")
 
+# 导入任务进度推送路由（SSE / WebSocket）
+try:
+    from routers.task_stream import router as task_stream_router
+    app.include_router(task_stream_router)
+    logger.info("Registered task stream router")
+except ImportError as e:
+    logger.error(f"Failed to import task stream router: {e}")
+
+# 导入系统状态路由
+try:
+    from routers.system import router as system_router
+    app.include_router(system_router)
+    logger.info("Registered system router")
+except ImportError as e:
+    logger.error(f"Failed to import system router: {e}")
+
+# 导入数据导出路由
+try:
+    from routers.export import router as export_router
+    app.include_router(export_router)
+    logger.info("Registered export router")
+except ImportError as e:
+    logger.error(f"Failed to import export router: {e}")
+
+# 导入健康检查路由
+try:
+    from routers.health import router as health_router
+    app.include_router(health_router)
+    logger.info("Registered health router")
+except ImportError as e:
+    logger.error(f"Failed to import health router: {e}")
+
+# 导入缩略图路由
+try:
+    from routers.thumbnails import router as thumbnails_router
+    app.include_router(thumbnails_router)
+    logger.info("Registered thumbnails router")
+except ImportError as e:
+    logger.error(f"Failed to import thumbnails router: {e}")
+
+logger.info(f"Application modules imported in {time.perf_counter() - _IMPORT_STARTED:.2f}s")
 
 
 @app.get("/")
@@ -123,6 +181,8 @@ async def root():
     return {"message": "数据工厂 API 服务已启动"}
 
 if __name__ == "__main__":
+    import uvicorn
+
     # 过滤掉uvicorn的一些冗余日志
     logging.getLogger("uvicorn.error").setLevel(logging.ERROR)
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
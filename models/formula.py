@@ -1,6 +1,6 @@
 from beanie import Document
 from pydantic import Field
-from typing import Optional
+from typing import List, Optional
 
 class Formula(Document):
     title: str
@@ -8,6 +8,10 @@ class Formula(Document):
     image: Optional[str]
     timestamp: str
     type: str = Field(default="formula")
+    paper_id: Optional[str] = Field(None, description="来源论文ID")
+    page: Optional[int] = Field(None, description="所在页码，从1开始")
+    bbox: Optional[List[float]] = Field(None, description="页面中的区域坐标 [x0, y0, x1, y1]")
+    content: Optional[str] = Field(None, description="区域中的文本")
 
     class Settings:
         name = "formulas" 
\ No newline at end of file
@@ -1,3 +1,4 @@
+import pymongo
 from beanie import Document
 from pydantic import Field
 from typing import List, Optional
@@ -15,6 +16,24 @@ class Paper(Document):
     topics: List[str] = Field(default_factory=list)
     image: Optional[str]
     type: str = Field(default="valid")
+    pageCount: int = 0
+    feature_fingerprint: Optional[str] = Field(None, description="特征提取时的文件指纹，文件未变化时跳过提取")
+    minhash: Optional[List[int]] = Field(None, description="首页文本的 MinHash 签名，文本过短时为空列表")
+    lsh_bands: List[str] = Field(default_factory=list, description="MinHash 签名的 LSH 桶键，用于查找近似重复")
+    search_title: Optional[str] = Field(None, description="标题分词结果，用于全文检索")
+    search_abstract: Optional[str] = Field(None, description="摘要分词结果，用于全文检索")
 
     class Settings:
-        name = "papers" 
\ No newline at end of file
+        name = "papers"
+        indexes = [
+            pymongo.IndexModel([("lsh_bands", pymongo.ASCENDING)]),
+            pymongo.IndexModel([("file_path", pymongo.ASCENDING)]),
+            # 检索字段已预先分词，不使用语言相关的词干处理
+            pymongo.IndexModel(
+                [("search_title", pymongo.TEXT), ("search_abstract", pymongo.TEXT)],
+                weights={"search_title": 10, "search_abstract": 1},
+                default_language="none",
+                language_override="search_language",
+                name="paper_search_text"
+            )
+        ] 
\ No newline at end of file
@@ -1,3 +1,4 @@
+import pymongo
 from beanie import Document
 from pydantic import Field
 from typing import Optional
@@ -7,6 +8,11 @@ class Trash(Document):
     timestamp: str
     reason: str
     type: str = Field(default="trash")
+    file_path: Optional[str] = None
+    duplicate_of: Optional[str] = Field(None, description="重复数据对应的论文ID")
 
     class Settings:
-        name = "trash" 
\ No newline at end of file
+        name = "trash"
+        indexes = [
+            pymongo.IndexModel([("file_path", pymongo.ASCENDING)])
+        ] 
\ No newline at end of file
@@ -93,8 +93,9 @@ async def get_analysis_output():
         )
 
         result = None
+        is_running = await ResourceService.is_auto_analysis_running()
         analysis_progress = {
-            "is_running": ResourceService._auto_analysis_running,
+            "is_running": is_running,
             "progress": 0,
             "status": "not_started"
         }
@@ -105,11 +106,9 @@ async def get_analysis_output():
             analysis_progress["status"] = task.status
 
         # 只有在没有数据且未运行时才启动分析任务
-        if not result and not ResourceService._auto_analysis_running:
+        if not result and not is_running:
             logger.info("No analysis data found, starting new analysis task")
             asyncio.create_task(ResourceService.auto_analyze_local_directories())
-            await asyncio.sleep(0.1)
-            print("自动分析任务已启动", ResourceService._auto_analysis_running)
 
         return {
             "code": 200,
@@ -130,18 +129,19 @@ async def get_auto_analysis():
         result = await ResourceService.get_auto_analysis_result()
         
         # 获取分析进度
+        is_running = await ResourceService.is_auto_analysis_running()
         analysis_progress = {
-            "is_running": ResourceService._auto_analysis_running,
+            "is_running": is_running,
             "progress": 0
         }
         
-        # 如果有正在运行的任务，获取其进度
-        if ResourceService._auto_analysis_running:
+        # 如果有正在运行的任务，获取其进度（任务可能运行在其他 worker 上）
+        if is_running:
             # 查找与自动分析相关的任务
-            for task_id, task in ResourceService._analysis_tasks.items():
-                if hasattr(task, 'is_auto_analysis') and task.is_auto_analysis:
-                    analysis_progress["progress"] = task.progress
-                    analysis_progress["status"] = task.status
+            for task_id, task in (await ResourceService.get_analysis_tasks()).items():
+                if task.get("is_auto_analysis") and task["status"] not in ("completed", "cancelled"):
+                    analysis_progress["progress"] = task["progress"]
+                    analysis_progress["status"] = task["status"]
                     break
         
         return {
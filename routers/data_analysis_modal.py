@@ -14,6 +14,9 @@ import random
 from datetime import datetime, timedelta
 from enum import Enum
 
+from services.progress_hub import progress_hub
+from services.shared_state import SharedTaskTable
+
 # 配置日志
 logger = logging.getLogger(__name__)
 
@@ -205,11 +208,10 @@ class DataFlowStatus(BaseModel):
 
 # ==================== 全局状态管理 ====================
 
-# 任务存储
-tasks: Dict[str, Dict[str, Any]] = {}
-keyword_extraction_tasks: Dict[str, Dict[str, Any]] = {}
-preprocessing_tasks: Dict[str, Dict[str, Any]] = {}
-classification_tasks: Dict[str, Dict[str, Any]] = {}
+# 任务存储：后台任务在启动它的 worker 中运行，状态快照同步到共享状态，其他 worker 也能查询和停止
+keyword_extraction_tasks = SharedTaskTable("analysis_modal:keyword_extraction")
+preprocessing_tasks = SharedTaskTable("analysis_modal:preprocessing")
+classification_tasks = SharedTaskTable("analysis_modal:classification")
 
 # 数据源到分类类别的映射
 SOURCE_CATEGORY_MAPPING = {
@@ -451,7 +453,17 @@ def map_resource_to_source_type(resource_name: str) -> str:
     # 默认返回 paper 类型
     return "paper"
 
-async def simulate_progress_update(task_id: str, task_dict: Dict[str, Dict[str, Any]],
+def publish_task_progress(task: Dict[str, Any], **extra):
+    """将内存任务的进度推送到进度中心"""
+    progress_hub.publish(task["taskId"], {
+        "task_type": "analysis_modal",
+        "sourceType": task.get("sourceType"),
+        "status": task["status"],
+        "progress": task["progress"],
+        **extra
+    })
+
+async def simulate_progress_update(task_id: str, task_dict: SharedTaskTable,
                                  duration: int = 5, steps: Optional[List[str]] = None):
     """模拟进度更新"""
     if task_id not in task_dict:
@@ -498,6 +510,8 @@ async def simulate_progress_update(task_id: str, task_dict: Dict[str, Dict[str,
 
             task["completedSteps"] = current_step_index + (1 if i == 100 else 0)
 
+        publish_task_progress(task)
+        task_dict.sync(task)
         await asyncio.sleep(duration / 100)
 
     # 完成任务
@@ -513,6 +527,9 @@ async def simulate_progress_update(task_id: str, task_dict: Dict[str, Dict[str,
                 step["progress"] = 100
             task["completedSteps"] = len(steps)
 
+        publish_task_progress(task)
+        task_dict.sync(task)
+
 # ==================== 数据源管理接口 ====================
 
 @router.get("/data-sources")
@@ -651,6 +668,7 @@ async def start_keyword_extraction(request: KeywordExtractionRequest, background
         }
 
         keyword_extraction_tasks[task_id] = task
+        keyword_extraction_tasks.sync(task)
 
         # 启动后台任务
         background_tasks.add_task(simulate_keyword_extraction, task_id, request.sourceType, request.sampleSize)
@@ -668,10 +686,10 @@ async def start_keyword_extraction(request: KeywordExtractionRequest, background
 async def get_keyword_extraction_progress(task_id: str):
     """获取关键词提取进度"""
     try:
-        if task_id not in keyword_extraction_tasks:
+        task = await keyword_extraction_tasks.load(task_id)
+        if task is None:
             raise HTTPException(status_code=404, detail="Task not found")
 
-        task = keyword_extraction_tasks[task_id]
 
         result = KeywordExtractionResult(
             keywords=task["keywords"],
@@ -696,10 +714,10 @@ async def get_keyword_extraction_progress(task_id: str):
 async def get_extracted_keywords(task_id: str):
     """获取提取的关键词结果"""
     try:
-        if task_id not in keyword_extraction_tasks:
+        task = await keyword_extraction_tasks.load(task_id)
+        if task is None:
             raise HTTPException(status_code=404, detail="Task not found")
 
-        task = keyword_extraction_tasks[task_id]
 
         if task["status"] != "completed":
             raise HTTPException(status_code=400, detail="Task not completed yet")
@@ -740,6 +758,8 @@ async def simulate_keyword_extraction(task_id: str, source_type: str, sample_siz
         task["progress"] = int((i + 1) / len(all_keywords) * 100)
         task["confidence"] = round(random.uniform(0.8, 0.95), 3)
 
+        publish_task_progress(task, extractedCount=task["extractedCount"], totalKeywords=task["totalKeywords"])
+        keyword_extraction_tasks.sync(task)
         await asyncio.sleep(0.1)  # 模拟处理时间
 
     # 完成任务
@@ -747,6 +767,8 @@ async def simulate_keyword_extraction(task_id: str, source_type: str, sample_siz
         task["status"] = "completed"
         task["progress"] = 100
         task["endTime"] = datetime.now().isoformat()
+        publish_task_progress(task, extractedCount=task["extractedCount"], totalKeywords=task["totalKeywords"])
+        keyword_extraction_tasks.sync(task)
 
 # ==================== 数据预处理接口 ====================
 
@@ -770,6 +792,7 @@ async def start_preprocessing(request: PreprocessingRequest, background_tasks: B
         }
 
         preprocessing_tasks[task_id] = task
+        preprocessing_tasks.sync(task)
 
         # 启动后台任务
         background_tasks.add_task(simulate_progress_update, task_id, preprocessing_tasks, 8, request.steps)
@@ -787,10 +810,10 @@ async def start_preprocessing(request: PreprocessingRequest, background_tasks: B
 async def get_preprocessing_progress(task_id: str):
     """获取预处理进度"""
     try:
-        if task_id not in preprocessing_tasks:
+        task = await preprocessing_tasks.load(task_id)
+        if task is None:
             raise HTTPException(status_code=404, detail="Task not found")
 
-        task = preprocessing_tasks[task_id]
 
         result = PreprocessResult(
             taskId=task["taskId"],
@@ -820,10 +843,10 @@ async def get_preprocessing_progress(task_id: str):
 async def get_preprocessing_result(task_id: str):
     """获取预处理结果"""
     try:
-        if task_id not in preprocessing_tasks:
+        task = await preprocessing_tasks.load(task_id)
+        if task is None:
             raise HTTPException(status_code=404, detail="Task not found")
 
-        task = preprocessing_tasks[task_id]
 
         if task["status"] != "completed":
             raise HTTPException(status_code=400, detail="Task not completed yet")
@@ -836,6 +859,7 @@ async def get_preprocessing_result(task_id: str):
                 "extractedFeatures": random.randint(50, 200),
                 "qualityScore": round(random.uniform(0.85, 0.98), 3)
             }
+            await preprocessing_tasks.save(task)
 
         result = PreprocessResult(
             taskId=task["taskId"],
@@ -902,6 +926,7 @@ async def start_classification(request: ClassificationRequest, background_tasks:
         }
 
         classification_tasks[task_id] = task
+        classification_tasks.sync(task)
 
         # 启动后台任务
         background_tasks.add_task(simulate_classification_task, task_id, categories)
@@ -919,10 +944,10 @@ async def start_classification(request: ClassificationRequest, background_tasks:
 async def get_classification_progress(task_id: str):
     """获取分类任务进度"""
     try:
-        if task_id not in classification_tasks:
+        task = await classification_tasks.load(task_id)
+        if task is None:
             raise HTTPException(status_code=404, detail="Task not found")
 
-        task = classification_tasks[task_id]
 
         result = ClassificationTask(
             taskId=task["taskId"],
@@ -954,10 +979,10 @@ async def get_classification_progress(task_id: str):
 async def get_classification_result(task_id: str):
     """获取分类结果"""
     try:
-        if task_id not in classification_tasks:
+        task = await classification_tasks.load(task_id)
+        if task is None:
             raise HTTPException(status_code=404, detail="Task not found")
 
-        task = classification_tasks[task_id]
 
         if task["status"] != "completed":
             raise HTTPException(status_code=400, detail="Task not completed yet")
@@ -981,10 +1006,10 @@ async def get_classification_result(task_id: str):
 async def get_classification_metrics(task_id: str):
     """获取分类指标"""
     try:
-        if task_id not in classification_tasks:
+        task = await classification_tasks.load(task_id)
+        if task is None:
             raise HTTPException(status_code=404, detail="Task not found")
 
-        task = classification_tasks[task_id]
 
         if not task.get("metrics"):
             raise HTTPException(status_code=400, detail="Metrics not available yet")
@@ -1039,6 +1064,8 @@ async def simulate_classification_task(task_id: str, categories: List[str]):
         if i > 30:
             task["categoryStats"] = generate_mock_category_stats(categories)
 
+        publish_task_progress(task)
+        classification_tasks.sync(task)
         await asyncio.sleep(0.05)  # 更快的更新频率以实现平滑效果
 
     # 完成任务
@@ -1060,6 +1087,8 @@ async def simulate_classification_task(task_id: str, categories: List[str]):
             "labels": categories,
             "totalSamples": sum(sum(row) for row in matrix)
         }
+        publish_task_progress(task)
+        classification_tasks.sync(task)
 
 # ==================== 混淆矩阵接口 ====================
 
@@ -1067,10 +1096,10 @@ async def simulate_classification_task(task_id: str, categories: List[str]):
 async def get_confusion_matrix_data(task_id: str):
     """获取混淆矩阵数据"""
     try:
-        if task_id not in classification_tasks:
+        task = await classification_tasks.load(task_id)
+        if task is None:
             raise HTTPException(status_code=404, detail="Task not found")
 
-        task = classification_tasks[task_id]
 
         if not task.get("confusionMatrix"):
             raise HTTPException(status_code=400, detail="Confusion matrix not available yet")
@@ -1090,10 +1119,10 @@ async def get_confusion_matrix_data(task_id: str):
 async def generate_confusion_matrix_chart(task_id: str):
     """生成混淆矩阵图表配置"""
     try:
-        if task_id not in classification_tasks:
+        task = await classification_tasks.load(task_id)
+        if task is None:
             raise HTTPException(status_code=404, detail="Task not found")
 
-        task = classification_tasks[task_id]
         confusion_matrix = task.get("confusionMatrix")
 
         if not confusion_matrix:
@@ -1169,11 +1198,11 @@ async def get_category_stats(task_id: str):
     try:
         logger.info(f"Getting category stats for task: {task_id}")
 
-        if task_id not in classification_tasks:
+        task = await classification_tasks.load(task_id)
+        if task is None:
             logger.error(f"Task {task_id} not found in classification_tasks")
             raise HTTPException(status_code=404, detail="Task not found")
 
-        task = classification_tasks[task_id]
         logger.info(f"Task status: {task.get('status')}, progress: {task.get('progress')}")
 
         if not task.get("categoryStats"):
@@ -1196,14 +1225,15 @@ async def get_category_stats(task_id: str):
 async def update_category_stats(request: CategoryStatsUpdateRequest):
     """实时更新分类结果统计"""
     try:
-        if request.taskId not in classification_tasks:
+        task = await classification_tasks.load(request.taskId)
+        if task is None:
             raise HTTPException(status_code=404, detail="Task not found")
 
-        task = classification_tasks[request.taskId]
 
         # 重新生成统计数据
         updated_stats = generate_mock_category_stats(request.categories)
         task["categoryStats"] = updated_stats
+        await classification_tasks.save(task)
 
         return {
             "code": 200,
@@ -1228,7 +1258,7 @@ async def get_real_time_analysis_status():
         processed_samples = 0
 
         for task_dict in [keyword_extraction_tasks, preprocessing_tasks, classification_tasks]:
-            for task in task_dict.values():
+            for task in (await task_dict.snapshot()).values():
                 if task["status"] in ["running", "classifying", "preprocessing"]:
                     running_tasks.append(task)
                     total_samples += 1000  # 假设每个任务处理1000个样本
@@ -1279,11 +1309,15 @@ async def stop_analysis_task(task_id: str):
         task_found = False
 
         for task_dict in [keyword_extraction_tasks, preprocessing_tasks, classification_tasks]:
-            if task_id in task_dict:
-                task = task_dict[task_id]
-                task["status"] = "failed"
-                task["error"] = "Task stopped by user"
-                task["endTime"] = datetime.now().isoformat()
+            # 任务可能运行在其他 worker 上，由运行它的 worker 在下次同步时应用停止状态
+            task = await task_dict.stop(
+                task_id,
+                status="failed",
+                error="Task stopped by user",
+                endTime=datetime.now().isoformat()
+            )
+            if task is not None:
+                publish_task_progress(task, error=task["error"])
                 task_found = True
                 break
 
@@ -1311,9 +1345,9 @@ async def restart_analysis_task(task_id: str, background_tasks: BackgroundTasks)
         task = None
 
         for td in [keyword_extraction_tasks, preprocessing_tasks, classification_tasks]:
-            if task_id in td:
+            task = await td.load(task_id)
+            if task is not None:
                 task_dict = td
-                task = td[task_id]
                 task_found = True
                 break
 
@@ -1331,19 +1365,20 @@ async def restart_analysis_task(task_id: str, background_tasks: BackgroundTasks)
         new_task.pop("error", None)
 
         task_dict[new_task_id] = new_task
+        task_dict.sync(new_task)
 
         # 根据任务类型重启相应的后台任务
-        if task_dict == keyword_extraction_tasks:
+        if task_dict is keyword_extraction_tasks:
             background_tasks.add_task(
                 simulate_keyword_extraction,
                 new_task_id,
                 task["sourceType"],
                 task.get("sampleSize", 1000)
             )
-        elif task_dict == preprocessing_tasks:
+        elif task_dict is preprocessing_tasks:
             steps = [step["name"] for step in task.get("steps", [])]
             background_tasks.add_task(simulate_progress_update, new_task_id, task_dict, 8, steps)
-        elif task_dict == classification_tasks:
+        elif task_dict is classification_tasks:
             categories = task.get("categories", ["robot", "vision"])
             background_tasks.add_task(simulate_classification_task, new_task_id, categories)
 
@@ -1434,10 +1469,10 @@ async def get_analysis_history(page: int = 1, pageSize: int = 10, sourceType: st
 async def generate_analysis_report(task_id: str):
     """生成分析报告"""
     try:
-        if task_id not in classification_tasks:
+        task = await classification_tasks.load(task_id)
+        if task is None:
             raise HTTPException(status_code=404, detail="Task not found")
 
-        task = classification_tasks[task_id]
 
         if task["status"] != "completed":
             raise HTTPException(status_code=400, detail="Task not completed yet")
@@ -1531,10 +1566,10 @@ async def get_analysis_report(report_id: str):
 async def export_analysis_result(request: ExportRequest):
     """导出分析结果"""
     try:
-        if request.taskId not in classification_tasks:
+        task = await classification_tasks.load(request.taskId)
+        if task is None:
             raise HTTPException(status_code=404, detail="Task not found")
 
-        task = classification_tasks[request.taskId]
 
         if task["status"] != "completed":
             raise HTTPException(status_code=400, detail="Task not completed yet")
@@ -1678,7 +1713,7 @@ async def get_data_flow_status():
             (preprocessing_tasks, "数据预处理"),
             (classification_tasks, "智能分类")
         ]:
-            for task in task_dict.values():
+            for task in (await task_dict.snapshot()).values():
                 if task["status"] in ["running", "classifying", "preprocessing"]:
                     current_step = step_name
                     for step in steps:
@@ -1748,9 +1783,9 @@ async def health_check():
             "timestamp": datetime.now().isoformat(),
             "version": "1.0.0",
             "activeTasks": {
-                "keywordExtraction": len(keyword_extraction_tasks),
-                "preprocessing": len(preprocessing_tasks),
-                "classification": len(classification_tasks)
+                "keywordExtraction": len(await keyword_extraction_tasks.snapshot()),
+                "preprocessing": len(await preprocessing_tasks.snapshot()),
+                "classification": len(await classification_tasks.snapshot())
             }
         }
     }
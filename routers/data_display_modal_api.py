@@ -15,6 +15,8 @@ import random
 from datetime import datetime, timedelta
 from enum import Enum
 
+from services.progress_hub import progress_hub
+
 # 配置日志
 logger = logging.getLogger(__name__)
 
@@ -166,6 +168,7 @@ async def simulate_task_progress(task_id: str, task_dict: Dict[str, Dict], durat
             
         task["progress"] = progress
         task["status"] = TaskStatus.RUNNING if progress < 100 else TaskStatus.COMPLETED
+        progress_hub.publish(task_id, {"task_type": "data_update", "status": task["status"].value, "progress": progress})
         
         if progress < 100:
             await asyncio.sleep(duration / 10)
@@ -176,6 +179,7 @@ async def simulate_task_progress(task_id: str, task_dict: Dict[str, Dict], durat
         task["progress"] = 100
         task["endTime"] = datetime.now().isoformat()
         task["duration"] = int((time.time() - start_time) * 1000)
+        progress_hub.publish(task_id, {"task_type": "data_update", "status": task["status"].value, "progress": 100})
 
 # ==================== API接口 ====================
 
@@ -605,6 +609,7 @@ async def simulate_export_task(task_id: str, format: str):
 
             task["progress"] = progress
             task["status"] = ExportStatus.PROCESSING if progress < 100 else ExportStatus.COMPLETED
+            progress_hub.publish(task_id, {"task_type": "data_export", "status": task["status"].value, "progress": progress})
 
             if progress < 100:
                 await asyncio.sleep(1)  # 导出任务稍快一些
@@ -615,6 +620,7 @@ async def simulate_export_task(task_id: str, format: str):
             task["progress"] = 100
             task["endTime"] = datetime.now().isoformat()
             task["duration"] = int((time.time() - start_time) * 1000)
+            progress_hub.publish(task_id, {"task_type": "data_export", "status": task["status"].value, "progress": 100})
             logger.info(f"Export task {task_id} completed successfully")
 
     except Exception as e:
@@ -622,3 +628,4 @@ async def simulate_export_task(task_id: str, format: str):
         if task_id in export_tasks:
             task["status"] = ExportStatus.FAILED
             task["error"] = str(e)
+            progress_hub.publish(task_id, {"task_type": "data_export", "status": task["status"].value, "error": str(e)})
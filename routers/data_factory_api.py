@@ -11,6 +11,7 @@ from pydantic import BaseModel, Field
 from services.resource_service import ResourceService
 # 导入新的服务
 from services.source_analysis_service import SourceAnalysisService
+from services import processing_service
 from services.database import AnalysisResult, AnalyzedFolder, AnalyzedFile, Task # 导入模型用于响应
 
 # 设置日志
@@ -66,9 +67,8 @@ async def stop_crawling_service() -> Dict[str, Any]:
         stopped_tasks = []
 
         # 1. 停止自动分析任务
-        if ResourceService._auto_analysis_running:
+        if await ResourceService.stop_auto_analysis():
             logger.info("Stopping auto analysis task")
-            ResourceService._auto_analysis_running = False
             stopped_tasks.append("auto_analysis")
 
             # 更新数据库中正在运行的自动分析任务状态
@@ -236,8 +236,8 @@ async def get_crawl_results(
 ):
     """获取指定数据源的最新分析结果。"""
     try:
-        # 1. 从服务获取持久化的分析结果
-        analysis_doc: AnalysisResult | None = await SourceAnalysisService.get_analysis_result(sourceType)
+        # 1. 从服务分页获取持久化的分析结果
+        analysis_doc, paged_results, total = await SourceAnalysisService.get_analysis_result_page(sourceType, page, pageSize)
         
         # 2. 检查结果是否存在或是否已完成
         if not analysis_doc or analysis_doc.status != "completed":
@@ -248,14 +248,7 @@ async def get_crawl_results(
                 "data": {"results": [], "total": 0, "status": analysis_doc.status if analysis_doc else 'not_found', "message": status_message}
             }
         
-        # 3. 分页处理
-        result_list: List[AnalyzedFolder] = analysis_doc.results
-        total = len(result_list)
-        start_idx = (page - 1) * pageSize
-        end_idx = start_idx + pageSize
-        paged_results = result_list[start_idx:end_idx]
-        
-        # 4. 格式化为前端需要的格式
+        # 3. 格式化为前端需要的格式
         formatted_results: List[FormattedCrawlResult] = []
         for item in paged_results:
             # 现在 item 是一个 Pydantic 模型，我们可以直接访问属性
@@ -281,19 +274,8 @@ async def get_crawl_results(
 async def get_processing_statistics():
     """获取处理统计数据"""
     try:
-        # 获取自动分析结果，用于统计处理数据
-        analysis_result = await ResourceService.get_auto_analysis_result()
-        
-        # 计算总文件夹数
-        total_folders = sum(item.get("count", 0) for item in analysis_result) if analysis_result else 0
-        
-        # 模拟数据处理统计
-        result = {
-            "validPapers": int(total_folders * 0.7),  # 假设70%是有效论文
-            "formulas": int(total_folders * 0.3),     # 假设30%包含公式
-            "trashData": int(total_folders * 0.1),    # 假设10%是废弃数据
-            "processingRate": 0.85                    # 假设处理率为85%
-        }
+        # 基于数据库中的论文、公式和废弃数据统计
+        result = await processing_service.get_processing_statistics()
         
         return {
             "code": 200,
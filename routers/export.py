@@ -0,0 +1,40 @@
+"""
+数据导出接口
+以流式响应导出分析结果文件夹/文件清单、论文、公式和废弃数据
+"""
+
+import logging
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from services.export_service import ExportService, ExportError, EXPORT_FORMATS
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/export", tags=["数据导出"])
+
+
+@router.get("/{dataset}")
+async def export_dataset(
+    dataset: str,
+    format: str = Query("ndjson", description="导出格式: ndjson, csv, parquet"),
+    sourceType: Optional[str] = Query(None, description="数据源类型，仅对 folders / files 有效")
+):
+    """
+    流式导出数据集: folders（分析结果文件夹）、files（分析结果文件清单）、papers、formulas、trash
+    """
+    try:
+        ExportService.validate(dataset, format)
+    except ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"{dataset}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return StreamingResponse(
+        ExportService.stream(dataset, format, source_type=sourceType),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
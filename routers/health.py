@@ -0,0 +1,34 @@
+"""
+健康检查接口
+- /health/live: 进程存活即返回 200，用于存活探针
+- /health/ready: 必需的启动阶段全部完成才返回 200，否则返回 503，用于就绪探针；
+  同时返回当前 worker 是否为运行单例任务的 leader
+"""
+
+import logging
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from services.readiness import readiness
+from services.leader_election import leader_election
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/health", tags=["健康检查"])
+
+
+@router.get("/live")
+async def liveness():
+    """存活检查"""
+    return {"code": 200, "message": "alive", "data": {"uptime": readiness.get_status()["uptime"]}}
+
+
+@router.get("/ready")
+async def readiness_check():
+    """就绪检查，返回各启动阶段的状态和当前 worker 的角色"""
+    status = readiness.get_status()
+    status["worker"] = await leader_election.get_status()
+    if status["ready"]:
+        return {"code": 200, "message": "ready", "data": status}
+    return JSONResponse(status_code=503, content={"code": 503, "message": "not ready", "data": status})
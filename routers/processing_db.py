@@ -1,8 +1,17 @@
-from fastapi import APIRouter, Query, HTTPException, Path
+from fastapi import APIRouter, Query, HTTPException, Path, Request
 from fastapi.responses import FileResponse, StreamingResponse
 from services import processing_service
 from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field
 from models.paper import Paper
+from services.pdf_text_service import pdf_text_service
+from services.text_cache import text_cache
+from services.paper_archive_service import paper_archive_service, ARCHIVE_FORMATS
+from services.pdf_feature_service import pdf_feature_service
+from services.paper_search_service import paper_search_service
+from services.async_fs import async_fs
+from utils.async_iter import iterate_in_thread
+from utils.http_range import ranged_file_response, content_disposition
 from datetime import datetime, timedelta
 import os
 import json
@@ -21,6 +30,13 @@ def fail(message, code=500):
 
 router = APIRouter(prefix="/processing", tags=["数据处理-DB"])
 
+class BulkDownloadRequest(BaseModel):
+    """批量下载请求"""
+    ids: Optional[List[str]] = Field(None, description="论文ID列表，指定时忽略筛选条件")
+    filters: Optional[Dict[str, Any]] = Field(None, description="筛选条件: type、source、keyword")
+    formats: List[str] = Field(default_factory=lambda: ["pdf"], description="打包格式: pdf、txt、json")
+    limit: int = Field(1000, ge=1, le=10000, description="最多打包的论文数量")
+
 @router.get("/papers/valid")
 async def api_list_valid_papers(page: int = 1, pageSize: int = 10, sortBy: str = "timestamp", sortOrder: str = "desc"):
     """
@@ -36,6 +52,28 @@ async def api_list_valid_papers(page: int = 1, pageSize: int = 10, sortBy: str =
     except Exception as e:
         return fail(str(e))
 
+# 需声明在 /papers/{paper_id} 之前，否则 search 会被当作论文ID
+@router.get("/papers/search")
+async def api_search_papers(
+    q: str = Query(..., min_length=1, description="检索词，支持中英文"),
+    page: int = Query(1, ge=1),
+    pageSize: int = Query(10, ge=1, le=100),
+    source: Optional[str] = Query(None, description="按来源过滤")
+):
+    """
+    按标题和摘要全文检索有效论文，结果按相关度排序。
+    - q: 检索词
+    - page: 页码，从1开始
+    - pageSize: 每页数量
+    """
+    try:
+        filters = {"source": source} if source else None
+        papers, total = await paper_search_service.search(q, page, pageSize, filters)
+        return success({"papers": papers, "total": total, "page": page, "pageSize": pageSize})
+    except Exception as e:
+        logger.error(f"论文检索失败: {e}")
+        return fail(str(e))
+
 @router.get("/papers/{paper_id}")
 async def api_detail_paper(paper_id: str):
     """
@@ -62,6 +100,17 @@ async def api_get_processing_statistics():
     except Exception as e:
         return fail(str(e))
 
+@router.post("/features/extract")
+async def api_extract_features(limit: Optional[int] = Query(None, description="本轮最多处理的论文数量")):
+    """
+    在后台对新增或文件有变化的论文提取字数、图片数和公式，结果可在 /processing/statistics 中查看。
+    """
+    try:
+        pdf_feature_service.start_background(limit)
+        return success({"started": True, "lastRun": pdf_feature_service.last_run})
+    except Exception as e:
+        return fail(str(e))
+
 @router.get("/formulas")
 async def api_list_formulas(page: int = 1, pageSize: int = 10):
     """
@@ -100,8 +149,33 @@ async def get_realtime_stats():
         return success(data)
     except Exception as e:
         return fail(str(e))
+@router.post("/papers/download")
+async def bulk_download_papers(request: BulkDownloadRequest):
+    """
+    批量下载论文，按ID列表或筛选条件选出论文，流式返回 ZIP 压缩包
+    - 每篇论文按 formats 打包 pdf / txt / json
+    - 压缩包中的 manifest.json 记录每篇论文的打包结果
+    """
+    formats = list(dict.fromkeys(request.formats))
+    invalid = [f for f in formats if f not in ARCHIVE_FORMATS]
+    if not formats or invalid:
+        raise HTTPException(status_code=400, detail=f"不支持的文件格式: {', '.join(invalid) or '空'}")
+
+    query = paper_archive_service.build_query(request.ids, request.filters)
+    papers = await paper_archive_service.collect_papers(query, request.limit)
+    if not papers:
+        raise HTTPException(status_code=404, detail="没有符合条件的论文")
+
+    logger.info(f"开始批量打包 {len(papers)} 篇论文, 格式: {formats}")
+    filename = f"papers_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    return StreamingResponse(
+        paper_archive_service.stream(papers, formats),
+        media_type="application/zip",
+        headers={"Content-Disposition": content_disposition(filename)}
+    )
+
 @router.get("/papers/{paper_id}/download")
-async def download_paper(paper_id: str = Path(...), format: Optional[str] = Query("pdf")):
+async def download_paper(request: Request, paper_id: str = Path(...), format: Optional[str] = Query("pdf")):
     """
     下载论文文件
     - paper_id: 论文ID
@@ -136,37 +210,51 @@ async def download_paper(paper_id: str = Path(...), format: Optional[str] = Quer
             if not safe_filename:
                 safe_filename = f"paper_{paper_id}"
             
-            return FileResponse(
-                path=file_path,
+            # 支持 Range 分段下载以及 ETag / Last-Modified 条件请求
+            stat_result = await async_fs.stat(file_path)
+            return ranged_file_response(
+                request,
+                file_path,
+                stat_result,
                 media_type="application/pdf",
-                filename=f"{safe_filename}.pdf",
-                headers={
-                    "Content-Disposition": f"attachment; filename=\"{safe_filename}.pdf\"",
-                    "Content-Type": "application/pdf"
-                }
+                filename=f"{safe_filename}.pdf"
             )
         
         elif format == "txt":
-            # 提取PDF文本内容
             try:
-                import fitz  # PyMuPDF
-                doc = fitz.open(file_path)
-                text_content = ""
-                for page in doc:
-                    text_content += page.get_text()
-                doc.close()
-                
                 # 清理文件名
                 safe_filename = "".join(c for c in paper.title if c.isalnum() or c in (' ', '-', '_')).rstrip()
                 safe_filename = safe_filename[:50] if len(safe_filename) > 50 else safe_filename
                 if not safe_filename:
                     safe_filename = f"paper_{paper_id}"
+                headers = {
+                    "Content-Disposition": content_disposition(f"{safe_filename}.txt"),
+                    "Vary": "Accept-Encoding"
+                }
+                
+                # 命中文本缓存：支持 gzip 的客户端直接发送压缩文件，否则边解压边返回
+                cached_path = await async_fs.run(text_cache.lookup, file_path)
+                if cached_path:
+                    if "gzip" in request.headers.get("accept-encoding", ""):
+                        return FileResponse(
+                            path=cached_path,
+                            media_type="text/plain; charset=utf-8",
+                            headers={**headers, "Content-Encoding": "gzip"}
+                        )
+                    return StreamingResponse(
+                        iterate_in_thread(lambda: text_cache.iter_decompressed(cached_path), async_fs.executor),
+                        media_type="text/plain; charset=utf-8",
+                        headers=headers
+                    )
                 
-                # 返回文本内容
+                # 未命中：在线程池中逐页提取PDF文本，边提取边返回，同时写入缓存
+                text_stream = await pdf_text_service.iter_text_bytes(
+                    file_path, wrap=lambda pages: text_cache.tee(file_path, pages)
+                )
                 return StreamingResponse(
-                    iter([text_content.encode('utf-8')]),
-                    media_type="text/plain",
-                    headers={"Content-Disposition": f"attachment; filename=\"{safe_filename}.txt\""}
+                    text_stream,
+                    media_type="text/plain; charset=utf-8",
+                    headers=headers
                 )
             except Exception as e:
                 logger.error(f"提取PDF文本失败: {e}")
@@ -199,7 +287,7 @@ async def download_paper(paper_id: str = Path(...), format: Optional[str] = Quer
             return StreamingResponse(
                 iter([json_content.encode('utf-8')]),
                 media_type="application/json",
-                headers={"Content-Disposition": f"attachment; filename=\"{safe_filename}.json\""}
+                headers={"Content-Disposition": content_disposition(f"{safe_filename}.json")}
             )
         
         else:
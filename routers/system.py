@@ -0,0 +1,62 @@
+"""
+系统运行状态接口
+"""
+
+import asyncio
+import logging
+
+from fastapi import APIRouter, HTTPException, Query
+
+from services.async_fs import async_fs
+from services.file_metadata import file_metadata
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["系统"])
+
+
+@router.get("/system/metrics/fs")
+async def get_fs_metrics():
+    """获取文件系统线程池排队时间、事件循环阻塞时间和文件元数据缓存命中情况"""
+    try:
+        metrics = async_fs.get_metrics()
+        metrics["metadata_cache"] = file_metadata.get_stats()
+        return {
+            "code": 200,
+            "message": "success",
+            "data": metrics
+        }
+    except Exception as e:
+        logger.error(f"Error getting fs metrics: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/system/metrics/imports")
+async def get_import_metrics(top: int = Query(20, ge=1, le=200)):
+    """分析应用模块的导入耗时（在子进程中执行，耗时数秒）"""
+    from utils.import_profiler import profile_imports
+    try:
+        report = await asyncio.to_thread(profile_imports, "main", top)
+        return {
+            "code": 200,
+            "message": "success",
+            "data": report
+        }
+    except Exception as e:
+        logger.error(f"Error profiling imports: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/system/scan")
+async def get_scan_status():
+    """获取扫描方式和进行中的分布式扫描任务的单元状态"""
+    from services.distributed_scan import scan_coordinator
+    try:
+        return {
+            "code": 200,
+            "message": "success",
+            "data": await scan_coordinator.get_status()
+        }
+    except Exception as e:
+        logger.error(f"Error getting scan status: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,116 @@
+"""
+任务进度推送接口
+通过 Server-Sent Events 或 WebSocket 推送任务进度，替代前端对各个进度接口的轮询。
+其他 worker 上运行的任务的事件经进度转发（services/progress_relay.py）送达，不需要粘性路由；
+订阅数据库中的 Task 时，每次心跳还会读取一次任务状态，保证任务结束后连接一定会关闭。
+"""
+
+import json
+import logging
+from typing import Dict, Any, Optional
+
+from bson import ObjectId
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from services.progress_hub import progress_hub
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["任务进度推送"])
+
+
+async def _task_snapshot(task_id: str) -> Optional[Dict[str, Any]]:
+    """从数据库读取 Task 的当前状态，不是 Task 或不存在时返回 None"""
+    if not ObjectId.is_valid(task_id):
+        return None
+    try:
+        from services.database import Task
+        task = await Task.get(ObjectId(task_id))
+        if not task:
+            return None
+        return {
+            "task_id": task_id,
+            "task_type": task.task_type,
+            "status": task.status,
+            "progress": task.progress,
+            "error": task.error
+        }
+    except Exception as e:
+        logger.warning(f"Failed to load snapshot for task {task_id}: {e}")
+        return None
+
+
+async def _initial_snapshot(task_id: str) -> Optional[Dict[str, Any]]:
+    """进度中心没有快照时，从数据库读取 Task 的当前状态作为初始事件"""
+    if progress_hub.latest(task_id):
+        return None
+    return await _task_snapshot(task_id)
+
+
+def _subscribe(task_id: Optional[str], initial: Optional[Dict[str, Any]]):
+    """订阅进度事件，数据库中的 Task 在心跳时刷新状态"""
+    refresh = (lambda: _task_snapshot(task_id)) if task_id and ObjectId.is_valid(task_id) else None
+    return progress_hub.stream(task_id, initial=initial, refresh=refresh)
+
+
+async def _sse_events(task_id: Optional[str] = None):
+    """将进度事件格式化为 SSE 数据帧"""
+    initial = await _initial_snapshot(task_id) if task_id else None
+    async for event in _subscribe(task_id, initial):
+        if event is None:
+            # 心跳，防止代理断开空闲连接
+            yield ": keep-alive\n\n"
+            continue
+        data = json.dumps(event, ensure_ascii=False, default=str)
+        yield f"id: {event.get('id', '')}\nevent: progress\ndata: {data}\n\n"
+
+
+def _sse_response(task_id: Optional[str] = None) -> StreamingResponse:
+    return StreamingResponse(
+        _sse_events(task_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+@router.get("/tasks/stream")
+async def stream_all_tasks():
+    """以 SSE 推送所有任务的进度事件"""
+    return _sse_response()
+
+
+@router.get("/tasks/{task_id}/stream")
+async def stream_task(task_id: str):
+    """以 SSE 推送单个任务的进度事件，任务结束后自动关闭"""
+    return _sse_response(task_id)
+
+
+async def _websocket_events(websocket: WebSocket, task_id: Optional[str] = None):
+    """将进度事件通过 WebSocket 发送"""
+    await websocket.accept()
+    try:
+        initial = await _initial_snapshot(task_id) if task_id else None
+        async for event in _subscribe(task_id, initial):
+            if event is None:
+                await websocket.send_json({"type": "heartbeat"})
+                continue
+            await websocket.send_text(json.dumps({"type": "progress", "data": event}, ensure_ascii=False, default=str))
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.debug(f"WebSocket client disconnected from task stream: {task_id or 'all'}")
+
+
+@router.websocket("/ws/tasks")
+async def websocket_all_tasks(websocket: WebSocket):
+    """以 WebSocket 推送所有任务的进度事件"""
+    await _websocket_events(websocket)
+
+
+@router.websocket("/ws/tasks/{task_id}")
+async def websocket_task(websocket: WebSocket, task_id: str):
+    """以 WebSocket 推送单个任务的进度事件"""
+    await _websocket_events(websocket, task_id)
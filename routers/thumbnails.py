@@ -0,0 +1,120 @@
+"""
+缩略图接口
+返回论文首页缩略图和公式截图。图片按内容哈希命名，URL 不变则内容不变，可以长期缓存；
+缓存文件被淘汰后在访问时重新渲染，内容变化时更新文档中的 URL 并重定向。
+"""
+
+import asyncio
+import logging
+from typing import Dict, Tuple
+
+from bson import ObjectId
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse, RedirectResponse
+
+from models.paper import Paper
+from models.formula import Formula
+from services.async_fs import async_fs
+from services.thumbnail_service import thumbnail_service, THUMBNAIL_KINDS
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/thumbnails", tags=["缩略图"])
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+# 正在重新渲染的文档，同一文档的并发请求共用一次渲染
+_regenerating: Dict[Tuple[str, str], asyncio.Task] = {}
+
+
+async def _load(kind: str, doc_id: str):
+    """读取缩略图所属的论文或公式"""
+    if not ObjectId.is_valid(doc_id):
+        raise HTTPException(status_code=404, detail="图片不存在")
+    doc = await (Paper if kind == "papers" else Formula).get(doc_id)
+    if not doc or not doc.image:
+        raise HTTPException(status_code=404, detail="图片不存在")
+    return doc
+
+
+async def _regenerate(kind: str, doc) -> str:
+    """
+    重新渲染缩略图，渲染结果变化时更新文档中的图片 URL
+
+    Returns:
+        新的图片文件名
+    """
+    if kind == "papers":
+        if not doc.file_path:
+            raise HTTPException(status_code=404, detail="图片不存在")
+        file_path = doc.file_path
+        page_thumbnail, regions = True, None
+    else:
+        if not doc.paper_id or not doc.page or not doc.bbox:
+            raise HTTPException(status_code=404, detail="图片不存在")
+        paper = await Paper.get(doc.paper_id)
+        if not paper or not paper.file_path:
+            raise HTTPException(status_code=404, detail="图片不存在")
+        file_path = paper.file_path
+        page_thumbnail, regions = False, [(doc.page, doc.bbox)]
+
+    if not await async_fs.exists(file_path):
+        raise HTTPException(status_code=404, detail="论文文件不存在")
+
+    try:
+        result = await thumbnail_service.render(file_path, page_thumbnail=page_thumbnail, regions=regions)
+    except Exception as e:
+        logger.error(f"重新渲染缩略图失败: {kind}/{doc.id}, 错误: {e}")
+        raise HTTPException(status_code=500, detail="渲染缩略图失败")
+
+    name = result["page"] if page_thumbnail else result["regions"][0]
+    if not name:
+        raise HTTPException(status_code=404, detail="图片不存在")
+    url = thumbnail_service.url(kind, str(doc.id), name)
+    if url != doc.image:
+        # 渲染结果变化（如源文件已更新），只更新图片字段，避免覆盖并发的其他修改
+        model = Paper if kind == "papers" else Formula
+        await model.find_one(model.id == doc.id).update({"$set": {"image": url}})
+    return name
+
+
+async def _regenerate_once(kind: str, doc) -> str:
+    """合并同一文档的并发渲染"""
+    key = (kind, str(doc.id))
+    task = _regenerating.get(key)
+    if task is None:
+        task = asyncio.create_task(_regenerate(kind, doc))
+        _regenerating[key] = task
+        task.add_done_callback(lambda _: _regenerating.pop(key, None))
+    # 某个请求断开时不取消其他请求共用的渲染
+    return await asyncio.shield(task)
+
+
+@router.get("/{kind}/{doc_id}/{name}")
+async def get_thumbnail(kind: str, doc_id: str, name: str):
+    """
+    获取缩略图
+    - kind: papers（论文首页缩略图）或 formulas（公式截图）
+    - doc_id: 论文或公式ID
+    - name: 图片文件名（内容哈希）
+    """
+    if kind not in THUMBNAIL_KINDS or not thumbnail_service.is_valid_name(name):
+        raise HTTPException(status_code=404, detail="图片不存在")
+
+    path = await async_fs.run(thumbnail_service.lookup, name)
+    if path is None:
+        doc = await _load(kind, doc_id)
+        if doc.image != thumbnail_service.url(kind, doc_id, name):
+            # 不是文档当前的图片，不渲染，重定向到当前地址
+            return RedirectResponse(doc.image, status_code=307)
+        # 文档当前的图片已被淘汰，重新渲染
+        new_name = await _regenerate_once(kind, doc)
+        if new_name != name:
+            return RedirectResponse(thumbnail_service.url(kind, doc_id, new_name), status_code=307)
+        path = await async_fs.run(thumbnail_service.lookup, name)
+        if path is None:
+            raise HTTPException(status_code=404, detail="图片不存在")
+
+    media_type = "image/webp" if name.endswith(".webp") else "image/png"
+    return FileResponse(path, media_type=media_type, headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL})
@@ -0,0 +1,73 @@
+"""
+分布式扫描 worker
+    python scan_worker.py [--processes N] [--concurrency C]
+
+SCAN_MODE=distributed 时，自动分析把扫描目录划分为工作单元写入 MongoDB，
+在挂载了同一共享目录（路径与 BASE_PDF_DIRS 一致）的机器上运行本脚本即可参与扫描。
+每个进程同时扫描 concurrency 个单元，收到 SIGINT / SIGTERM 后扫描完手头的单元再退出。
+"""
+
+import sys
+import signal
+import asyncio
+import logging
+import argparse
+import multiprocessing
+
+from config import config
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+async def _serve(concurrency: int):
+    from services.database import init_db
+    from services.distributed_scan import ScanWorker
+
+    await init_db()
+    stop = asyncio.Event()
+    if sys.platform != "win32":
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+    try:
+        await ScanWorker(concurrency).run(stop)
+    except asyncio.CancelledError:
+        pass
+
+
+def _run(concurrency: int):
+    try:
+        asyncio.run(_serve(concurrency))
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分布式扫描 worker")
+    parser.add_argument("--processes", type=int, default=1, help="worker 进程数")
+    parser.add_argument("--concurrency", type=int, default=config.SCAN_LOCAL_WORKERS or 4, help="每个进程同时扫描的单元数")
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        _run(args.concurrency)
+        return
+
+    logger.info(f"Starting {args.processes} scan worker processes")
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_run, args=(args.concurrency,)) for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
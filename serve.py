@@ -0,0 +1,54 @@
+"""
+生产环境启动入口
+    python serve.py
+
+启动 WORKERS 个 worker 进程：Linux / macOS 上使用 gunicorn 管理 uvicorn worker（配置见 gunicorn_conf.py），
+未安装 gunicorn 或在 Windows 上时使用 uvicorn 自带的多进程模式。
+开发调试仍使用 python main.py（单进程、自动重载）。
+"""
+
+import os
+import sys
+import logging
+import importlib.util
+
+from config import config
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+    os.chdir(ROOT_DIR)
+    if config.WORKERS > 1 and config.SHARED_STATE_BACKEND == "memory":
+        logger.warning("SHARED_STATE_BACKEND=memory is per-process; use mongo when running multiple workers")
+
+    if sys.platform != "win32" and importlib.util.find_spec("gunicorn") is not None:
+        logger.info(f"Starting gunicorn with {config.WORKERS} workers on {config.SERVER_HOST}:{config.SERVER_PORT}")
+        # 替换当前进程，gunicorn master 直接接收 systemd / 容器发送的信号
+        os.execv(sys.executable, [
+            sys.executable, "-m", "gunicorn",
+            "-c", os.path.join(ROOT_DIR, "gunicorn_conf.py"),
+            "main:app"
+        ])
+
+    import uvicorn
+
+    logger.info(f"gunicorn not available, starting uvicorn with {config.WORKERS} workers")
+    uvicorn.run(
+        "main:app",
+        host=config.SERVER_HOST,
+        port=config.SERVER_PORT,
+        workers=config.WORKERS,
+        timeout_graceful_shutdown=config.WORKER_TIMEOUT,
+        log_level=config.LOG_LEVEL.lower()
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
-import os
-import json
 import logging
 import random
+import uuid
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 from beanie import Document
@@ -23,9 +22,11 @@ class Alert(Document):
 class AlertService:
     """系统告警服务"""
     
-    # 存储告警信息的类变量
-    _alerts = []
     _max_alerts = 10  # 最多保存的告警数量
+
+    # 多个 worker 同时启动时，只由最先获得该键的 worker 生成启动告警
+    _STARTUP_KEY = "alerts:startup"
+    _STARTUP_WINDOW_SECONDS = 300
     
     # 告警类型和对应的阈值
     _thresholds = {
@@ -40,24 +41,14 @@ class AlertService:
     
     @staticmethod
     async def initialize():
-        """初始化服务，加载保存的告警信息"""
+        """初始化服务：告警保存在数据库中，各 worker 共享，启动告警只生成一次"""
         try:
-            alerts_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), 
-                                     "cache", "system_alerts.json")
-            
-            if os.path.exists(alerts_file):
-                with open(alerts_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                if "alerts" in data and isinstance(data["alerts"], list):
-                    AlertService._alerts = data["alerts"]
-                    logger.info(f"Loaded {len(AlertService._alerts)} alerts from {alerts_file}")
-                else:
-                    logger.warning(f"Invalid alerts data in {alerts_file}")
-            else:
-                logger.info("No saved alerts found, will generate on first request")
-                # 初始化时生成一些告警
+            # 动态导入，避免循环依赖
+            from services.shared_state import shared_state, worker_id
+            if await shared_state.acquire(AlertService._STARTUP_KEY, f"{worker_id()}/{uuid.uuid4().hex[:8]}", AlertService._STARTUP_WINDOW_SECONDS):
                 await AlertService._generate_initial_alerts()
+            else:
+                logger.info("Startup alerts already generated by another worker")
         
         except Exception as e:
             logger.error(f"Error initializing alert service: {e}")
@@ -0,0 +1,184 @@
+"""
+异步文件系统服务
+所有阻塞的文件系统操作（os.walk、stat 等）都通过专用的有界线程池执行，避免阻塞事件循环。
+同时统计线程池排队等待时间和事件循环被阻塞的时间。
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class _TimingStats:
+    """耗时统计（线程安全由调用方保证）"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "avg_ms": round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3)
+        }
+
+
+class AsyncFileSystem:
+    """基于有界线程池的异步文件系统门面"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or config.FS_IO_THREADS
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stats_lock = threading.Lock()
+        self._queue_wait = _TimingStats()
+        self._run_time = _TimingStats()
+        self._in_flight = 0
+        self._failed = 0
+
+        # 事件循环阻塞监控
+        self._lag_task: Optional[asyncio.Task] = None
+        self._lag_interval = 0.5
+        self._lag_threshold = 0.1
+        self._loop_lag = _TimingStats()
+        self._loop_blocked_total = 0.0
+        self._loop_stalls = 0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """懒加载线程池"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="async-fs")
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        在文件系统线程池中执行阻塞函数
+
+        Args:
+            func: 同步函数
+            *args, **kwargs: 传递给函数的参数
+
+        Returns:
+            函数返回值
+        """
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+        with self._stats_lock:
+            self._in_flight += 1
+
+        def call():
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                with self._stats_lock:
+                    self._failed += 1
+                raise
+            finally:
+                finished = time.perf_counter()
+                with self._stats_lock:
+                    self._queue_wait.add(started - submitted)
+                    self._run_time.add(finished - started)
+                    self._in_flight -= 1
+
+        return await loop.run_in_executor(self.executor, call)
+
+    # ---------- 常用文件系统操作 ----------
+
+    async def exists(self, path: str) -> bool:
+        return await self.run(os.path.exists, path)
+
+    async def stat(self, path: str) -> os.stat_result:
+        return await self.run(os.stat, path)
+
+    async def listdir(self, path: str) -> List[str]:
+        return await self.run(os.listdir, path)
+
+    async def walk(self, top: str) -> List[Tuple[str, List[str], List[str]]]:
+        """在线程池中完整执行 os.walk，返回所有 (root, dirs, files)"""
+        return await self.run(lambda: list(os.walk(top)))
+
+    # ---------- 事件循环阻塞监控 ----------
+
+    async def start_loop_monitor(self, interval: float = 0.5, threshold: float = 0.1):
+        """
+        启动事件循环延迟监控：定时 sleep，实际唤醒时间与预期的差值即事件循环被阻塞的时间
+
+        Args:
+            interval: 采样间隔(秒)
+            threshold: 超过该延迟(秒)记为一次阻塞
+        """
+        if self._lag_task is not None:
+            return
+        self._lag_interval = interval
+        self._lag_threshold = threshold
+        self._lag_task = asyncio.create_task(self._monitor_loop_lag())
+
+    async def _monitor_loop_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self._lag_interval
+            await asyncio.sleep(self._lag_interval)
+            lag = max(0.0, loop.time() - expected)
+            self._loop_lag.add(lag)
+            if lag >= self._lag_threshold:
+                self._loop_stalls += 1
+                self._loop_blocked_total += lag
+                logger.debug(f"Event loop blocked for {lag * 1000:.1f} ms")
+
+    async def stop_loop_monitor(self):
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            try:
+                await self._lag_task
+            except asyncio.CancelledError:
+                pass
+            self._lag_task = None
+
+    def shutdown(self):
+        """关闭线程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取线程池与事件循环的统计信息"""
+        with self._stats_lock:
+            pool = {
+                "max_workers": self.max_workers,
+                "in_flight": self._in_flight,
+                "failed": self._failed,
+                "queue_wait": self._queue_wait.to_dict(),
+                "run_time": self._run_time.to_dict()
+            }
+        return {
+            "thread_pool": pool,
+            "event_loop": {
+                "monitoring": self._lag_task is not None,
+                "sample_interval_ms": int(self._lag_interval * 1000),
+                "stall_threshold_ms": int(self._lag_threshold * 1000),
+                "lag": self._loop_lag.to_dict(),
+                "stalls": self._loop_stalls,
+                "blocked_total_ms": round(self._loop_blocked_total * 1000, 3)
+            }
+        }
+
+
+# 全局异步文件系统实例
+async_fs = AsyncFileSystem()
@@ -4,18 +4,38 @@ from models.paper import Paper
 from datetime import datetime
 from bson import ObjectId
 import logging
-import fitz  # PyMuPDF
 from models.paper import Paper
+from services.async_fs import async_fs
+from services.text_cache import text_cache
+from services.paper_dedup_service import paper_dedup_service
+from services.paper_search_service import search_fields
+from services.distributed_lock import DistributedLock, LockHandle
+from config import config
 logger = logging.getLogger(__name__)
 
 class AutoPaperImportService:
+    # 论文导入的分布式锁，同一时间所有 worker 中只运行一次导入
+    _import_lock = DistributedLock("paper_import")
+
     @staticmethod
     async def import_valid_papers_from_auto_analysis():
         """
         1. 调用 get_auto_analysis_result 获取分类数据
         2. 解析分类结果中的论文类文件，提取元数据
         3. 存入 Paper 表，type=valid
+        其他 worker 正在导入时直接返回 0
         """
+        lock = await AutoPaperImportService._import_lock.acquire()
+        if lock is None:
+            logger.info("论文导入正在其他 worker 上运行，跳过本次导入。")
+            return 0
+        try:
+            return await AutoPaperImportService._import_valid_papers(lock)
+        finally:
+            await lock.release()
+
+    @staticmethod
+    async def _import_valid_papers(lock: LockHandle) -> int:
         # 1. 获取自动分析分类结果
         from services.resource_service import ResourceService
         categories = await ResourceService.get_auto_analysis_result()
@@ -34,20 +54,37 @@ class AutoPaperImportService:
             logger.info("未找到论文类别或无论文文件。"); return 0
 
         paper_files = paper_category["files"]
-        
+
+        # 升级前导入的论文没有签名，先补算以便参与去重
+        await paper_dedup_service.backfill()
+
         imported_count = 0
+        duplicate_count = 0
         for file_info in paper_files:
+            # 锁已被撤销或过期后由新的持有者继续导入，避免两边同时写入
+            if lock.lost:
+                logger.warning("论文导入锁已失效，停止导入。")
+                break
             file_path = file_info.get("path")
             
-            if not file_path or not os.path.exists(file_path) or not file_path.lower().endswith('.pdf'):
+            if not file_path or not file_path.lower().endswith('.pdf') or not await async_fs.exists(file_path):
                 continue
-            metadata = AutoPaperImportService.parse_pdf_metadata(file_path)
-            print('metadata',metadata)
+            # 已导入或已判定为重复的文件不再处理
+            if await paper_dedup_service.is_known_file(file_path):
+                continue
+            metadata = await async_fs.run(AutoPaperImportService.parse_pdf_metadata, file_path)
             if not metadata:
                 continue
-            # 检查是否已存在同名论文
-            exists = await Paper.find_one({"title": metadata["title"], "type": "valid"})
-            if exists:
+            # 按首页文本的 MinHash 签名查找近似重复的论文
+            signature, bands = await async_fs.run(paper_dedup_service.signature, metadata.pop("first_page_text", ""))
+            if signature is not None:
+                duplicate = await paper_dedup_service.find_duplicate(signature, bands)
+                if duplicate:
+                    await paper_dedup_service.move_to_trash(metadata["title"], file_path, *duplicate)
+                    duplicate_count += 1
+                    continue
+            # 首页没有可用文本（如扫描件）时退回到同名检查
+            elif await Paper.find_one({"title": metadata["title"], "type": "valid"}):
                 continue
             # 构造Paper对象并保存
             paper = Paper(
@@ -62,31 +99,43 @@ class AutoPaperImportService:
                 imageCount=0,       # 同上
                 formulaCount=0,     # 同上
                 topics=[],          # 可以根据实际情况提取，否则传空列表
-                image=None  
+                image=None,
+                minhash=signature or [],
+                lsh_bands=bands,
+                **search_fields(metadata["title"], metadata.get("abstract", ""))
             )
             await paper.save()
             imported_count += 1
-        logger.info(f"成功导入 {imported_count} 篇有效论文。")
+            # 预先提取文本写入缓存，首次下载即可直接返回
+            if config.TEXT_CACHE_WARM_ON_IMPORT:
+                try:
+                    await text_cache.warm(file_path)
+                except Exception as e:
+                    logger.warning(f"预生成文本缓存失败: {file_path}, 错误: {e}")
+        logger.info(f"成功导入 {imported_count} 篇有效论文，{duplicate_count} 篇重复论文移入废弃数据。")
         return imported_count
 
     @staticmethod
     def parse_pdf_metadata(file_path: str) -> Dict[str, Any]:
         """
-        用 PyMuPDF 解析PDF文件，提取元数据（标题、作者、摘要）。
+        用 PyMuPDF 解析PDF文件，提取元数据（标题、作者、摘要）和首页文本（用于去重）。
         """
+        import fitz  # PyMuPDF，按需加载
+
         try:
             doc = fitz.open(file_path)
             meta = doc.metadata or {}
             # 尝试获取首页文本作为摘要
-            abstract = ""
+            first_page_text = ""
             if doc.page_count > 0:
-                first_page = doc.load_page(0)
-                abstract = first_page.get_text().strip().replace('\n', ' ')[:500]  # 取前500字
+                first_page_text = doc.load_page(0).get_text().strip()
+            abstract = first_page_text.replace('\n', ' ')[:500]  # 取前500字
             return {
                 "title": meta.get("title") or os.path.splitext(os.path.basename(file_path))[0],
                 "authors": [meta.get("author")] if meta.get("author") else [],
                 "abstract": abstract,
-                "source": "auto_import"
+                "source": "auto_import",
+                "first_page_text": first_page_text
             }
         except Exception as e:
             logger.error(f"解析PDF失败: {file_path}, 错误: {e}")
@@ -94,5 +143,18 @@ class AutoPaperImportService:
                 "title": os.path.splitext(os.path.basename(file_path))[0],
                 "authors": [],
                 "abstract": "",
-                "source": "auto_import"
-            } 
\ No newline at end of file
+                "source": "auto_import",
+                "first_page_text": ""
+            }
+
+    @staticmethod
+    def first_page_text(file_path: str) -> str:
+        """提取PDF首页文本，失败时返回空字符串"""
+        import fitz  # PyMuPDF，按需加载
+
+        try:
+            with fitz.open(file_path) as doc:
+                return doc.load_page(0).get_text().strip() if doc.page_count > 0 else ""
+        except Exception as e:
+            logger.warning(f"提取首页文本失败: {file_path}, 错误: {e}")
+            return "" 
\ No newline at end of file
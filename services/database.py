@@ -1,4 +1,5 @@
 import motor.motor_asyncio
+import pymongo
 from beanie import init_beanie, Document
 from pydantic import Field, BaseModel
 from typing import List, Dict, Any
@@ -6,6 +7,8 @@ from datetime import datetime
 import logging
 from services.alert_service import Alert
 from models.paper import Paper
+from models.formula import Formula
+from models.trash import Trash
 logger = logging.getLogger(__name__)
 
 # --- 1. 数据模型定义 (Models) ---
@@ -53,12 +56,36 @@ class AnalysisResult(Document):
     source_type: str = Field(..., description="分析的数据源类型", index=True, unique=True)
     timestamp: datetime = Field(..., description="分析完成的时间戳")
     analyzed_folders_count: int = Field(..., description="成功分析的文件夹数量")
-    results: List[AnalyzedFolder] = Field(..., description="详细分析结果列表")
+    results: List[AnalyzedFolder] = Field(default_factory=list, description="详细分析结果列表（旧版内嵌存储，新结果保存在 AnalysisResultFolder 中）")
     status: str = Field(default="pending", description="任务状态: pending, running, completed, failed")
+    run_id: str | None = Field(None, description="当前生效的分析批次ID，对应 AnalysisResultFolder.run_id")
+    run_started_at: datetime | None = Field(None, description="当前生效批次的开始时间，只有更晚开始的批次才能替换它")
 
     class Settings:
         name = "analysis_results"
 
+class AnalysisResultFolder(Document):
+    """
+    分析结果中的单个文件夹，每个文件夹一个文档，避免整个结果超过 MongoDB 16MB 的文档上限。
+    通过 (source_type, run_id, order) 索引分页查询。
+    """
+    source_type: str = Field(..., description="分析的数据源类型")
+    run_id: str = Field(..., description="所属分析批次ID")
+    order: int = Field(..., description="文件夹在结果中的序号，从0开始")
+    run_started_at: datetime | None = Field(None, description="所属分析批次的开始时间")
+    folder_name: str
+    folder_path: str
+    file_count: int
+    files: List[AnalyzedFile]
+
+    class Settings:
+        name = "analysis_result_folders"
+        indexes = [
+            pymongo.IndexModel(
+                [("source_type", pymongo.ASCENDING), ("run_id", pymongo.ASCENDING), ("order", pymongo.ASCENDING)]
+            )
+        ]
+
 class Task(Document):
     """
     统一任务管理模型，用于跟踪所有后台任务的状态。
@@ -71,10 +98,99 @@ class Task(Document):
     result: Dict[str, Any] | None = None
     error: str | None = None
     related_id: str | None = Field(None, description="关联的ID (e.g., source_type for analysis)", index=True)
+    fencing_token: int | None = Field(None, description="写入结果时持有的分布式锁 token，用于拒绝过期持有者的写入")
 
     class Settings:
         name = "tasks"
 
+class DirectoryInventory(Document):
+    """
+    监听目录的清单，启动时直接恢复文件数量，不必重新遍历目录。
+    完整的目录指纹树较大，以压缩快照文件保存在 MONITOR_INVENTORY_DIR，这里只记录其指纹用于校验。
+    """
+    base_dir: str = Field(..., description="监听目录", index=True, unique=True)
+    file_count: int = Field(0, description="目标文件（PDF/JSON）数量")
+    directory_count: int = Field(0, description="子目录数量（含自身）")
+    fingerprint: str | None = Field(None, description="目录指纹树根节点摘要，与快照文件对应")
+    mode: str | None = Field(None, description="监听方式: inotify, polling, hybrid")
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+    class Settings:
+        name = "directory_inventory"
+
+class SharedStateEntry(Document):
+    """
+    多个 worker 共享的状态（运行标记、任务进度快照、缓存）和租约，
+    键即文档 _id，带过期时间的键由 TTL 索引清理。
+    """
+    id: str
+    value: Any = None
+    owner: str | None = Field(None, description="租约持有者（worker 标识）")
+    expires_at: datetime | None = Field(None, description="过期时间（UTC），为空表示不过期")
+    updated_at: datetime | None = None
+
+    class Settings:
+        name = "shared_state"
+        indexes = [
+            pymongo.IndexModel([("expires_at", pymongo.ASCENDING)], expireAfterSeconds=0)
+        ]
+
+class DistributedLockEntry(Document):
+    """
+    分布式锁，锁名即文档 _id。
+    token 每次获取锁时递增，释放时只清空持有者，文档保留以保证 token 单调，因此不设 TTL 索引。
+    """
+    id: str
+    owner: str | None = Field(None, description="持有者（worker 标识），为空表示空闲")
+    token: int = Field(0, description="fencing token")
+    expires_at: datetime | None = Field(None, description="锁过期时间（UTC）")
+    acquired_at: datetime | None = None
+
+    class Settings:
+        name = "distributed_locks"
+
+class ScanUnit(Document):
+    """
+    分布式扫描的工作单元：一个目录，recursive 为 True 时包括整棵子树。
+    扫描 worker 认领后在 lease_expires 之前持续续期，worker 失联后租约过期，单元由其他 worker 重新认领（attempt 加一）。
+    """
+    job_id: str = Field(..., description="所属的扫描任务")
+    path: str = Field(..., description="目录路径，所有扫描节点需以相同路径挂载")
+    recursive: bool = Field(True, description="是否扫描整棵子树，否则只扫描目录自身的文件")
+    status: str = Field(default="pending", description="状态: pending, claimed, done, failed")
+    claimed_by: str | None = Field(None, description="认领的扫描 worker")
+    attempt: int = Field(0, description="认领次数，结果按最后一次认领读取")
+    lease_expires: datetime | None = Field(None, description="认领租约过期时间（UTC）")
+    file_count: int = 0
+    seconds: float | None = Field(None, description="扫描耗时（秒）")
+    error: str | None = None
+    created_at: datetime = Field(default_factory=datetime.now)
+    finished_at: datetime | None = None
+
+    class Settings:
+        name = "scan_units"
+        indexes = [
+            pymongo.IndexModel([("job_id", pymongo.ASCENDING), ("status", pymongo.ASCENDING)]),
+            pymongo.IndexModel([("status", pymongo.ASCENDING), ("lease_expires", pymongo.ASCENDING)]),
+            # 协调者异常退出时遗留的单元一周后清理
+            pymongo.IndexModel([("created_at", pymongo.ASCENDING)], expireAfterSeconds=7 * 24 * 3600)
+        ]
+
+class ScanResultChunk(Document):
+    """扫描单元的结果（文件路径），按批保存，避免单个文档超过大小限制"""
+    job_id: str
+    unit_id: str
+    attempt: int = Field(..., description="写入结果时的认领次数，与 ScanUnit.attempt 一致时有效")
+    files: List[str] = Field(default_factory=list)
+    created_at: datetime = Field(default_factory=datetime.now)
+
+    class Settings:
+        name = "scan_results"
+        indexes = [
+            pymongo.IndexModel([("job_id", pymongo.ASCENDING), ("unit_id", pymongo.ASCENDING)]),
+            pymongo.IndexModel([("created_at", pymongo.ASCENDING)], expireAfterSeconds=7 * 24 * 3600)
+        ]
+
 # --- 2. 数据库客户端初始化 ---
 # 数据库连接配置
 
@@ -92,6 +208,23 @@ client = motor.motor_asyncio.AsyncIOMotorClient(
     serverSelectionTimeoutMS=5000
 )
 
+# 所有需要映射的Document模型
+DOCUMENT_MODELS = [
+    DataSource,
+    AnalysisResult,
+    AnalysisResultFolder,
+    Task,
+    Alert,
+    Paper,
+    Formula,
+    Trash,
+    DirectoryInventory,
+    SharedStateEntry,
+    DistributedLockEntry,
+    ScanUnit,
+    ScanResultChunk
+]
+
 # --- 3. 数据库初始化函数 ---
 async def init_db():
     """
@@ -104,16 +237,7 @@ async def init_db():
         database = client[DB_NAME]
 
         # 初始化Beanie，传入数据库实例和所有需要映射的Document模型
-        await init_beanie(
-            database=database,
-            document_models=[
-                DataSource,
-                AnalysisResult,
-                Task,
-                Alert,
-                Paper
-            ]
-        )
+        await init_beanie(database=database, document_models=DOCUMENT_MODELS)
         logger.info("Successfully connected to MongoDB and initialized Beanie!")
     except Exception as e:
         logger.error(f"Failed to connect to MongoDB: {e}")
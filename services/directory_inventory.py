@@ -0,0 +1,101 @@
+"""
+监听目录清单的持久化
+文件数量等摘要保存在 DirectoryInventory 集合，目录指纹树以 gzip 压缩的 JSON 快照保存在本地磁盘。
+启动时先恢复文件数量，再基于快照增量检查（只重新列出修改时间变化的目录），
+停机期间发生的变化也能被发现。
+"""
+
+import os
+import gzip
+import json
+import asyncio
+import hashlib
+import logging
+import tempfile
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from config import config
+from services.database import DirectoryInventory
+from services.directory_poller import DirNode
+
+logger = logging.getLogger(__name__)
+
+
+class DirectoryInventoryStore:
+    """监听目录清单的读写"""
+
+    def __init__(self, snapshot_dir: Optional[str] = None):
+        self.snapshot_dir = snapshot_dir or config.MONITOR_INVENTORY_DIR
+        # 已保存快照的指纹，未变化时不重复写入
+        self._saved: Dict[str, str] = {}
+
+    def _snapshot_path(self, base_dir: str) -> str:
+        key = hashlib.sha1(os.path.abspath(base_dir).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.snapshot_dir, f"{key}.json.gz")
+
+    def _read_snapshot(self, base_dir: str, fingerprint: str) -> Optional[DirNode]:
+        """读取快照，与清单中的指纹不一致时视为无效（同步实现）"""
+        path = self._snapshot_path(base_dir)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.info(f"No usable inventory snapshot for {base_dir}: {e}")
+            return None
+        if data.get("base_dir") != base_dir or data.get("fingerprint") != fingerprint:
+            logger.info(f"Inventory snapshot for {base_dir} is out of date, ignoring")
+            return None
+        return DirNode.from_list(data["tree"])
+
+    def _write_snapshot(self, base_dir: str, tree: DirNode):
+        """原子写入快照（同步实现）"""
+        path = self._snapshot_path(base_dir)
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.snapshot_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as gz:
+                gz.write(json.dumps(
+                    {"base_dir": base_dir, "fingerprint": tree.digest, "tree": tree.to_list()},
+                    separators=(",", ":")
+                ).encode("utf-8"))
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    async def load(self, base_dir: str) -> Tuple[Optional[DirectoryInventory], Optional[DirNode]]:
+        """
+        读取目录清单
+
+        Returns:
+            (清单文档, 目录指纹树)，不存在或快照无效时对应项为 None
+        """
+        doc = await DirectoryInventory.find_one(DirectoryInventory.base_dir == base_dir)
+        if doc is None or not doc.fingerprint:
+            return doc, None
+        tree = await asyncio.to_thread(self._read_snapshot, base_dir, doc.fingerprint)
+        if tree is not None:
+            self._saved[base_dir] = tree.digest
+        return doc, tree
+
+    async def save(self, base_dir: str, file_count: int, mode: Optional[str], tree: Optional[DirNode] = None):
+        """保存目录清单，指纹树变化时同时更新快照"""
+        update = {
+            "file_count": file_count,
+            "mode": mode,
+            "updated_at": datetime.now()
+        }
+        if tree is not None:
+            if self._saved.get(base_dir) != tree.digest:
+                await asyncio.to_thread(self._write_snapshot, base_dir, tree)
+                self._saved[base_dir] = tree.digest
+            update["fingerprint"] = tree.digest
+            update["directory_count"] = tree.total_dirs()
+        await DirectoryInventory.get_motor_collection().update_one(
+            {"base_dir": base_dir}, {"$set": update}, upsert=True
+        )
+
+
+# 全局目录清单实例
+directory_inventory = DirectoryInventoryStore()
@@ -1,19 +1,28 @@
 """
 目录监听服务
-监听指定目录的文件变化，当PDF和JSON文件数量发生变化时自动触发资源分析
+监听指定目录中PDF和JSON文件的变化，事件按子目录合并防抖后自动触发资源分析。
+本地目录使用 inotify（watchdog），网络挂载目录收不到 inotify 事件，改为按目录指纹轮询；
+目录数量超过 inotify watch 预算时，热子树使用 inotify，冷子树轮询。
+启动时从持久化的目录清单恢复文件数量和目录指纹，只增量检查变化的目录。
 """
 
 import os
+import errno
 import asyncio
 import logging
 import time
-from typing import Dict, Set, Optional
+from typing import Dict, List, Set, Optional, Tuple
 from datetime import datetime, timedelta
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from pathlib import Path
 # 导入配置
 from config import config
+from services.async_fs import async_fs
+from services.event_coalescer import EventCoalescer, EventBatch
+from services.directory_poller import DirectoryPoller, detect_fs_type, is_network_fs
+from services.inotify_budget import watch_budget, plan_hot_subtrees
+from services.directory_inventory import directory_inventory
 
 logger = logging.getLogger(__name__)
 
@@ -25,9 +34,30 @@ class DirectoryMonitorService:
         self.file_counts: Dict[str, int] = {}
         self.last_analysis_time: Dict[str, datetime] = {}
         self.analysis_cooldown = timedelta(minutes=5)  # 分析冷却时间，避免频繁触发
+        self.analysis_retry_delay = 30.0  # 已有分析在运行时，延后重试的时间（秒）
         self.is_running = False
         self.monitored_directories: Set[str] = set()
         self.main_loop = None  # 保存主事件循环引用
+        # 按子目录合并文件事件，静默一段时间后再提交
+        self.coalescer = EventCoalescer(
+            self._handle_event_batch,
+            quiet_period=config.MONITOR_DEBOUNCE_SECONDS,
+            max_delay=config.MONITOR_MAX_DELAY_SECONDS,
+            max_pending_paths=config.MONITOR_MAX_PENDING_PATHS
+        )
+        # 冷却期内或分析运行中发生的变化，到期后再处理
+        self.deferred_analysis: Dict[str, asyncio.TimerHandle] = {}
+        # 每个目录的监听方式：inotify / polling / hybrid
+        self.monitor_modes: Dict[str, str] = {}
+        self.pollers: Dict[str, DirectoryPoller] = {}
+        self.poll_tasks: Dict[str, asyncio.Task] = {}
+        # inotify watch 预算：系统上限和本服务可用数量，以及每个目录占用的数量
+        self.max_user_watches, self.watch_budget = watch_budget()
+        self.watch_usage: Dict[str, int] = {}
+        # 混合模式下使用 inotify 的热子树
+        self.hot_subtrees: Dict[str, List[str]] = {}
+        # 每个目录的启动阶段：pending / restored / ready / failed
+        self.bootstrap_status: Dict[str, str] = {}
         
     async def start_monitoring(self, base_dirs: list = None):
         """开始监听目录"""
@@ -38,6 +68,7 @@ class DirectoryMonitorService:
         # 保存主事件循环引用
         try:
             self.main_loop = asyncio.get_running_loop()
+            self.coalescer.bind(self.main_loop)
         except RuntimeError:
             logger.warning("No running event loop found")
             
@@ -47,10 +78,10 @@ class DirectoryMonitorService:
         if base_dirs is None:
             base_dirs = config.MONITOR_DIRS
             
-        # 确保目录存在
+        # 确保目录存在（网络挂载目录可能响应较慢，在文件系统线程池中检查）
         valid_dirs = []
         for base_dir in base_dirs:
-            if os.path.exists(base_dir):
+            if await async_fs.exists(base_dir):
                 valid_dirs.append(base_dir)
                 logger.info(f"Adding directory to monitor: {base_dir}")
             else:
@@ -60,8 +91,13 @@ class DirectoryMonitorService:
             logger.error("No valid directories to monitor")
             return
             
-        # 为每个目录创建监听器
+        # 先从目录清单恢复文件数量，再逐个建立监听
         for base_dir in valid_dirs:
+            self.bootstrap_status[base_dir] = "pending"
+            await self._restore_inventory(base_dir)
+        for base_dir in valid_dirs:
+            if not self.is_running:
+                return
             await self._setup_directory_monitor(base_dir)
             
         logger.info(f"Started monitoring {len(valid_dirs)} directories")
@@ -75,39 +111,213 @@ class DirectoryMonitorService:
             observer.join()
             logger.info(f"Stopped monitoring: {path}")
 
+        for path, task in self.poll_tasks.items():
+            task.cancel()
+            logger.info(f"Stopped polling: {path}")
+
         self.observers.clear()
+        self.poll_tasks.clear()
+        self.pollers.clear()
+        self.monitor_modes.clear()
+        self.watch_usage.clear()
+        self.hot_subtrees.clear()
+        self.bootstrap_status.clear()
         self.monitored_directories.clear()
 
+        # 丢弃尚未提交的事件和延后的分析
+        dropped = self.coalescer.flush_all()
+        if dropped:
+            logger.info(f"Discarded pending events for {len(dropped)} subtrees")
+        for handle in self.deferred_analysis.values():
+            handle.cancel()
+        self.deferred_analysis.clear()
+
         # 清理事件循环引用
         self.main_loop = None
         logger.info("Directory monitoring stopped")
         
+    @staticmethod
+    def _resolve_mode(base_dir: str) -> str:
+        """确定目录的监听方式：MONITOR_MODE 为 auto 时网络文件系统使用轮询"""
+        mode = config.MONITOR_MODE
+        if mode in ("inotify", "polling"):
+            return mode
+        if mode != "auto":
+            logger.warning(f"Unknown MONITOR_MODE '{mode}', falling back to auto")
+        if is_network_fs(base_dir):
+            logger.info(f"{base_dir} is on a network filesystem ({detect_fs_type(base_dir)}), using polling")
+            return "polling"
+        return "inotify"
+
+    async def _restore_inventory(self, base_dir: str):
+        """从目录清单恢复文件数量和目录指纹，失败时在建立监听时重新扫描"""
+        try:
+            doc, tree = await directory_inventory.load(base_dir)
+        except Exception as e:
+            logger.warning(f"Failed to load directory inventory for {base_dir}: {e}")
+            return
+        if doc is None:
+            return
+        self.file_counts[base_dir] = doc.file_count
+        poller = DirectoryPoller(base_dir, workers=config.MONITOR_POLL_WORKERS)
+        poller.tree = tree
+        self.pollers[base_dir] = poller
+        self.bootstrap_status[base_dir] = "restored"
+        logger.info(
+            f"Restored inventory for {base_dir}: {doc.file_count} files"
+            f"{', directory snapshot loaded' if tree is not None else ''}"
+        )
+
+    async def _save_inventory(self, base_dir: str):
+        """保存目录清单（混合模式下指纹树不含热子树，只保存文件数量）"""
+        mode = self.monitor_modes.get(base_dir)
+        poller = self.pollers.get(base_dir)
+        tree = poller.tree if poller is not None and mode in ("inotify", "polling") else None
+        try:
+            await directory_inventory.save(base_dir, self.file_counts.get(base_dir, 0), mode, tree)
+        except Exception as e:
+            logger.warning(f"Failed to save directory inventory for {base_dir}: {e}")
+
     async def _setup_directory_monitor(self, base_dir: str):
-        """为指定目录设置监听器"""
+        """为指定目录设置监听器：按目录数量与 inotify watch 预算选择 inotify、混合或轮询"""
+        mode = self._resolve_mode(base_dir)
+        poller = self.pollers.pop(base_dir, None) or DirectoryPoller(base_dir, workers=config.MONITOR_POLL_WORKERS)
         try:
-            # 初始化文件计数
-            initial_count = await self._count_target_files(base_dir)
-            self.file_counts[base_dir] = initial_count
+            # 建立或增量更新目录指纹，同时得到目录数量和文件数量；
+            # 耗时较长，使用独立线程，避免占用文件系统线程池
+            restored = poller.tree is not None
+            changed = await asyncio.to_thread(poller.poll)
+            if poller.tree is None:
+                self.bootstrap_status[base_dir] = "failed"
+                logger.error(f"Failed to scan {base_dir}")
+                return
+            if not self.is_running:
+                return
+            self.file_counts[base_dir] = poller.total_files()
             self.last_analysis_time[base_dir] = datetime.now() - self.analysis_cooldown
-            
-            # 创建事件处理器
-            event_handler = DirectoryEventHandler(base_dir, self)
-            
-            # 创建观察者
-            observer = Observer()
-            observer.schedule(event_handler, base_dir, recursive=True)
-            observer.start()
-            
-            self.observers[base_dir] = observer
-            self.monitored_directories.add(base_dir)
-            
-            logger.info(f"Setup monitor for {base_dir}, initial file count: {initial_count}")
-            
+            if restored and changed:
+                # 停机期间发生的变化
+                logger.info(f"{len(changed)} directories under {base_dir} changed since last run")
+                self.coalescer.add(base_dir, *changed, is_dir=True)
+
+            if mode == "polling":
+                self._start_polling(base_dir, poller, "polling")
+                return
+
+            directories = poller.tree.total_dirs()
+            available = self.watch_budget - sum(self.watch_usage.values())
+            if directories <= available:
+                # 递归添加 watch 需要遍历目录，在线程中执行
+                await asyncio.to_thread(self._start_observer, base_dir, [(base_dir, True)])
+                self.pollers[base_dir] = poller
+                self.watch_usage[base_dir] = directories
+                self.monitor_modes[base_dir] = "inotify"
+                self.monitored_directories.add(base_dir)
+                logger.info(
+                    f"Setup monitor for {base_dir}, initial file count: {self.file_counts[base_dir]}, "
+                    f"{directories} inotify watches"
+                )
+                return
+
+            # 预算不足：最近有变化的一级子目录使用 inotify，其余目录轮询
+            logger.warning(
+                f"{base_dir} has {directories} directories but only {available} inotify watches are available, "
+                f"using hybrid monitoring"
+            )
+            hot, used = plan_hot_subtrees(base_dir, poller.tree, available)
+            if used:
+                # 根目录非递归监听，热子树递归监听
+                await asyncio.to_thread(
+                    self._start_observer, base_dir, [(base_dir, False)] + [(path, True) for path in hot]
+                )
+                self.watch_usage[base_dir] = used
+            poller.exclude(hot)
+            self.hot_subtrees[base_dir] = hot
+            self._start_polling(base_dir, poller, "hybrid" if used else "polling")
+
+        except OSError as e:
+            if e.errno not in (errno.ENOSPC, errno.EMFILE) or poller.tree is None:
+                self.bootstrap_status[base_dir] = "failed"
+                logger.error(f"Failed to setup monitor for {base_dir}: {e}")
+                return
+            # 其他进程占用了 watch，实际可用数量少于预算，整个目录改为轮询
+            logger.warning(f"inotify watch limit reached for {base_dir} ({e}), falling back to polling")
+            self.watch_usage.pop(base_dir, None)
+            self.hot_subtrees.pop(base_dir, None)
+            poller.excluded.clear()
+            await asyncio.to_thread(poller.poll)
+            self._start_polling(base_dir, poller, "polling")
         except Exception as e:
+            self.bootstrap_status[base_dir] = "failed"
             logger.error(f"Failed to setup monitor for {base_dir}: {e}")
-            
+        finally:
+            if base_dir in self.monitored_directories:
+                self.bootstrap_status[base_dir] = "ready"
+                await self._save_inventory(base_dir)
+
+    def _start_observer(self, base_dir: str, watches: List[Tuple[str, bool]]):
+        """
+        启动 inotify 监听
+
+        Args:
+            base_dir: 监听目录
+            watches: [(路径, 是否递归)]
+        """
+        event_handler = DirectoryEventHandler(base_dir, self)
+        observer = Observer()
+        try:
+            for path, recursive in watches:
+                observer.schedule(event_handler, path, recursive=recursive)
+            observer.start()
+        except Exception:
+            observer.unschedule_all()
+            raise
+        self.observers[base_dir] = observer
+
+    def _start_polling(self, base_dir: str, poller: DirectoryPoller, mode: str):
+        """启动轮询监听（poller 已建立指纹）"""
+        self.pollers[base_dir] = poller
+        self.poll_tasks[base_dir] = asyncio.create_task(self._poll_loop(base_dir, poller))
+        self.monitored_directories.add(base_dir)
+        self.monitor_modes[base_dir] = mode
+        logger.info(
+            f"Setup {mode} monitor for {base_dir}, initial file count: {self.file_counts[base_dir]}, "
+            f"{poller.tree.total_dirs()} polled directories, {self.watch_usage.get(base_dir, 0)} inotify watches"
+        )
+
+    async def _poll_loop(self, base_dir: str, poller: DirectoryPoller):
+        """定期轮询目录指纹，变化的目录交给合并器"""
+        interval = config.MONITOR_POLL_INTERVAL
+        while self.is_running:
+            await asyncio.sleep(interval)
+            try:
+                changed = await asyncio.to_thread(poller.poll)
+            except Exception as e:
+                logger.error(f"Error polling {base_dir}: {e}")
+                continue
+            if changed:
+                logger.debug(f"Polling found {len(changed)} changed directories under {base_dir}")
+                self.coalescer.add(base_dir, *changed, is_dir=True)
+                if self.monitor_modes.get(base_dir) == "polling":
+                    self.file_counts[base_dir] = poller.total_files()
+                await self._save_inventory(base_dir)
+
     async def _count_target_files(self, directory: str) -> int:
-        """统计目录中PDF和JSON文件的数量"""
+        """统计目录中PDF和JSON文件的数量（在文件系统线程池中遍历）"""
+        mode = self.monitor_modes.get(directory)
+        if mode == "polling":
+            # 轮询模式下目录指纹已包含全部文件数量，无需再次遍历
+            return self.pollers[directory].total_files()
+        if mode == "inotify":
+            # 增量更新目录指纹，只重新列出修改时间变化的目录
+            poller = self.pollers[directory]
+            await asyncio.to_thread(poller.poll)
+            return poller.total_files()
+        return await async_fs.run(self._count_target_files_sync, directory)
+
+    @staticmethod
+    def _count_target_files_sync(directory: str) -> int:
+        """统计目录中PDF和JSON文件的数量（同步实现）"""
         count = 0
         try:
             for root, dirs, files in os.walk(directory):
@@ -119,37 +329,76 @@ class DirectoryMonitorService:
             
         return count
         
-    async def _handle_file_change(self, base_dir: str):
-        """处理文件变化事件"""
+    async def _handle_event_batch(self, batch: EventBatch):
+        """处理合并后的一批文件事件"""
+        logger.info(
+            f"Coalesced {batch.event_count} file events under {batch.subtree}"
+            f"{' (overflow)' if batch.overflow else ''}"
+        )
+        changed_at = datetime.now() - timedelta(seconds=time.monotonic() - batch.last_event)
+        await self._handle_file_change(batch.base_dir, changed_at)
+
+    async def _handle_file_change(self, base_dir: str, changed_at: Optional[datetime] = None):
+        """
+        处理文件变化：冷却期内或已有分析在运行时延后处理，而不是丢弃
+
+        Args:
+            base_dir: 监听目录
+            changed_at: 最后一个文件事件的时间，在此之后已开始的分析已覆盖该变化
+        """
         try:
-            # 检查冷却时间
+            from services.resource_service import ResourceService
+
+            if not self.is_running:
+                return
+
             now = datetime.now()
+            last_analysis = self.last_analysis_time.get(base_dir)
+            if changed_at and last_analysis and last_analysis >= changed_at:
+                logger.debug(f"Change of {base_dir} already covered by analysis started at {last_analysis}")
+                return
+
+            # 检查冷却时间
             if base_dir in self.last_analysis_time:
                 time_since_last = now - self.last_analysis_time[base_dir]
                 if time_since_last < self.analysis_cooldown:
-                    logger.debug(f"Analysis cooldown active for {base_dir}, skipping")
+                    remaining = (self.analysis_cooldown - time_since_last).total_seconds()
+                    logger.debug(f"Analysis cooldown active for {base_dir}, deferring {remaining:.0f}s")
+                    self._defer_file_change(base_dir, remaining)
                     return
-                    
+
+            if await ResourceService.is_auto_analysis_running():
+                logger.debug(f"Auto analysis running, deferring change of {base_dir}")
+                self._defer_file_change(base_dir, self.analysis_retry_delay)
+                return
+
+            # 先记录分析时间，同时提交的其他批次会被视为已覆盖
+            self.last_analysis_time[base_dir] = now
+
             # 统计当前文件数量
             current_count = await self._count_target_files(base_dir)
             previous_count = self.file_counts.get(base_dir, 0)
-            
-            # 检查文件数量是否发生变化
-            if current_count != previous_count:
-                logger.info(f"File count changed in {base_dir}: {previous_count} -> {current_count}")
-                
-                # 更新记录
-                self.file_counts[base_dir] = current_count
-                self.last_analysis_time[base_dir] = now
-                
-                # 触发自动分析
-                await self._trigger_auto_analysis(base_dir)
-            else:
-                logger.debug(f"No file count change in {base_dir}")
-                
+            logger.info(f"Files changed in {base_dir}: {previous_count} -> {current_count}")
+            self.file_counts[base_dir] = current_count
+            await self._save_inventory(base_dir)
+
+            # 触发自动分析（重命名、替换等数量不变的变化同样需要重新分析）
+            await self._trigger_auto_analysis(base_dir)
+
         except Exception as e:
             logger.error(f"Error handling file change for {base_dir}: {e}")
-            
+
+    def _defer_file_change(self, base_dir: str, delay: float):
+        """延后处理目录变化，同一目录只保留一个待处理项"""
+        if base_dir in self.deferred_analysis or not self.main_loop:
+            return
+
+        def run():
+            self.deferred_analysis.pop(base_dir, None)
+            asyncio.create_task(self._handle_file_change(base_dir))
+
+        self.deferred_analysis[base_dir] = self.main_loop.call_later(delay, run)
+
     async def _trigger_auto_analysis(self, base_dir: str):
         """触发自动分析"""
         try:
@@ -159,7 +408,7 @@ class DirectoryMonitorService:
             from services.resource_service import ResourceService
             
             # 检查是否已有分析在运行
-            if ResourceService._auto_analysis_running:
+            if await ResourceService.is_auto_analysis_running():
                 logger.info("Auto analysis already running, skipping trigger")
                 return
                 
@@ -171,27 +420,6 @@ class DirectoryMonitorService:
         except Exception as e:
             logger.error(f"Failed to trigger auto analysis for {base_dir}: {e}")
 
-    def _schedule_file_change_handler(self, base_dir: str):
-        """线程安全地调度文件变化处理器"""
-        try:
-            # 使用保存的主事件循环
-            if self.main_loop and not self.main_loop.is_closed():
-                # 定义一个安全的任务创建函数
-                def create_task_safely():
-                    try:
-                        if not self.main_loop.is_closed():
-                            asyncio.create_task(self._handle_file_change(base_dir))
-                    except Exception as e:
-                        logger.error(f"Error creating task: {e}")
-
-                # 使用主事件循环的线程安全方法
-                self.main_loop.call_soon_threadsafe(create_task_safely)
-            else:
-                logger.warning(f"Main event loop not available, skipping file change handler for {base_dir}")
-
-        except Exception as e:
-            logger.error(f"Error scheduling file change handler: {e}")
-
     def get_monitoring_status(self) -> Dict:
         """获取监听状态"""
         return {
@@ -200,7 +428,19 @@ class DirectoryMonitorService:
             "file_counts": self.file_counts.copy(),
             "last_analysis_times": {
                 path: time.isoformat() for path, time in self.last_analysis_time.items()
-            }
+            },
+            "deferred_analysis": list(self.deferred_analysis),
+            "monitor_modes": self.monitor_modes.copy(),
+            "bootstrap": self.bootstrap_status.copy(),
+            "polling": {path: poller.last_poll for path, poller in self.pollers.items()},
+            "hot_subtrees": {path: list(hot) for path, hot in self.hot_subtrees.items()},
+            "inotify_watches": {
+                "max_user_watches": self.max_user_watches,
+                "budget": self.watch_budget,
+                "used": sum(self.watch_usage.values()),
+                "per_directory": self.watch_usage.copy()
+            },
+            "event_coalescer": self.coalescer.get_status()
         }
 
 
@@ -211,8 +451,6 @@ class DirectoryEventHandler(FileSystemEventHandler):
         super().__init__()
         self.base_dir = base_dir
         self.monitor_service = monitor_service
-        self.last_event_time = 0
-        self.event_debounce = 2.0  # 事件防抖时间（秒）
         
     def on_created(self, event):
         """文件创建事件"""
@@ -229,26 +467,16 @@ class DirectoryEventHandler(FileSystemEventHandler):
         if not event.is_directory:
             # 检查源文件或目标文件是否为目标类型
             if self._is_target_file(event.src_path) or self._is_target_file(event.dest_path):
-                self._handle_event("moved", f"{event.src_path} -> {event.dest_path}")
+                self._handle_event("moved", event.src_path, event.dest_path)
                 
     def _is_target_file(self, file_path: str) -> bool:
         """检查是否为目标文件类型（PDF或JSON）"""
         return file_path.lower().endswith(('.pdf', '.json'))
         
-    def _handle_event(self, event_type: str, file_path: str):
-        """处理文件事件"""
-        current_time = time.time()
-        
-        # 事件防抖：避免短时间内重复触发
-        if current_time - self.last_event_time < self.event_debounce:
-            return
-            
-        self.last_event_time = current_time
-        
-        logger.debug(f"File {event_type}: {file_path}")
-        
-        # 使用线程安全的方式调度异步任务
-        self.monitor_service._schedule_file_change_handler(self.base_dir)
+    def _handle_event(self, event_type: str, *paths: str):
+        """处理文件事件：交给合并器，静默一段时间后统一提交"""
+        logger.debug(f"File {event_type}: {' -> '.join(paths)}")
+        self.monitor_service.coalescer.add(self.base_dir, *paths)
 
 
 # 全局监听服务实例
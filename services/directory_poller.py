@@ -0,0 +1,222 @@
+"""
+轮询式目录变化检测
+NFS/SMB 等网络挂载目录收不到 inotify 事件，改为定期轮询。
+每个目录记录修改时间、目标文件数量和文件名摘要，并与子目录摘要组合成 Merkle 式的目录指纹。
+目录的修改时间只反映直接子项的增删和重命名，因此每轮仍需 stat 所有已知目录，
+但只有修改时间变化的目录才重新列出内容，其余目录沿用上次的结果；
+只有指纹变化的子树会被上报，整棵树的指纹相同时可以确定没有任何变化。
+"""
+
+import os
+import hashlib
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 网络文件系统类型，auto 模式下这些挂载点使用轮询
+NETWORK_FS_TYPES = {
+    "nfs", "nfs4", "cifs", "smbfs", "smb3", "9p", "afs", "ncpfs",
+    "fuse.sshfs", "fuse.rclone", "fuse.s3fs", "fuse.glusterfs", "glusterfs", "ceph", "fuse.ceph"
+}
+
+
+@dataclass
+class DirNode:
+    """目录指纹节点"""
+    mtime_ns: int
+    file_count: int
+    names_digest: str
+    children: Dict[str, "DirNode"] = field(default_factory=dict)
+    digest: str = ""
+
+    def total_files(self) -> int:
+        return self.file_count + sum(child.total_files() for child in self.children.values())
+
+    def total_dirs(self) -> int:
+        return 1 + sum(child.total_dirs() for child in self.children.values())
+
+    def to_list(self) -> list:
+        """紧凑的可序列化形式，用于保存目录指纹快照"""
+        return [
+            self.mtime_ns, self.file_count, self.names_digest, self.digest,
+            {name: child.to_list() for name, child in self.children.items()}
+        ]
+
+    @classmethod
+    def from_list(cls, data: list) -> "DirNode":
+        mtime_ns, file_count, names_digest, digest, children = data
+        return cls(
+            mtime_ns, file_count, names_digest,
+            {name: cls.from_list(child) for name, child in children.items()},
+            digest
+        )
+
+
+def detect_fs_type(path: str, mounts_file: str = "/proc/mounts") -> Optional[str]:
+    """返回路径所在挂载点的文件系统类型（仅 Linux），无法判断时返回 None"""
+    try:
+        with open(mounts_file, "r", encoding="utf-8") as f:
+            mounts = [line.split() for line in f]
+    except OSError:
+        return None
+    path = os.path.realpath(path)
+    best, fs_type = "", None
+    for parts in mounts:
+        if len(parts) < 3:
+            continue
+        mount_point = parts[1].replace("\\040", " ")
+        if (path == mount_point or path.startswith(mount_point.rstrip("/") + "/")) and len(mount_point) >= len(best):
+            best, fs_type = mount_point, parts[2]
+    return fs_type
+
+
+def is_network_fs(path: str) -> bool:
+    fs_type = detect_fs_type(path)
+    return fs_type is not None and fs_type.lower() in NETWORK_FS_TYPES
+
+
+class DirectoryPoller:
+    """基于目录指纹的变化检测（同步实现，应在线程中执行）"""
+
+    def __init__(self, root: str, extensions: Tuple[str, ...] = (".pdf", ".json"), workers: int = 8):
+        self.root = root
+        self.extensions = extensions
+        self.workers = workers
+        self.tree: Optional[DirNode] = None
+        self.last_poll: Dict = {}
+        # 不轮询的子目录（已由 inotify 监听）
+        self.excluded: Set[str] = set()
+
+    def exclude(self, paths: Iterable[str]):
+        """排除子目录，并从已有指纹树中移除"""
+        for path in paths:
+            self.excluded.add(path)
+            if self.tree is None:
+                continue
+            parts = os.path.relpath(path, self.root).split(os.sep)
+            chain = [self.tree]
+            for name in parts[:-1]:
+                node = chain[-1].children.get(name)
+                if node is None:
+                    break
+                chain.append(node)
+            else:
+                if chain[-1].children.pop(parts[-1], None) is not None:
+                    for node in reversed(chain):
+                        node.digest = self._digest(node)
+
+    @staticmethod
+    def _digest(node: DirNode) -> str:
+        h = hashlib.sha1(f"{node.mtime_ns}|{node.file_count}|{node.names_digest}".encode("utf-8"))
+        for name in sorted(node.children):
+            h.update(f"|{name}:{node.children[name].digest}".encode("utf-8"))
+        return h.hexdigest()
+
+    def _list(self, path: str) -> Tuple[int, str, List[str]]:
+        """列出目录：目标文件数量、文件名摘要、子目录名"""
+        names = []
+        subdirs = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif entry.name.lower().endswith(self.extensions):
+                        names.append(entry.name)
+                except OSError:
+                    continue
+        names.sort()
+        names_digest = hashlib.sha1("\n".join(names).encode("utf-8")).hexdigest()
+        return len(names), names_digest, subdirs
+
+    def _refresh(self, path: str, old: Optional[DirNode], changed: List[str], pool: Optional[ThreadPoolExecutor] = None) -> Optional[DirNode]:
+        """
+        刷新一个目录的指纹
+
+        Args:
+            path: 目录路径
+            old: 上次的节点，None 表示新目录
+            changed: 收集指纹变化且直接内容有变化的目录
+            pool: 仅在根目录使用，并行刷新一级子目录（网络文件系统上 stat 主要耗时在往返延迟）
+        """
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+        if old is not None and old.mtime_ns == mtime_ns:
+            # 直接子项没有变化，只需检查已知的子目录
+            node = DirNode(mtime_ns, old.file_count, old.names_digest)
+            child_names = list(old.children)
+        else:
+            try:
+                file_count, names_digest, child_names = self._list(path)
+            except OSError:
+                return None
+            node = DirNode(mtime_ns, file_count, names_digest)
+            if old is None or old.names_digest != names_digest:
+                changed.append(path)
+
+        old_children = old.children if old is not None else {}
+        if self.excluded:
+            child_names = [name for name in child_names if os.path.join(path, name) not in self.excluded]
+        if pool is not None:
+            results = [
+                (name, pool.submit(self._refresh_isolated, os.path.join(path, name), old_children.get(name)))
+                for name in child_names
+            ]
+            for name, future in results:
+                child, child_changed = future.result()
+                changed.extend(child_changed)
+                if child is not None:
+                    node.children[name] = child
+        else:
+            for name in child_names:
+                child = self._refresh(os.path.join(path, name), old_children.get(name), changed)
+                if child is not None:
+                    node.children[name] = child
+
+        # 删除的子目录也算作当前目录的变化
+        if old is not None and set(old_children) - set(node.children) and path not in changed:
+            changed.append(path)
+
+        node.digest = self._digest(node)
+        return node
+
+    def _refresh_isolated(self, path: str, old: Optional[DirNode]) -> Tuple[Optional[DirNode], List[str]]:
+        changed: List[str] = []
+        return self._refresh(path, old, changed), changed
+
+    def poll(self) -> List[str]:
+        """
+        检查一轮，更新指纹
+
+        Returns:
+            直接内容发生变化的目录列表；首次调用只建立指纹，返回空列表
+        """
+        started = time.perf_counter()
+        changed: List[str] = []
+        first = self.tree is None
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="dir-poll") as pool:
+            tree = self._refresh(self.root, self.tree, changed, pool)
+        if tree is None:
+            logger.warning(f"Polling root not accessible: {self.root}")
+            return []
+        unchanged = self.tree is not None and self.tree.digest == tree.digest
+        self.tree = tree
+        self.last_poll = {
+            "seconds": round(time.perf_counter() - started, 3),
+            "directories": tree.total_dirs(),
+            "changed_directories": 0 if first else len(changed),
+            "fingerprint": tree.digest
+        }
+        if first or unchanged:
+            return []
+        return changed
+
+    def total_files(self) -> int:
+        return self.tree.total_files() if self.tree else 0
@@ -0,0 +1,249 @@
+"""
+分布式锁
+自动分析、论文导入等耗时任务在所有 worker 中同一时间只能运行一份。
+锁是带过期时间的租约，持有者在后台续期；持有者崩溃或失联后锁过期，其他 worker 可以获取。
+
+每次获取锁都会得到单调递增的 fencing token。失联后恢复的旧持有者 token 较小，
+写入结果时以 token 作为条件（只接受不小于已写入 token 的写入），不会覆盖新持有者的结果。
+锁文档保存在 distributed_locks 集合（SHARED_STATE_BACKEND=memory 时保存在进程内），
+释放时只清空持有者、保留 token，因此不能使用 TTL 索引自动删除。
+"""
+
+import uuid
+import time
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from config import config
+from services.shared_state import worker_id
+
+logger = logging.getLogger(__name__)
+
+
+class LockStore(ABC):
+    """锁的存储接口"""
+
+    @abstractmethod
+    async def acquire(self, name: str, owner: str, ttl: float) -> Optional[int]:
+        """锁空闲或已过期时获取，返回新的 fencing token；已被持有时返回 None"""
+
+    @abstractmethod
+    async def renew(self, name: str, owner: str, token: int, ttl: float) -> bool:
+        """续期，锁已被撤销或被他人获取时失败"""
+
+    @abstractmethod
+    async def release(self, name: str, owner: str, token: int):
+        """释放 owner 以 token 持有的锁"""
+
+    @abstractmethod
+    async def revoke(self, name: str) -> bool:
+        """强制释放当前持有者的锁并使其 token 失效，返回之前是否被持有"""
+
+    @abstractmethod
+    async def holder(self, name: str) -> Optional[Dict[str, Any]]:
+        """当前持有者和 token，锁空闲或已过期时返回 None"""
+
+
+class MemoryLockStore(LockStore):
+    """进程内实现"""
+
+    def __init__(self):
+        # name -> {"owner", "token", "expires"(monotonic)}
+        self._locks: Dict[str, Dict[str, Any]] = {}
+
+    def _held(self, name: str) -> Optional[Dict[str, Any]]:
+        lock = self._locks.get(name)
+        if lock and lock["owner"] is not None and lock["expires"] > time.monotonic():
+            return lock
+        return None
+
+    async def acquire(self, name: str, owner: str, ttl: float) -> Optional[int]:
+        if self._held(name):
+            return None
+        lock = self._locks.setdefault(name, {"owner": None, "token": 0, "expires": 0.0})
+        lock.update(owner=owner, token=lock["token"] + 1, expires=time.monotonic() + ttl)
+        return lock["token"]
+
+    async def renew(self, name: str, owner: str, token: int, ttl: float) -> bool:
+        lock = self._locks.get(name)
+        if not lock or lock["owner"] != owner or lock["token"] != token:
+            return False
+        lock["expires"] = time.monotonic() + ttl
+        return True
+
+    async def release(self, name: str, owner: str, token: int):
+        lock = self._locks.get(name)
+        if lock and lock["owner"] == owner and lock["token"] == token:
+            lock.update(owner=None, expires=0.0)
+
+    async def revoke(self, name: str) -> bool:
+        lock = self._held(name)
+        if lock is None:
+            return False
+        lock.update(owner=None, token=lock["token"] + 1, expires=0.0)
+        return True
+
+    async def holder(self, name: str) -> Optional[Dict[str, Any]]:
+        lock = self._held(name)
+        return {"owner": lock["owner"], "token": lock["token"]} if lock else None
+
+
+class MongoLockStore(LockStore):
+    """MongoDB 实现，过期时间使用 UTC 并在服务端比较"""
+
+    @property
+    def _collection(self):
+        # 延迟导入，避免与 services.database 循环导入
+        from services.database import DistributedLockEntry
+        return DistributedLockEntry.get_motor_collection()
+
+    @staticmethod
+    def _now() -> datetime:
+        return datetime.now(timezone.utc)
+
+    async def acquire(self, name: str, owner: str, ttl: float) -> Optional[int]:
+        now = self._now()
+        try:
+            # 锁被持有且未过期时条件不匹配，upsert 会因 _id 重复而失败
+            doc = await self._collection.find_one_and_update(
+                {"_id": name, "$or": [{"owner": None}, {"expires_at": {"$lte": now}}]},
+                {
+                    "$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl), "acquired_at": now},
+                    "$inc": {"token": 1}
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            return None
+        return doc["token"]
+
+    async def renew(self, name: str, owner: str, token: int, ttl: float) -> bool:
+        result = await self._collection.update_one(
+            {"_id": name, "owner": owner, "token": token},
+            {"$set": {"expires_at": self._now() + timedelta(seconds=ttl)}}
+        )
+        return result.matched_count > 0
+
+    async def release(self, name: str, owner: str, token: int):
+        await self._collection.update_one(
+            {"_id": name, "owner": owner, "token": token},
+            {"$set": {"owner": None, "expires_at": None}}
+        )
+
+    async def revoke(self, name: str) -> bool:
+        result = await self._collection.update_one(
+            {"_id": name, "owner": {"$ne": None}, "expires_at": {"$gt": self._now()}},
+            {"$set": {"owner": None, "expires_at": None}, "$inc": {"token": 1}}
+        )
+        return result.modified_count > 0
+
+    async def holder(self, name: str) -> Optional[Dict[str, Any]]:
+        doc = await self._collection.find_one(
+            {"_id": name, "owner": {"$ne": None}, "expires_at": {"$gt": self._now()}},
+            {"owner": 1, "token": 1}
+        )
+        return {"owner": doc["owner"], "token": doc["token"]} if doc else None
+
+
+class LockHandle:
+    """已获取的锁，每隔 ttl/3 秒续期一次，直到 release()"""
+
+    def __init__(self, lock: "DistributedLock", owner: str, token: int):
+        self.lock = lock
+        self.owner = owner
+        self.token = token
+        # 续期失败（锁已被撤销或已被其他 worker 获取）后为 True
+        self.lost = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._renew_loop(), name=f"lock:{self.lock.name}")
+
+    async def _renew_loop(self):
+        while not self.lost:
+            await asyncio.sleep(self.lock.ttl / 3)
+            await self.check()
+
+    async def check(self) -> bool:
+        """续期并确认仍持有锁，用于耗时任务的检查点"""
+        if self.lost:
+            return False
+        try:
+            renewed = await self.lock.store.renew(self.lock.name, self.owner, self.token, self.lock.ttl)
+        except Exception as e:
+            logger.warning(f"Failed to renew lock {self.lock.name}: {e}")
+            return True
+        if not renewed:
+            self.lost = True
+            logger.warning(f"Lock {self.lock.name} (token {self.token}) was revoked or taken over")
+        return renewed
+
+    async def release(self):
+        if self._task:
+            self._task.cancel()
+        try:
+            await self.lock.store.release(self.lock.name, self.owner, self.token)
+        except Exception as e:
+            logger.warning(f"Failed to release lock {self.lock.name}: {e}")
+
+
+class DistributedLock:
+    """带 fencing token 的分布式锁"""
+
+    def __init__(self, name: str, ttl: Optional[float] = None, store: Optional[LockStore] = None):
+        """
+        Args:
+            name: 锁名称
+            ttl: 锁的有效期，持有者每隔 ttl/3 秒续期；持有者失联后最多 ttl 秒锁被释放，默认 DISTRIBUTED_LOCK_TTL
+        """
+        self.name = name
+        self.ttl = ttl or config.DISTRIBUTED_LOCK_TTL
+        self._store = store
+
+    @property
+    def store(self) -> LockStore:
+        return self._store or lock_store
+
+    async def acquire(self) -> Optional[LockHandle]:
+        """
+        尝试获取锁，不等待
+
+        Returns:
+            获取成功返回 LockHandle（token 为本次的 fencing token），用完后调用 release()；
+            已被持有（包括同一 worker 内的其他协程）时返回 None
+        """
+        owner = f"{worker_id()}/{uuid.uuid4().hex[:8]}"
+        token = await self.store.acquire(self.name, owner, self.ttl)
+        if token is None:
+            return None
+        handle = LockHandle(self, owner, token)
+        handle.start()
+        logger.info(f"Acquired lock {self.name} with token {token}")
+        return handle
+
+    async def holder(self) -> Optional[Dict[str, Any]]:
+        return await self.store.holder(self.name)
+
+    async def is_locked(self) -> bool:
+        return await self.holder() is not None
+
+    async def revoke(self) -> bool:
+        """撤销当前持有者的锁，持有者在下一个检查点发现并停止"""
+        return await self.store.revoke(self.name)
+
+
+def _create_lock_store() -> LockStore:
+    if config.SHARED_STATE_BACKEND == "memory":
+        return MemoryLockStore()
+    return MongoLockStore()
+
+
+# 全局锁存储实例
+lock_store = _create_lock_store()
@@ -0,0 +1,333 @@
+"""
+分布式目录扫描
+自动分析需要遍历 BASE_PDF_DIRS 下的整个共享目录，单个进程扫描时耗时随文件数线性增长。
+distributed 模式（SCAN_MODE=distributed）下：
+- 协调者（运行自动分析的 worker）把扫描目录划分为互不重叠的目录子树，作为工作单元写入 scan_units 集合
+- 扫描 worker（scan_worker.py，可运行在多台挂载了同一共享目录的机器上，协调者自身也参与）认领单元、扫描并写回结果
+- 协调者等待所有单元完成后汇总文件列表
+
+单元的认领带租约，扫描 worker 失联后租约过期，单元由其他 worker 重新认领；
+每次认领 attempt 加一，结果按 attempt 写入，协调者只读取最后一次认领的结果，失联的旧 worker 写入的结果不会被采用。
+"""
+
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from config import config
+from services.shared_state import worker_id
+
+logger = logging.getLogger(__name__)
+
+# 扫描单元: (目录, 是否递归扫描子目录)
+Unit = Tuple[str, bool]
+
+SCAN_EXTENSIONS = (".pdf",)
+
+
+def partition_scan_units(base_dirs: List[str], max_depth: int = 2) -> List[Unit]:
+    """
+    把扫描目录划分为互不重叠的工作单元：
+    深度小于 max_depth 的目录只扫描自身的文件，深度为 max_depth 的目录扫描整棵子树。
+    只遍历到 max_depth 层
+    """
+    units = []
+    for base in base_dirs:
+        for root, dirs, _ in os.walk(base):
+            depth = 0 if root == base else os.path.relpath(root, base).count(os.sep) + 1
+            if depth >= max_depth:
+                units.append((root, True))
+                dirs[:] = []
+            else:
+                units.append((root, False))
+    return units
+
+
+def scan_unit(path: str, recursive: bool = True) -> List[str]:
+    """扫描一个单元，返回其中的目标文件路径"""
+    result = []
+    try:
+        if recursive:
+            for root, _, files in os.walk(path):
+                result.extend(os.path.join(root, f) for f in files if f.lower().endswith(SCAN_EXTENSIONS))
+        else:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.name.lower().endswith(SCAN_EXTENSIONS) and entry.is_file():
+                        result.append(entry.path)
+    except OSError as e:
+        logger.warning(f"Error scanning {path}: {e}")
+    return result
+
+
+def scan_unit_mp(unit: Unit) -> List[str]:
+    """进程池中使用的入口"""
+    return scan_unit(*unit)
+
+
+def _units():
+    # 延迟导入，避免与 services.database 循环导入
+    from services.database import ScanUnit
+    return ScanUnit.get_motor_collection()
+
+
+def _results():
+    from services.database import ScanResultChunk
+    return ScanResultChunk.get_motor_collection()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class ScanWorker:
+    """扫描 worker，认领 scan_units 中的单元并写回结果"""
+
+    # 没有可认领的单元时的等待间隔（秒）
+    idle_interval = 2.0
+    # 单元最多被认领的次数，超过后视为失败（如目录导致 worker 反复崩溃）
+    max_attempts = 3
+    # 每批结果的文件数
+    chunk_size = 5000
+
+    def __init__(self, concurrency: int = 4, job_id: Optional[str] = None, lease_seconds: Optional[float] = None):
+        """
+        Args:
+            concurrency: 同时扫描的单元数
+            job_id: 只认领指定扫描任务的单元，None 表示认领所有任务的单元
+            lease_seconds: 认领租约时长，默认 SCAN_UNIT_LEASE_SECONDS
+        """
+        self.concurrency = max(1, concurrency)
+        self.job_id = job_id
+        self.lease_seconds = lease_seconds or config.SCAN_UNIT_LEASE_SECONDS
+        self.worker_id = worker_id()
+        self.stats = {"units": 0, "files": 0, "failed": 0, "lost": 0}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """
+        扫描单元使用的线程池，大小等于 concurrency。
+        遍历整棵子树耗时较长，使用独立线程池，避免占用文件系统线程池
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="scan_worker")
+        return self._executor
+
+    async def run(self, stop: asyncio.Event):
+        """运行 concurrency 个认领循环，直到 stop 被设置"""
+        logger.info(f"Scan worker {self.worker_id} started with concurrency {self.concurrency}")
+        try:
+            await asyncio.gather(*(self._loop(stop) for _ in range(self.concurrency)))
+        finally:
+            self.shutdown()
+        logger.info(f"Scan worker {self.worker_id} stopped: {self.stats}")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def _loop(self, stop: asyncio.Event):
+        while not stop.is_set():
+            try:
+                unit = await self.claim()
+            except Exception as e:
+                logger.warning(f"Failed to claim scan unit: {e}")
+                unit = None
+            if unit is None:
+                try:
+                    await asyncio.wait_for(stop.wait(), self.idle_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.process(unit)
+
+    async def claim(self) -> Optional[Dict[str, Any]]:
+        """认领一个待扫描或租约已过期的单元"""
+        now = _now()
+        query: Dict[str, Any] = {
+            "$or": [
+                {"status": "pending"},
+                {"status": "claimed", "lease_expires": {"$lte": now}, "attempt": {"$lt": self.max_attempts}}
+            ]
+        }
+        if self.job_id:
+            query["job_id"] = self.job_id
+        return await _units().find_one_and_update(
+            query,
+            {
+                "$set": {"status": "claimed", "claimed_by": self.worker_id, "lease_expires": now + timedelta(seconds=self.lease_seconds)},
+                "$inc": {"attempt": 1}
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def _owned(self, unit: Dict[str, Any]) -> Dict[str, Any]:
+        return {"_id": unit["_id"], "status": "claimed", "claimed_by": self.worker_id, "attempt": unit["attempt"]}
+
+    async def _heartbeat(self, unit: Dict[str, Any]):
+        """扫描期间每隔 1/3 租约续期"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                result = await _units().update_one(
+                    self._owned(unit), {"$set": {"lease_expires": _now() + timedelta(seconds=self.lease_seconds)}}
+                )
+            except Exception as e:
+                logger.warning(f"Failed to renew scan unit {unit['path']}: {e}")
+                continue
+            if result.matched_count == 0:
+                return
+
+    async def process(self, unit: Dict[str, Any]):
+        """扫描单元并写回结果"""
+        unit_id = str(unit["_id"])
+        heartbeat = asyncio.create_task(self._heartbeat(unit))
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            files = await loop.run_in_executor(self.executor, scan_unit, unit["path"], unit.get("recursive", True))
+            chunks = [
+                {"job_id": unit["job_id"], "unit_id": unit_id, "attempt": unit["attempt"],
+                 "files": files[i:i + self.chunk_size], "created_at": datetime.now()}
+                for i in range(0, len(files), self.chunk_size)
+            ]
+            if chunks:
+                await _results().insert_many(chunks)
+            result = await _units().update_one(self._owned(unit), {"$set": {
+                "status": "done", "file_count": len(files), "seconds": round(time.perf_counter() - started, 3),
+                "lease_expires": None, "finished_at": datetime.now()
+            }})
+            if result.matched_count == 0:
+                # 租约已过期并被其他 worker 重新认领，本次结果作废
+                self.stats["lost"] += 1
+                logger.warning(f"Scan unit {unit['path']} was reclaimed by another worker, discarding result")
+                await _results().delete_many({"unit_id": unit_id, "attempt": unit["attempt"]})
+                return
+            self.stats["units"] += 1
+            self.stats["files"] += len(files)
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"Failed to scan unit {unit['path']}: {e}")
+            try:
+                await _units().update_one(self._owned(unit), {"$set": {
+                    "status": "failed", "error": str(e), "lease_expires": None, "finished_at": datetime.now()
+                }})
+            except Exception as update_error:
+                logger.warning(f"Failed to mark scan unit {unit['path']} as failed: {update_error}")
+        finally:
+            heartbeat.cancel()
+
+
+ProgressCallback = Callable[[int, int, int], Awaitable[None]]
+
+
+class ScanCoordinator:
+    """扫描协调者，把目录划分为单元分发给扫描 worker 并汇总结果"""
+
+    # 检查单元完成情况的间隔（秒）
+    poll_interval = 1.0
+
+    async def scan(self, units: List[Unit], on_progress: Optional[ProgressCallback] = None,
+                   should_stop: Optional[Callable[[], bool]] = None) -> List[str]:
+        """
+        分发扫描单元并等待完成
+
+        Args:
+            units: partition_scan_units 划分的单元
+            on_progress: 进度回调 (已完成单元数, 单元总数, 已收集文件数)
+            should_stop: 返回 True 时放弃等待，返回已完成单元的结果
+
+        Returns:
+            所有已完成单元中的文件路径
+        """
+        if not units:
+            return []
+        job_id = str(ObjectId())
+        now = datetime.now()
+        await _units().insert_many([
+            {"job_id": job_id, "path": path, "recursive": recursive, "status": "pending",
+             "claimed_by": None, "attempt": 0, "lease_expires": None, "file_count": 0, "created_at": now}
+            for path, recursive in units
+        ])
+        logger.info(f"Scan job {job_id} dispatched {len(units)} units")
+
+        # 协调者自身也参与扫描，没有扫描 worker 时同样可以完成
+        stop = asyncio.Event()
+        local_worker = None
+        if config.SCAN_LOCAL_WORKERS > 0:
+            local_worker = asyncio.create_task(ScanWorker(config.SCAN_LOCAL_WORKERS, job_id=job_id).run(stop))
+        started = time.perf_counter()
+        try:
+            total = len(units)
+            reported = -1
+            while True:
+                finished, files = await self._progress(job_id)
+                if on_progress and finished != reported:
+                    reported = finished
+                    await on_progress(finished, total, files)
+                if finished >= total:
+                    break
+                if should_stop and should_stop():
+                    logger.info(f"Scan job {job_id} stopped with {finished}/{total} units finished")
+                    break
+                await asyncio.sleep(self.poll_interval)
+            stop.set()
+            if local_worker:
+                await local_worker
+            result = await self._collect(job_id)
+            logger.info(f"Scan job {job_id} collected {len(result)} files in {time.perf_counter() - started:.1f}s")
+            return result
+        finally:
+            stop.set()
+            if local_worker and not local_worker.done():
+                local_worker.cancel()
+            await _units().delete_many({"job_id": job_id})
+            await _results().delete_many({"job_id": job_id})
+
+    @staticmethod
+    async def _progress(job_id: str) -> Tuple[int, int]:
+        """已结束的单元数（完成、失败或认领次数用尽）和已收集的文件数"""
+        exhausted = {"status": "claimed", "attempt": {"$gte": ScanWorker.max_attempts}, "lease_expires": {"$lte": _now()}}
+        pipeline = [
+            {"$match": {"job_id": job_id, "$or": [{"status": {"$in": ["done", "failed"]}}, exhausted]}},
+            {"$group": {"_id": None, "finished": {"$sum": 1}, "files": {"$sum": "$file_count"}}}
+        ]
+        async for row in _units().aggregate(pipeline):
+            return row["finished"], row["files"]
+        return 0, 0
+
+    @staticmethod
+    async def _collect(job_id: str) -> List[str]:
+        """读取已完成单元最后一次认领写入的结果"""
+        attempts = {
+            str(unit["_id"]): unit["attempt"]
+            async for unit in _units().find({"job_id": job_id, "status": "done"}, {"attempt": 1})
+        }
+        files: List[str] = []
+        async for chunk in _results().find({"job_id": job_id}, {"unit_id": 1, "attempt": 1, "files": 1}):
+            if attempts.get(chunk["unit_id"]) == chunk["attempt"]:
+                files.extend(chunk["files"])
+        return files
+
+    @staticmethod
+    async def get_status() -> Dict[str, Any]:
+        """所有进行中扫描任务的单元状态统计"""
+        jobs: Dict[str, Dict[str, int]] = {}
+        pipeline = [{"$group": {"_id": {"job": "$job_id", "status": "$status"}, "count": {"$sum": 1}}}]
+        async for row in _units().aggregate(pipeline):
+            jobs.setdefault(row["_id"]["job"], {})[row["_id"]["status"]] = row["count"]
+        return {"mode": config.SCAN_MODE, "jobs": jobs}
+
+
+# 全局扫描协调者实例
+scan_coordinator = ScanCoordinator()
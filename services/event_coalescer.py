@@ -0,0 +1,162 @@
+"""
+文件事件合并器
+watchdog 在后台线程中上报文件事件，合并器按子目录归并事件：
+每个子目录在最后一个事件之后静默 quiet_period 秒才提交（尾沿防抖），
+持续有事件时最多等待 max_delay 秒也会提交，避免一直不触发。
+待提交的路径数量有上限，超出后只记录该子目录发生过变化（overflow），由后续分析整体重新扫描，
+因此突发的大量事件既不会丢失变化，也不会引发触发风暴。
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EventBatch:
+    """一个子目录在一次提交中合并的事件"""
+    base_dir: str
+    subtree: str
+    paths: Set[str] = field(default_factory=set)
+    event_count: int = 0
+    overflow: bool = False
+    first_event: float = 0.0
+    last_event: float = 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "base_dir": self.base_dir,
+            "subtree": self.subtree,
+            "paths": len(self.paths),
+            "event_count": self.event_count,
+            "overflow": self.overflow
+        }
+
+
+class EventCoalescer:
+    """按子目录合并文件事件的防抖器（线程安全）"""
+
+    def __init__(
+        self,
+        on_flush: Callable[[EventBatch], Awaitable[None]],
+        quiet_period: float = 2.0,
+        max_delay: float = 60.0,
+        max_pending_paths: int = 10000,
+        subtree_depth: int = 1
+    ):
+        self.on_flush = on_flush
+        self.quiet_period = quiet_period
+        self.max_delay = max_delay
+        self.max_pending_paths = max_pending_paths
+        self.subtree_depth = subtree_depth
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._pending: Dict[str, EventBatch] = {}
+        self._pending_paths = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_requested = False
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats = {"events": 0, "flushes": 0, "overflows": 0}
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """绑定提交批次所用的事件循环"""
+        self.loop = loop
+
+    def subtree_of(self, base_dir: str, path: str, is_dir: bool = False) -> str:
+        """路径所属的子目录：base_dir 下前 subtree_depth 层目录"""
+        try:
+            relative = os.path.relpath(path if is_dir else os.path.dirname(path), base_dir)
+        except ValueError:
+            return base_dir
+        if relative.startswith(os.pardir):
+            return base_dir
+        parts = [] if relative == os.curdir else relative.split(os.sep)
+        return os.path.join(base_dir, *parts[:self.subtree_depth])
+
+    def add(self, base_dir: str, *paths: str, is_dir: bool = False):
+        """记录事件（可在任意线程调用），is_dir 表示上报的是内容发生变化的目录"""
+        now = time.monotonic()
+        with self._lock:
+            self.stats["events"] += 1
+            for path in paths:
+                subtree = self.subtree_of(base_dir, path, is_dir)
+                batch = self._pending.get(subtree)
+                if batch is None:
+                    batch = self._pending[subtree] = EventBatch(base_dir, subtree, first_event=now)
+                batch.event_count += 1
+                batch.last_event = now
+                if path in batch.paths:
+                    continue
+                if self._pending_paths >= self.max_pending_paths:
+                    if not batch.overflow:
+                        self.stats["overflows"] += 1
+                    batch.overflow = True
+                    continue
+                batch.paths.add(path)
+                self._pending_paths += 1
+            if self._timer_requested or self.loop is None or self.loop.is_closed():
+                return
+            self._timer_requested = True
+        self.loop.call_soon_threadsafe(self._arm, self.quiet_period)
+
+    def _arm(self, delay: float):
+        """在事件循环线程中设置下一次检查"""
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = self.loop.call_later(max(delay, 0.0), self._on_timer)
+
+    def _due_at(self, batch: EventBatch) -> float:
+        return min(batch.last_event + self.quiet_period, batch.first_event + self.max_delay)
+
+    def _on_timer(self):
+        self._timer = None
+        now = time.monotonic()
+        with self._lock:
+            due = [key for key, batch in self._pending.items() if self._due_at(batch) <= now]
+            batches = [self._pending.pop(key) for key in due]
+            self._pending_paths -= sum(len(batch.paths) for batch in batches)
+            if self._pending:
+                next_due = min(self._due_at(batch) for batch in self._pending.values())
+            else:
+                next_due = None
+                self._timer_requested = False
+        if next_due is not None:
+            self._arm(next_due - now)
+        for batch in batches:
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: EventBatch):
+        self.stats["flushes"] += 1
+        logger.debug(f"Flushing {batch.event_count} events for {batch.subtree}")
+        task = self.loop.create_task(self.on_flush(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def flush_all(self) -> List[EventBatch]:
+        """立即取出所有待提交批次（用于停止监听时）"""
+        with self._lock:
+            batches = list(self._pending.values())
+            self._pending.clear()
+            self._pending_paths = 0
+            self._timer_requested = False
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batches
+
+    def get_status(self) -> Dict:
+        with self._lock:
+            return {
+                "pending_subtrees": len(self._pending),
+                "pending_paths": self._pending_paths,
+                "max_pending_paths": self.max_pending_paths,
+                "quiet_period": self.quiet_period,
+                "max_delay": self.max_delay,
+                **self.stats
+            }
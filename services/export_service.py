@@ -0,0 +1,194 @@
+"""
+流式数据导出服务
+通过 MongoDB 游标按固定批次读取数据并逐批编码为 NDJSON / CSV / Parquet，
+配合 StreamingResponse 使用，导出任意大小的数据时内存占用保持不变。
+"""
+
+import io
+import csv
+import json
+import logging
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from bson import ObjectId
+
+from config import config
+from services.database import AnalysisResult, AnalysisResultFolder
+from models.paper import Paper
+from models.formula import Formula
+from models.trash import Trash
+from services.paper_search_service import PAPER_INTERNAL_FIELDS
+from utils.streaming import ChunkSink
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# 各数据集导出的列（CSV / Parquet 使用，NDJSON 输出完整记录）
+EXPORT_COLUMNS = {
+    "folders": ["source_type", "folder_name", "folder_path", "file_count"],
+    "files": ["source_type", "folder_name", "folder_path", "name", "path", "size", "type", "modified"],
+    "papers": ["id", "title", "source", "authors", "timestamp", "wordCount", "imageCount", "formulaCount",
+               "abstract", "file_path", "topics", "image", "type"],
+    "formulas": ["id", "title", "paperTitle", "image", "timestamp", "type"],
+    "trash": ["id", "title", "timestamp", "reason", "type"],
+}
+
+EXPORT_DATASETS = tuple(EXPORT_COLUMNS.keys())
+
+
+class ExportError(Exception):
+    """导出参数错误"""
+
+
+def _normalize(value: Any) -> Any:
+    """将 BSON 类型转换为可序列化的值"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def _flatten(value: Any) -> Any:
+    """CSV / Parquet 单元格：列表用分号连接，嵌套对象转为 JSON 字符串"""
+    if isinstance(value, list):
+        return ";".join(str(v) for v in value)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+class ExportService:
+    """流式导出服务"""
+
+    @staticmethod
+    def validate(dataset: str, fmt: str):
+        """校验数据集和格式，Parquet 需要安装 pyarrow"""
+        if dataset not in EXPORT_COLUMNS:
+            raise ExportError(f"不支持的数据集: {dataset}，可选: {', '.join(EXPORT_DATASETS)}")
+        if fmt not in EXPORT_FORMATS:
+            raise ExportError(f"不支持的导出格式: {fmt}，可选: {', '.join(EXPORT_FORMATS)}")
+        if fmt == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ExportError("Parquet 导出需要安装 pyarrow")
+
+    @staticmethod
+    async def _current_run_ids(source_type: Optional[str]) -> List[str]:
+        """获取当前生效的分析批次ID（只读取头文档的 run_id 字段）"""
+        query: Dict[str, Any] = {"run_id": {"$ne": None}}
+        if source_type:
+            query["source_type"] = source_type
+        cursor = AnalysisResult.get_motor_collection().find(query, projection={"_id": 0, "run_id": 1})
+        return [doc["run_id"] async for doc in cursor]
+
+    @staticmethod
+    async def iter_batches(dataset: str, source_type: Optional[str] = None,
+                           batch_size: Optional[int] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        按固定批次从数据库读取导出记录
+
+        Args:
+            dataset: 数据集 folders / files / papers / formulas / trash
+            source_type: 只导出指定数据源类型的分析结果（folders / files 有效）
+            batch_size: 每批记录数，默认读取配置 EXPORT_BATCH_SIZE
+        """
+        batch_size = batch_size or config.EXPORT_BATCH_SIZE
+
+        if dataset in ("folders", "files"):
+            run_ids = await ExportService._current_run_ids(source_type)
+            projection = {"_id": 0, "run_id": 0} if dataset == "files" else {"_id": 0, "run_id": 0, "files": 0}
+            # 每个数据源只有一个生效批次，按 (source_type, run_id, order) 排序与按 (source_type, order) 结果相同，
+            # 且可以直接使用该复合索引，不需要在内存中排序
+            cursor = AnalysisResultFolder.get_motor_collection().find(
+                {"run_id": {"$in": run_ids}}, projection=projection
+            ).sort([("source_type", 1), ("run_id", 1), ("order", 1)])
+        else:
+            model = {"papers": Paper, "formulas": Formula, "trash": Trash}[dataset]
+            # 论文的检索字段和去重签名只供内部使用，不导出
+            projection = {field: 0 for field in PAPER_INTERNAL_FIELDS} if dataset == "papers" else None
+            cursor = model.get_motor_collection().find({}, projection=projection).sort("_id", 1)
+        cursor = cursor.batch_size(batch_size)
+
+        batch: List[Dict[str, Any]] = []
+        async for doc in cursor:
+            doc = _normalize(doc)
+            if dataset == "files":
+                folder = {k: doc.get(k) for k in ("source_type", "folder_name", "folder_path")}
+                batch.extend({**folder, **f} for f in doc.get("files") or [])
+            else:
+                if "_id" in doc:
+                    doc["id"] = doc.pop("_id")
+                batch.append(doc)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    @staticmethod
+    async def stream(dataset: str, fmt: str, source_type: Optional[str] = None,
+                     batch_size: Optional[int] = None) -> AsyncIterator[bytes]:
+        """按指定格式编码导出数据，每批生成一段字节"""
+        ExportService.validate(dataset, fmt)
+        columns = EXPORT_COLUMNS[dataset]
+        batches = ExportService.iter_batches(dataset, source_type, batch_size)
+        total = 0
+
+        if fmt == "ndjson":
+            async for batch in batches:
+                total += len(batch)
+                yield "".join(json.dumps(row, ensure_ascii=False, default=str) + "\n" for row in batch).encode("utf-8")
+
+        elif fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            # 带 BOM，方便 Excel 识别 UTF-8
+            buffer.write("\ufeff")
+            writer.writerow(columns)
+            async for batch in batches:
+                total += len(batch)
+                for row in batch:
+                    writer.writerow([_flatten(row.get(col)) for col in columns])
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue().encode("utf-8")
+
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            schema = pa.schema([(col, pa.string()) for col in columns])
+            sink = ChunkSink()
+            writer = pq.ParquetWriter(sink, schema)
+            try:
+                async for batch in batches:
+                    total += len(batch)
+                    table = pa.Table.from_pylist(
+                        [{col: None if row.get(col) is None else str(_flatten(row.get(col))) for col in columns}
+                         for row in batch],
+                        schema=schema
+                    )
+                    writer.write_table(table)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            finally:
+                writer.close()
+            yield sink.drain()
+
+        logger.info(f"Exported {total} {dataset} records as {fmt}")
+
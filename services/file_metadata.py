@@ -0,0 +1,135 @@
+"""
+文件元数据缓存
+用 os.scandir 列出目录，每个文件只通过 DirEntry.stat() 获取一次大小和修改时间，
+按 (目录路径, 目录mtime) 缓存目录列表。目录有增删改名时 mtime 变化，缓存自动失效；
+对文件的原地修改不会改变目录 mtime，因此缓存另设有效期以限制数据陈旧的时间。
+所有方法都是同步阻塞的，应通过 async_fs 在线程池中调用。
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class FileMeta(NamedTuple):
+    """文件元数据"""
+    name: str
+    path: str
+    size: int
+    mtime: float
+
+
+class _DirListing(NamedTuple):
+    mtime_ns: int
+    loaded_at: float
+    files: Dict[str, FileMeta]
+    subdirs: List[str]
+
+
+class FileMetadataCache:
+    """基于 scandir 的目录列表缓存"""
+
+    def __init__(self, max_dirs: int = 20000, ttl: float = 300.0):
+        """
+        Args:
+            max_dirs: 最多缓存的目录数量，超出后按 LRU 淘汰
+            ttl: 缓存有效期(秒)
+        """
+        self.max_dirs = max_dirs
+        self.ttl = ttl
+        self._dirs: "OrderedDict[str, _DirListing]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def list_dir(self, dir_path: str) -> Tuple[Dict[str, FileMeta], List[str]]:
+        """
+        获取目录中的文件元数据和子目录
+
+        Returns:
+            (文件名 -> FileMeta, 子目录路径列表)
+        """
+        dir_mtime_ns = os.stat(dir_path).st_mtime_ns
+        now = time.monotonic()
+        with self._lock:
+            cached = self._dirs.get(dir_path)
+            if cached and cached.mtime_ns == dir_mtime_ns and now - cached.loaded_at < self.ttl:
+                self._dirs.move_to_end(dir_path)
+                self.hits += 1
+                return cached.files, cached.subdirs
+            self.misses += 1
+
+        files: Dict[str, FileMeta] = {}
+        subdirs: List[str] = []
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file():
+                        stat = entry.stat()
+                        files[entry.name] = FileMeta(entry.name, entry.path, stat.st_size, stat.st_mtime)
+                except OSError as e:
+                    logger.debug(f"Could not stat {entry.path}: {e}")
+
+        with self._lock:
+            self._dirs[dir_path] = _DirListing(dir_mtime_ns, now, files, subdirs)
+            self._dirs.move_to_end(dir_path)
+            while len(self._dirs) > self.max_dirs:
+                self._dirs.popitem(last=False)
+        return files, subdirs
+
+    def lookup(self, file_path: str) -> Optional[FileMeta]:
+        """
+        查询单个文件的元数据，文件不存在时返回 None。
+        同一目录下的文件共享一次目录列表，代替 exists + getsize + getmtime 三次 stat。
+        """
+        dir_path, name = os.path.split(file_path)
+        try:
+            files, _ = self.list_dir(dir_path or ".")
+        except OSError:
+            return None
+        return files.get(name)
+
+    def walk_files(self, root: str, extensions: Optional[Sequence[str]] = None) -> Iterator[FileMeta]:
+        """
+        递归遍历目录下的文件
+
+        Args:
+            root: 根目录
+            extensions: 只返回这些扩展名（小写，含点）的文件，None 表示全部
+        """
+        stack = [root]
+        while stack:
+            dir_path = stack.pop()
+            try:
+                files, subdirs = self.list_dir(dir_path)
+            except OSError as e:
+                logger.warning(f"Could not list directory {dir_path}: {e}")
+                continue
+            for meta in files.values():
+                if extensions is None or os.path.splitext(meta.name)[1].lower() in extensions:
+                    yield meta
+            stack.extend(reversed(subdirs))
+
+    def invalidate(self, dir_path: Optional[str] = None):
+        """清除指定目录（None 表示全部）的缓存"""
+        with self._lock:
+            if dir_path is None:
+                self._dirs.clear()
+            else:
+                self._dirs.pop(dir_path, None)
+
+    def get_stats(self) -> Dict[str, int]:
+        """缓存命中统计"""
+        with self._lock:
+            return {"cached_dirs": len(self._dirs), "hits": self.hits, "misses": self.misses}
+
+
+# 全局文件元数据缓存实例
+file_metadata = FileMetadataCache()
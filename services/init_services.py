@@ -2,7 +2,17 @@ import asyncio
 import logging
 from services.hourly_stats_service import HourlyStatsService
 from services.alert_service import AlertService
-from services.directory_monitor_service import start_directory_monitoring, stop_directory_monitoring
+from services.directory_monitor_service import start_directory_monitoring, stop_directory_monitoring, directory_monitor
+from services.task_notifier import task_notifier
+from services.progress_relay import progress_relay
+from services.async_fs import async_fs
+from services.pdf_text_service import pdf_text_service
+from services.paper_archive_service import paper_archive_service
+from services.pdf_feature_service import pdf_feature_service
+from services.paper_search_service import paper_search_service
+from services.readiness import readiness
+from services.leader_election import leader_election
+from services.database import Task
 # 导入配置
 from config import config
 
@@ -10,9 +20,31 @@ from config import config
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 后台任务的引用，防止任务对象被提前回收
+_background_tasks = set()
+# leader 运行的单例任务，失去 leader 身份时取消
+_singleton_tasks = set()
+
+
+def _run_in_background(coro, name: str):
+    """启动后台任务，失败时记录日志"""
+    def _done(task: asyncio.Task):
+        _background_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Background task {name} failed: {task.exception()}")
+
+    task = asyncio.create_task(coro, name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_done)
+    return task
+
 async def initialize_services():
     """初始化所有服务"""
     logger.info("Initializing services...")
+    readiness.register("services")
+
+    # 监控事件循环阻塞时间
+    await async_fs.start_loop_monitor()
 
     # 初始化HourlyStatsService
     await HourlyStatsService.initialize()
@@ -20,27 +52,85 @@ async def initialize_services():
     # 初始化AlertService
     await AlertService.initialize()
 
-    # 初始化目录监听服务
+    # 监听任务完成事件（跨进程通过 Change Stream）
+    try:
+        await task_notifier.start_watching(Task.get_motor_collection())
+    except Exception as e:
+        logger.error(f"Failed to start task completion watcher: {e}")
+
+    # 多 worker 时把本 worker 的进度事件转发给其他 worker 的 SSE / WebSocket 订阅者
+    if config.SHARED_STATE_BACKEND == "mongo":
+        try:
+            await progress_relay.start(Task.get_motor_collection().database)
+        except Exception as e:
+            logger.error(f"Failed to start progress relay: {e}")
+
+    # 目录监听等单例任务只在 leader worker 上运行，其他 worker 待命
+    readiness.register("directory_monitor", required=config.READINESS_REQUIRE_MONITOR)
+    await leader_election.start(on_elected=_start_singleton_jobs, on_revoked=_stop_singleton_jobs)
+    if not leader_election.is_leader:
+        readiness.mark_ready("directory_monitor", role="standby")
+
+    readiness.mark_ready("services")
+    logger.info("Services initialized successfully")
+
+async def _start_singleton_jobs():
+    """成为 leader 后启动单例任务"""
+    # 初始化目录监听服务：扫描大目录耗时较长，在后台执行，不阻塞应用启动
+    _singleton_tasks.add(_run_in_background(_bootstrap_directory_monitor(), "directory_monitor_bootstrap"))
+
+    # 为升级前导入的论文补充检索字段，不阻塞启动
+    _singleton_tasks.add(_run_in_background(paper_search_service.backfill(), "paper_search_backfill"))
+
+async def _stop_singleton_jobs():
+    """失去 leader 身份后停止单例任务，由新的 leader 接手"""
+    for task in _singleton_tasks:
+        task.cancel()
+    _singleton_tasks.clear()
+    await stop_directory_monitoring()
+    readiness.mark_ready("directory_monitor", role="standby", directories={})
+
+async def _bootstrap_directory_monitor():
+    """后台启动目录监听，完成后登记就绪状态"""
+    readiness.mark_running("directory_monitor", role="leader")
     try:
         # 从配置文件读取监听目录
         monitor_dirs = config.MONITOR_DIRS
         await start_directory_monitoring(monitor_dirs)
-        logger.info("Directory monitoring service started successfully")
+        status = directory_monitor.bootstrap_status
+        failed = [path for path, state in status.items() if state == "failed"]
+        if failed:
+            readiness.mark_failed("directory_monitor", f"Failed to monitor: {', '.join(failed)}", directories=status.copy())
+        else:
+            readiness.mark_ready("directory_monitor", directories=status.copy())
     except Exception as e:
-        logger.error(f"Failed to start directory monitoring service: {e}")
-
-    logger.info("Services initialized successfully")
+        readiness.mark_failed("directory_monitor", str(e))
 
 async def cleanup_services():
     """清理所有服务"""
     logger.info("Cleaning up services...")
 
-    # 停止目录监听服务
+    # 退出 leader 选举：是 leader 时先停止目录监听等单例任务再释放租约，其他 worker 可立即接手
     try:
-        await stop_directory_monitoring()
-        logger.info("Directory monitoring service stopped successfully")
+        await leader_election.stop()
+        logger.info("Singleton jobs stopped successfully")
     except Exception as e:
-        logger.error(f"Failed to stop directory monitoring service: {e}")
+        logger.error(f"Failed to stop singleton jobs: {e}")
+
+    # 取消未完成的后台任务
+    for task in list(_background_tasks):
+        task.cancel()
+
+    # 停止任务完成事件监听和进度转发
+    await task_notifier.stop_watching()
+    await progress_relay.stop()
+
+    # 停止事件循环监控并关闭文件系统线程池
+    await async_fs.stop_loop_monitor()
+    async_fs.shutdown()
+    pdf_text_service.shutdown()
+    paper_archive_service.shutdown()
+    pdf_feature_service.shutdown()
 
     logger.info("Services cleanup completed")
 
@@ -0,0 +1,72 @@
+"""
+inotify watch 预算
+递归监听时每个子目录占用一个 inotify watch，总数受 fs.inotify.max_user_watches 限制（按用户计算，
+同一用户的其他进程共享该上限）。监听前按目录数量规划：预算足够时整棵树使用 inotify，
+否则只对最近有变化的一级子目录（热子树）使用 inotify，其余目录（冷子树）改为轮询。
+"""
+
+import os
+import logging
+from typing import List, Optional, Tuple
+
+from config import config
+from services.directory_poller import DirNode
+
+logger = logging.getLogger(__name__)
+
+MAX_USER_WATCHES_FILE = "/proc/sys/fs/inotify/max_user_watches"
+
+
+def read_max_user_watches(path: str = MAX_USER_WATCHES_FILE) -> Optional[int]:
+    """读取系统的 inotify watch 上限，非 Linux 或无法读取时返回 None"""
+    try:
+        with open(path, "r") as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def watch_budget() -> Tuple[Optional[int], int]:
+    """
+    本服务可使用的 watch 数量
+
+    Returns:
+        (系统上限, 预算)；MONITOR_MAX_WATCHES 大于0时直接使用，否则为系统上限乘以 MONITOR_WATCH_BUDGET_RATIO
+    """
+    limit = read_max_user_watches()
+    if config.MONITOR_MAX_WATCHES > 0:
+        return limit, config.MONITOR_MAX_WATCHES
+    if limit is None:
+        # 无法读取上限（非 Linux），不做限制
+        return None, 2 ** 31 - 1
+    return limit, int(limit * config.MONITOR_WATCH_BUDGET_RATIO)
+
+
+def _newest_mtime(node: DirNode) -> int:
+    return max([node.mtime_ns] + [_newest_mtime(child) for child in node.children.values()])
+
+
+def plan_hot_subtrees(base_dir: str, tree: DirNode, budget: int) -> Tuple[List[str], int]:
+    """
+    在预算内选择使用 inotify 的一级子目录，最近有变化的优先
+
+    Args:
+        base_dir: 监听目录
+        tree: 监听目录的指纹树
+        budget: 可用的 watch 数量
+
+    Returns:
+        (热子树路径列表, 占用的 watch 数量)；根目录本身非递归监听占用 1 个 watch
+    """
+    if budget < 1:
+        return [], 0
+    candidates = sorted(
+        ((_newest_mtime(child), child.total_dirs(), name) for name, child in tree.children.items()),
+        reverse=True
+    )
+    hot, used = [], 1
+    for _, directories, name in candidates:
+        if used + directories <= budget:
+            hot.append(os.path.join(base_dir, name))
+            used += directories
+    return hot, used
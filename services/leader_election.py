@@ -0,0 +1,125 @@
+"""
+Leader 选举
+目录监听、自动分析等单例任务在多个 worker 中只能运行一份。
+各 worker 定期尝试获取同一个租约，持有租约的 worker 为 leader 并运行单例任务；
+leader 退出或失联后租约过期，其他 worker 在下一轮接手。
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from config import config
+from services.shared_state import SharedState, shared_state, worker_id
+
+logger = logging.getLogger(__name__)
+
+Callback = Callable[[], Awaitable[None]]
+
+
+class LeaderElection:
+    """基于共享状态租约的 leader 选举"""
+
+    def __init__(self, name: str, lease_seconds: Optional[float] = None, state: Optional[SharedState] = None):
+        """
+        Args:
+            name: 选举名称，同名的 worker 竞争同一个租约
+            lease_seconds: 租约时长，leader 每隔 1/3 时长续期一次
+        """
+        self.name = name
+        self.lease_seconds = lease_seconds or config.LEADER_LEASE_SECONDS
+        self._state = state
+        self.is_leader = False
+        self.elected_at: Optional[float] = None
+        self._last_renewed = 0.0
+        self._on_elected: Optional[Callback] = None
+        self._on_revoked: Optional[Callback] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def key(self) -> str:
+        return f"leader:{self.name}"
+
+    @property
+    def state(self) -> SharedState:
+        return self._state or shared_state
+
+    async def start(self, on_elected: Callback, on_revoked: Callback):
+        """
+        开始参与选举。首轮在返回前完成，调用方随即可以根据 is_leader 判断角色
+
+        Args:
+            on_elected: 成为 leader 时调用，用于启动单例任务
+            on_revoked: 失去 leader 身份时调用，用于停止单例任务
+        """
+        self._on_elected = on_elected
+        self._on_revoked = on_revoked
+        await self._campaign()
+        self._task = asyncio.create_task(self._run(), name=f"leader_election:{self.name}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            await self._campaign()
+
+    async def _campaign(self):
+        """获取或续期租约，并在角色变化时调用回调"""
+        try:
+            acquired = await self.state.acquire(self.key, worker_id(), self.lease_seconds)
+        except Exception as e:
+            logger.warning(f"Leader election '{self.name}' failed to reach shared state: {e}")
+            # 无法续期且租约可能已过期时，主动放弃 leader 身份，避免与新 leader 同时运行
+            acquired = self.is_leader and time.monotonic() - self._last_renewed < self.lease_seconds
+        else:
+            if acquired:
+                self._last_renewed = time.monotonic()
+
+        if acquired and not self.is_leader:
+            self.is_leader = True
+            self.elected_at = time.time()
+            logger.info(f"Worker {worker_id()} elected leader for '{self.name}'")
+            await self._call(self._on_elected)
+        elif not acquired and self.is_leader:
+            self.is_leader = False
+            self.elected_at = None
+            logger.warning(f"Worker {worker_id()} lost leadership for '{self.name}'")
+            await self._call(self._on_revoked)
+
+    async def _call(self, callback: Optional[Callback]):
+        if callback is None:
+            return
+        try:
+            await callback()
+        except Exception as e:
+            logger.error(f"Leader election '{self.name}' callback failed: {e}")
+
+    async def stop(self):
+        """退出选举，是 leader 时先停止单例任务再释放租约，其他 worker 可立即接手"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self.is_leader:
+            self.is_leader = False
+            await self._call(self._on_revoked)
+            try:
+                await self.state.release(self.key, worker_id())
+            except Exception as e:
+                logger.warning(f"Failed to release leadership for '{self.name}': {e}")
+
+    async def get_status(self) -> Dict[str, Any]:
+        try:
+            leader = await self.state.holder(self.key)
+        except Exception as e:
+            logger.warning(f"Failed to read leader for '{self.name}': {e}")
+            leader = None
+        return {
+            "worker_id": worker_id(),
+            "is_leader": self.is_leader,
+            "leader": leader,
+            "elected_at": self.elected_at
+        }
+
+
+# 单例任务（目录监听、自动分析触发、检索字段回填）的 leader 选举
+leader_election = LeaderElection("singleton_jobs")
@@ -0,0 +1,180 @@
+"""
+论文批量打包下载服务
+按ID列表或筛选条件选出论文，边读取边写入 ZIP 并流式返回，不生成临时文件。
+每篇论文可以同时打包 pdf / txt / json 三种格式，压缩包末尾附带 manifest.json 记录每篇论文的打包结果。
+"""
+
+import os
+import re
+import json
+import time
+import zipfile
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from bson import ObjectId
+
+from config import config
+from models.paper import Paper
+from services.pdf_text_service import pdf_text_service
+from services.text_cache import text_cache
+from utils.async_iter import iterate_in_thread
+from utils.streaming import ChunkSink
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FORMATS = ("pdf", "txt", "json")
+ARCHIVE_CHUNK_SIZE = 64 * 1024
+# 已压缩的 PDF 直接存储，文本和元数据使用 deflate 压缩
+_COMPRESSION = {"pdf": zipfile.ZIP_STORED, "txt": zipfile.ZIP_DEFLATED, "json": zipfile.ZIP_DEFLATED}
+# 论文元数据中导出到 json / manifest 的字段
+_METADATA_FIELDS = ("title", "authors", "abstract", "source", "timestamp", "wordCount", "imageCount",
+                    "formulaCount", "topics", "type", "file_path")
+
+
+def safe_filename(title: str, fallback: str, max_length: int = 50) -> str:
+    """清理文件名，只保留字母数字、空格、连字符和下划线"""
+    name = "".join(c for c in title if c.isalnum() or c in (" ", "-", "_")).rstrip()
+    return name[:max_length] or fallback
+
+
+class PaperArchiveService:
+    """论文批量打包下载"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or config.ARCHIVE_MAX_CONCURRENT
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """懒加载线程池，线程数即同时进行的打包任务上限，超出的请求排队"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="paper-archive")
+        return self._executor
+
+    @staticmethod
+    def build_query(ids: Optional[List[str]] = None, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        根据ID列表或筛选条件构造查询
+
+        Args:
+            ids: 论文ID列表，优先于筛选条件
+            filters: 筛选条件，支持 type、source、keyword（标题关键字）
+        """
+        if ids:
+            return {"_id": {"$in": [ObjectId(i) for i in ids if ObjectId.is_valid(i)]}}
+        filters = filters or {}
+        query: Dict[str, Any] = {"type": filters.get("type") or "valid"}
+        if filters.get("source"):
+            query["source"] = filters["source"]
+        if filters.get("keyword"):
+            query["title"] = {"$regex": re.escape(filters["keyword"]), "$options": "i"}
+        return query
+
+    @staticmethod
+    async def collect_papers(query: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+        """读取待打包论文的元数据（不含文件内容），数量受 limit 限制"""
+        projection = {field: 1 for field in _METADATA_FIELDS}
+        cursor = Paper.get_motor_collection().find(query, projection=projection).sort("_id", 1).limit(limit)
+        papers = []
+        async for doc in cursor:
+            doc["id"] = str(doc.pop("_id"))
+            papers.append(doc)
+        return papers
+
+    @staticmethod
+    def _iter_file(path: str) -> Iterator[bytes]:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(ARCHIVE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    @staticmethod
+    def _read_text(path: str) -> bytes:
+        """
+        论文文本：优先读取文本缓存，未命中时逐页提取并写入缓存，提取受 PDF_EXTRACT_WORKERS 限制。
+        先读出全部文本再写入 ZIP 条目，中途失败时不会留下被截断的条目。
+        """
+        cached = text_cache.lookup(path)
+        if cached:
+            return b"".join(text_cache.iter_decompressed(cached))
+        pages = text_cache.tee(path, pdf_text_service.extract_text_sync(path))
+        return "".join(pages).encode("utf-8")
+
+    @staticmethod
+    def iter_zip(papers: List[Dict[str, Any]], formats: List[str]) -> Iterator[bytes]:
+        """
+        同步生成 ZIP 数据（在工作线程中执行）。ZIP 写入不可 seek 的输出流，
+        每写入一块数据就取出返回，内存中最多保留一个数据块。
+        """
+        sink = ChunkSink()
+        manifest = {
+            "generated_at": datetime.now().isoformat(),
+            "formats": formats,
+            "count": len(papers),
+            "papers": []
+        }
+        used_names = set()
+        started = time.perf_counter()
+
+        with zipfile.ZipFile(sink, mode="w", allowZip64=True) as zf:
+            for paper in papers:
+                base = safe_filename(paper.get("title") or "", f"paper_{paper['id']}")
+                if base in used_names:
+                    base = f"{base}_{paper['id']}"
+                used_names.add(base)
+
+                entry = {"id": paper["id"], "title": paper.get("title"), "files": [], "errors": []}
+                file_path = paper.get("file_path")
+                for fmt in formats:
+                    arcname = f"{base}.{fmt}"
+                    try:
+                        if fmt == "json":
+                            metadata = {"id": paper["id"], **{k: paper.get(k) for k in _METADATA_FIELDS}}
+                            chunks: Iterator[bytes] = iter([json.dumps(metadata, ensure_ascii=False, indent=2).encode("utf-8")])
+                        elif not file_path or not os.path.isfile(file_path):
+                            raise FileNotFoundError("论文文件不存在")
+                        elif fmt == "pdf":
+                            if not file_path.lower().endswith(".pdf"):
+                                raise ValueError("原文件不是PDF格式")
+                            chunks = PaperArchiveService._iter_file(file_path)
+                        else:
+                            chunks = iter([PaperArchiveService._read_text(file_path)])
+
+                        info = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+                        info.compress_type = _COMPRESSION[fmt]
+                        with zf.open(info, mode="w", force_zip64=True) as dest:
+                            for chunk in chunks:
+                                dest.write(chunk)
+                                if sink.pending >= ARCHIVE_CHUNK_SIZE:
+                                    yield sink.drain()
+                        entry["files"].append(arcname)
+                    except Exception as e:
+                        logger.warning(f"打包论文 {paper['id']} 的 {fmt} 失败: {e}")
+                        entry["errors"].append({"format": fmt, "error": str(e)})
+                    if sink.pending:
+                        yield sink.drain()
+                manifest["papers"].append(entry)
+
+            zf.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2, default=str),
+                        compress_type=zipfile.ZIP_DEFLATED)
+        yield sink.drain()
+        logger.info(f"Archived {len(papers)} papers ({', '.join(formats)}) in {time.perf_counter() - started:.2f}s")
+
+    def stream(self, papers: List[Dict[str, Any]], formats: List[str]) -> AsyncIterator[bytes]:
+        """在打包线程池中生成 ZIP，以异步迭代器返回"""
+        return iterate_in_thread(lambda: self.iter_zip(papers, formats), self.executor, maxsize=8)
+
+    def shutdown(self):
+        """关闭线程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# 全局论文打包服务实例
+paper_archive_service = PaperArchiveService()
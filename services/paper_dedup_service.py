@@ -0,0 +1,109 @@
+"""
+论文近似去重服务
+对论文首页文本计算 MinHash 签名，签名的 LSH 桶键保存在 Paper.lsh_bands 并建立索引，
+导入时只需按桶键查询少量候选论文再比较签名，不需要与全部论文逐一比较。
+判定为重复的文件写入 Trash 并记录原因。
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import config
+from models.paper import Paper
+from models.trash import Trash
+from services.async_fs import async_fs
+from utils.minhash import MinHasher
+
+logger = logging.getLogger(__name__)
+
+
+class PaperDedupService:
+    """基于 MinHash/LSH 的论文近似去重"""
+
+    def __init__(self, num_perm: Optional[int] = None, bands: Optional[int] = None, threshold: Optional[float] = None):
+        self.hasher = MinHasher(num_perm or config.DEDUP_NUM_PERM, bands or config.DEDUP_BANDS)
+        self.threshold = threshold if threshold is not None else config.DEDUP_THRESHOLD
+
+    def signature(self, text: str) -> Tuple[Optional[List[int]], List[str]]:
+        """计算签名和桶键（同步实现，CPU 密集，应在线程池中执行）"""
+        signature = self.hasher.signature(text or "")
+        if signature is None:
+            return None, []
+        return signature, self.hasher.band_keys(signature)
+
+    async def find_duplicate(self, signature: List[int], bands: List[str]) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        查找与签名近似重复的已有论文
+
+        Returns:
+            (论文文档, 相似度)，没有重复时返回 None
+        """
+        best = None
+        cursor = Paper.get_motor_collection().find(
+            {"lsh_bands": {"$in": bands}},
+            projection={"title": 1, "file_path": 1, "minhash": 1}
+        )
+        async for doc in cursor:
+            similarity = self.hasher.similarity(signature, doc.get("minhash") or [])
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (doc, similarity)
+        return best
+
+    @staticmethod
+    async def is_known_file(file_path: str) -> bool:
+        """文件是否已经导入为论文或已被判定为废弃数据"""
+        if await Paper.get_motor_collection().find_one({"file_path": file_path}, projection={"_id": 1}):
+            return True
+        return bool(await Trash.get_motor_collection().find_one({"file_path": file_path}, projection={"_id": 1}))
+
+    @staticmethod
+    async def move_to_trash(title: str, file_path: str, duplicate: Dict[str, Any], similarity: float) -> Trash:
+        """将重复文件记录到废弃数据"""
+        trash = Trash(
+            title=title,
+            timestamp=datetime.now().isoformat(),
+            reason=f"与论文《{duplicate.get('title')}》内容重复（相似度 {similarity:.2f}）",
+            file_path=file_path,
+            duplicate_of=str(duplicate["_id"])
+        )
+        await trash.insert()
+        logger.info(f"重复论文已移入废弃数据: {file_path} -> {duplicate.get('file_path')}")
+        return trash
+
+    async def backfill(self, batch_size: int = 50) -> int:
+        """
+        为没有签名的已有论文补算签名，保证去重覆盖升级前导入的论文
+
+        Returns:
+            补算的论文数量
+        """
+        from services.auto_paper_import_service import AutoPaperImportService
+
+        collection = Paper.get_motor_collection()
+        count = 0
+        while True:
+            docs = await collection.find(
+                {"minhash": None, "file_path": {"$nin": [None, ""]}},
+                projection={"file_path": 1}
+            ).limit(batch_size).to_list(length=batch_size)
+            if not docs:
+                break
+            for doc in docs:
+                text = ""
+                if await async_fs.exists(doc["file_path"]):
+                    text = await async_fs.run(AutoPaperImportService.first_page_text, doc["file_path"])
+                signature, bands = await async_fs.run(self.signature, text)
+                # 无法计算签名的论文记为空列表，避免重复处理
+                await collection.update_one(
+                    {"_id": doc["_id"]},
+                    {"$set": {"minhash": signature or [], "lsh_bands": bands}}
+                )
+                count += 1
+        if count:
+            logger.info(f"已为 {count} 篇论文补算 MinHash 签名")
+        return count
+
+
+# 全局论文去重服务实例
+paper_dedup_service = PaperDedupService()
@@ -0,0 +1,124 @@
+"""
+论文全文检索服务
+MongoDB 文本索引按空白和标点切词，不能切分中文，且默认的英文词干处理会影响中文以外的语言。
+因此导入时预先分词：英文和数字按单词、中日韩文字按相邻两字（bigram）切分，
+结果以空格拼接保存在 search_title / search_abstract 字段，文本索引使用 default_language none，
+查询时用同样的规则分词，按 textScore 排序返回。
+"""
+
+import re
+import time
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from models.paper import Paper
+
+logger = logging.getLogger(__name__)
+
+# 不返回给前端的内部字段
+PAPER_INTERNAL_FIELDS = ("minhash", "lsh_bands", "search_title", "search_abstract")
+
+_TOKEN = re.compile(r"[a-z0-9]+|[㐀-䶿一-鿿豈-﫿぀-ヿ가-힯]+")
+_CJK_RUN = re.compile(r"[㐀-䶿一-鿿豈-﫿぀-ヿ가-힯]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """分词：英文和数字按单词（小写），中日韩文字按 bigram，单字保留为一个词"""
+    tokens = []
+    for match in _TOKEN.finditer((text or "").lower()):
+        token = match.group()
+        if _CJK_RUN.fullmatch(token):
+            if len(token) == 1:
+                tokens.append(token)
+            else:
+                tokens.extend(token[i:i + 2] for i in range(len(token) - 1))
+        else:
+            tokens.append(token)
+    return tokens
+
+
+def search_fields(title: Optional[str], abstract: Optional[str]) -> Dict[str, str]:
+    """生成论文的检索字段"""
+    return {
+        "search_title": " ".join(tokenize(title)),
+        "search_abstract": " ".join(tokenize(abstract))
+    }
+
+
+class PaperSearchService:
+    """基于 MongoDB 文本索引的论文检索"""
+
+    @staticmethod
+    def _to_result(doc: Dict[str, Any]) -> Dict[str, Any]:
+        doc["id"] = str(doc.pop("_id"))
+        doc["score"] = round(doc.pop("score", 0.0), 4)
+        doc.setdefault("topics", [])
+        doc.setdefault("authors", [])
+        return doc
+
+    async def search(self, q: str, page: int = 1, page_size: int = 10,
+                     filters: Optional[Dict[str, Any]] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        检索有效论文，按相关度排序
+
+        Args:
+            q: 查询文本
+            page: 页码，从1开始
+            page_size: 每页数量
+            filters: 额外的MongoDB查询条件（如 {"source": "arxiv"}）
+
+        Returns:
+            (论文列表, 命中总数)
+        """
+        tokens = tokenize(q)
+        if not tokens:
+            return [], 0
+
+        query = {"$text": {"$search": " ".join(dict.fromkeys(tokens))}, "type": "valid"}
+        if filters:
+            query.update(filters)
+        projection = {field: 0 for field in PAPER_INTERNAL_FIELDS}
+        projection["score"] = {"$meta": "textScore"}
+
+        started = time.perf_counter()
+        collection = Paper.get_motor_collection()
+        total = await collection.count_documents(query)
+        cursor = collection.find(query, projection=projection) \
+            .sort([("score", {"$meta": "textScore"})]) \
+            .skip((page - 1) * page_size) \
+            .limit(page_size)
+        papers = [self._to_result(doc) async for doc in cursor]
+        logger.debug(f"论文检索 '{q}': {total} 条结果, 耗时 {(time.perf_counter() - started) * 1000:.1f}ms")
+        return papers, total
+
+    @staticmethod
+    async def backfill(batch_size: int = 500) -> int:
+        """
+        为没有检索字段的论文补充分词结果（升级前导入的论文）
+
+        Returns:
+            更新的论文数量
+        """
+        collection = Paper.get_motor_collection()
+        count = 0
+        while True:
+            docs = await collection.find(
+                {"search_title": None},
+                projection={"title": 1, "abstract": 1}
+            ).limit(batch_size).to_list(length=batch_size)
+            if not docs:
+                break
+            await collection.bulk_write([
+                UpdateOne({"_id": doc["_id"]}, {"$set": search_fields(doc.get("title"), doc.get("abstract"))})
+                for doc in docs
+            ], ordered=False)
+            count += len(docs)
+        if count:
+            logger.info(f"已为 {count} 篇论文生成检索字段")
+        return count
+
+
+# 全局论文检索服务实例
+paper_search_service = PaperSearchService()
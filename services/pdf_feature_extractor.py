@@ -0,0 +1,134 @@
+"""
+PDF 特征提取（在子进程中执行）
+逐页统计字数、图片数，并识别类似公式的文本区域。
+本模块只依赖 PyMuPDF 和标准库，子进程以 spawn 方式启动时导入开销小。
+"""
+
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+# 提取算法版本，算法变化后递增，已处理的论文会被重新提取
+FEATURE_VERSION = 2
+
+# 每篇论文最多保存的公式区域数量（formulaCount 仍统计全部）
+MAX_FORMULAS_PER_PAPER = 500
+
+_LATIN_WORD = re.compile(r"[A-Za-z0-9]+(?:['’\-][A-Za-z0-9]+)*")
+_CJK_CHAR = re.compile(r"[㐀-䶿一-鿿豈-﫿]")
+
+_MATH_FONT_HINTS = ("cmmi", "cmsy", "cmex", "msbm", "msam", "math", "symbol", "stix", "mtextra")
+_MATH_CHARS = set(
+    "=+−×÷±∓∑∏∫∮∂∇√∞≈≡≠≤≥≪≫∝∈∉∋⊂⊃⊆⊇∪∩∧∨¬∀∃→←↔⇒⇐⇔↦"
+    "αβγδεζηθϑικλμνξπϖρϱσςτυφϕχψωΓΔΘΛΞΠΣΥΦΨΩ^_|"
+)
+
+
+def count_words(text: str) -> int:
+    """字数统计：英文按单词计，中日韩文字按字计"""
+    return len(_LATIN_WORD.findall(text)) + len(_CJK_CHAR.findall(text))
+
+
+def is_formula_line(spans: List[Dict[str, Any]], text: str) -> bool:
+    """
+    判断一行文本是否像公式：大部分字符使用数学字体，或数学符号占比较高且包含关系符号
+    """
+    stripped = text.replace(" ", "")
+    if len(stripped) < 3:
+        return False
+    math_font_chars = sum(
+        len(span.get("text", "").replace(" ", ""))
+        for span in spans
+        if any(hint in span.get("font", "").lower() for hint in _MATH_FONT_HINTS)
+    )
+    if math_font_chars / len(stripped) >= 0.5:
+        return True
+    symbols = sum(1 for c in stripped if c in _MATH_CHARS)
+    has_relation = any(c in stripped for c in "=≈≡≠≤≥∝")
+    return has_relation and symbols >= 2 and symbols / len(stripped) >= 0.15
+
+
+def extract_page_features(page) -> Dict[str, Any]:
+    """提取单页特征"""
+    words = 0
+    formulas: List[Dict[str, Any]] = []
+    content = page.get_text("dict")
+    for block in content.get("blocks", []):
+        if block.get("type") != 0:
+            continue
+        region = None
+        for line in block.get("lines", []):
+            spans = line.get("spans", [])
+            text = "".join(span.get("text", "") for span in spans)
+            words += count_words(text)
+            if is_formula_line(spans, text):
+                # 同一文本块中相邻的公式行合并为一个区域
+                if region is None:
+                    region = {"bbox": list(line["bbox"]), "content": text.strip()}
+                else:
+                    x0, y0, x1, y1 = region["bbox"]
+                    lx0, ly0, lx1, ly1 = line["bbox"]
+                    region["bbox"] = [min(x0, lx0), min(y0, ly0), max(x1, lx1), max(y1, ly1)]
+                    region["content"] += "\n" + text.strip()
+            elif region is not None:
+                formulas.append(region)
+                region = None
+        if region is not None:
+            formulas.append(region)
+
+    return {
+        "words": words,
+        "images": len(page.get_images(full=True)),
+        "formulas": formulas
+    }
+
+
+def extract_pdf_features(file_path: str, thumbnails: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    提取整篇 PDF 的特征
+
+    Args:
+        file_path: PDF 文件路径
+        thumbnails: 需要同时渲染缩略图时传入 {"cache_dir", "width"}，渲染首页缩略图和每个公式区域截图
+
+    Returns:
+        {"pages", "wordCount", "imageCount", "formulaCount", "image",
+         "formulas": [{"page", "bbox", "content", "image"}], "elapsed"}
+    """
+    import fitz  # PyMuPDF
+    from services.thumbnail_renderer import render_page_thumbnail, render_region
+
+    started = time.perf_counter()
+    word_count = 0
+    image_count = 0
+    formula_count = 0
+    formulas: List[Dict[str, Any]] = []
+    thumbnail = None
+
+    doc = fitz.open(file_path)
+    try:
+        page_count = doc.page_count
+        for page_number, page in enumerate(doc, start=1):
+            features = extract_page_features(page)
+            word_count += features["words"]
+            image_count += features["images"]
+            formula_count += len(features["formulas"])
+            if thumbnails and page_number == 1:
+                thumbnail = render_page_thumbnail(page, thumbnails["width"], thumbnails["cache_dir"])
+            for region in features["formulas"]:
+                if len(formulas) < MAX_FORMULAS_PER_PAPER:
+                    if thumbnails:
+                        region["image"] = render_region(page, region["bbox"], thumbnails["cache_dir"])
+                    formulas.append({"page": page_number, **region})
+    finally:
+        doc.close()
+
+    return {
+        "pages": page_count,
+        "wordCount": word_count,
+        "imageCount": image_count,
+        "formulaCount": formula_count,
+        "image": thumbnail,
+        "formulas": formulas,
+        "elapsed": time.perf_counter() - started
+    }
@@ -0,0 +1,237 @@
+"""
+PDF 特征提取服务
+在进程池中并行提取论文的字数、图片数和公式区域，更新 Paper 的统计字段并写入 Formula，
+同时渲染首页缩略图和公式截图，文档中保存图片 URL。
+按文件指纹增量运行：文件未变化且提取算法版本未变的论文会被跳过。
+"""
+
+import time
+import asyncio
+import logging
+import multiprocessing
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from bson import ObjectId
+
+from config import config
+from models.paper import Paper
+from models.formula import Formula
+from services.async_fs import async_fs
+from services.distributed_lock import DistributedLock, LockHandle
+from services.file_metadata import file_metadata
+from services.pdf_feature_extractor import FEATURE_VERSION, extract_pdf_features
+from services.thumbnail_service import thumbnail_service
+
+logger = logging.getLogger(__name__)
+
+
+class PdfFeatureService:
+    """论文特征提取"""
+
+    def __init__(self, max_workers: Optional[int] = None, scan_batch_size: int = 200):
+        self.max_workers = max_workers or config.FEATURE_EXTRACT_WORKERS
+        self.scan_batch_size = scan_batch_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._run_lock = asyncio.Lock()
+        # 多个 worker 之间同一时间也只运行一轮
+        self._cluster_lock = DistributedLock("pdf_features")
+        # 后台运行的提取任务的引用，防止任务对象被提前回收
+        self._background_tasks: Set[asyncio.Task] = set()
+        self.last_run: Dict[str, Any] = {}
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        """懒加载进程池"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    @staticmethod
+    def _fingerprints(docs: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Optional[str]]]:
+        """计算论文文件的指纹，文件不存在时为 None（同步实现，在文件系统线程池中执行）"""
+        results = []
+        for doc in docs:
+            meta = file_metadata.lookup(doc["file_path"])
+            fingerprint = f"v{FEATURE_VERSION}:{meta.size}:{meta.mtime}" if meta else None
+            results.append((doc, fingerprint))
+        return results
+
+    async def _pending_papers(self) -> AsyncIterator[Tuple[Dict[str, Any], str]]:
+        """
+        遍历需要提取特征的论文：PDF 文件存在，且指纹与上次提取时不同。
+        按 _id 分批查询，每批是一次独立的短查询，提取期间不会长时间占用游标。
+        """
+        collection = Paper.get_motor_collection()
+        query: Dict[str, Any] = {"file_path": {"$regex": r"\.pdf$", "$options": "i"}}
+        projection = {"title": 1, "file_path": 1, "feature_fingerprint": 1}
+        last_id = None
+        while True:
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            batch = await collection.find(query, projection=projection).sort("_id", 1).to_list(self.scan_batch_size)
+            if not batch:
+                return
+            last_id = batch[-1]["_id"]
+            for doc, fingerprint in await async_fs.run(self._fingerprints, batch):
+                if fingerprint and doc.get("feature_fingerprint") != fingerprint:
+                    yield doc, fingerprint
+            if len(batch) < self.scan_batch_size:
+                return
+
+    @staticmethod
+    async def _save_features(doc: Dict[str, Any], fingerprint: str, features: Dict[str, Any]):
+        """保存提取结果：更新论文统计字段，替换该论文的公式记录"""
+        paper_id = str(doc["_id"])
+        await Paper.get_motor_collection().update_one({"_id": doc["_id"]}, {"$set": {
+            "wordCount": features["wordCount"],
+            "imageCount": features["imageCount"],
+            "formulaCount": features["formulaCount"],
+            "pageCount": features["pages"],
+            "image": thumbnail_service.url("papers", paper_id, features.get("image")),
+            "feature_fingerprint": fingerprint
+        }})
+        await Formula.find(Formula.paper_id == paper_id).delete()
+        if features["formulas"]:
+            now = datetime.now().isoformat()
+            title = doc.get("title") or paper_id
+            formulas = []
+            for idx, region in enumerate(features["formulas"], start=1):
+                # 预先生成ID，图片 URL 中需要包含公式ID
+                formula_id = ObjectId()
+                formulas.append(Formula(
+                    id=formula_id,
+                    title=f"{title} - 公式{idx}",
+                    paperTitle=title,
+                    image=thumbnail_service.url("formulas", str(formula_id), region.get("image")),
+                    timestamp=now,
+                    paper_id=paper_id,
+                    page=region["page"],
+                    bbox=region["bbox"],
+                    content=region["content"]
+                ))
+            await Formula.insert_many(formulas)
+
+    async def process_pending(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        对新增或变化的论文提取特征，同一时间只运行一轮
+
+        Args:
+            limit: 本轮最多处理的论文数量，None 表示全部
+
+        Returns:
+            本轮统计：论文数、页数、失败数、耗时、每秒页数；其他 worker 正在提取时为 {"skipped": True}
+        """
+        async with self._run_lock:
+            lock = await self._cluster_lock.acquire()
+            if lock is None:
+                logger.info("特征提取正在其他 worker 上运行，跳过本轮")
+                return {"skipped": True}
+            try:
+                return await self._process_pending(limit, lock)
+            finally:
+                await lock.release()
+
+    def start_background(self, limit: Optional[int] = None) -> asyncio.Task:
+        """在后台运行一轮提取（需在事件循环中调用），失败时记录日志"""
+        def _done(task: asyncio.Task):
+            self._background_tasks.discard(task)
+            if not task.cancelled() and task.exception():
+                logger.error(f"后台特征提取失败: {task.exception()}")
+
+        task = asyncio.create_task(self.process_pending(limit), name="pdf_feature_extract")
+        self._background_tasks.add(task)
+        task.add_done_callback(_done)
+        return task
+
+    async def _process_pending(self, limit: Optional[int], lock: LockHandle) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        stats = {"papers": 0, "pages": 0, "formulas": 0, "failed": 0}
+        # future -> (论文, 指纹, 提交到的进程池)
+        in_flight: Dict[asyncio.Future, Tuple[Dict[str, Any], str, ProcessPoolExecutor]] = {}
+        max_in_flight = self.max_workers * 2
+
+        async def collect(done):
+            for future in done:
+                doc, fingerprint, executor = in_flight.pop(future)
+                try:
+                    features = future.result()
+                except (BrokenProcessPool, asyncio.CancelledError) as e:
+                    # 子进程异常退出（如解析时崩溃）或随损坏的进程池被取消：只关闭提交时的进程池
+                    # （已被替换时不影响新进程池），不记录指纹以便下一轮重试
+                    logger.error(f"特征提取进程异常退出: {doc.get('file_path')}, 错误: {e!r}")
+                    self._discard_executor(executor)
+                    stats["failed"] += 1
+                    continue
+                except Exception as e:
+                    # 记录指纹，文件变化前不再重试
+                    logger.warning(f"提取论文特征失败: {doc.get('file_path')}, 错误: {e}")
+                    features = {"pages": 0, "wordCount": 0, "imageCount": 0, "formulaCount": 0, "image": None, "formulas": []}
+                    stats["failed"] += 1
+                await self._save_features(doc, fingerprint, features)
+                stats["papers"] += 1
+                stats["pages"] += features["pages"]
+                stats["formulas"] += features["formulaCount"]
+
+        extract = partial(extract_pdf_features, thumbnails=thumbnail_service.render_options())
+        submitted = 0
+        async for doc, fingerprint in self._pending_papers():
+            if limit is not None and submitted >= limit:
+                break
+            # 锁已被撤销或过期时停止提交，其余论文留给新的持有者
+            if lock.lost:
+                logger.warning("特征提取锁已失效，停止本轮提取")
+                break
+            executor = self.executor
+            try:
+                future = loop.run_in_executor(executor, extract, doc["file_path"])
+            except BrokenProcessPool:
+                self._discard_executor(executor)
+                executor = self.executor
+                future = loop.run_in_executor(executor, extract, doc["file_path"])
+            in_flight[future] = (doc, fingerprint, executor)
+            submitted += 1
+            if len(in_flight) >= max_in_flight:
+                done, _ = await asyncio.wait(in_flight.keys(), return_when=asyncio.FIRST_COMPLETED)
+                await collect(done)
+        while in_flight:
+            done, _ = await asyncio.wait(in_flight.keys(), return_when=asyncio.FIRST_COMPLETED)
+            await collect(done)
+
+        if stats["papers"]:
+            await async_fs.run(thumbnail_service.evict)
+
+        elapsed = time.perf_counter() - started
+        stats["seconds"] = round(elapsed, 3)
+        stats["pages_per_second"] = round(stats["pages"] / elapsed, 2) if elapsed > 0 else 0.0
+        stats["workers"] = self.max_workers
+        stats["finished_at"] = datetime.now().isoformat()
+        self.last_run = stats
+        if stats["papers"]:
+            logger.info(
+                f"特征提取完成: {stats['papers']} 篇论文, {stats['pages']} 页, "
+                f"{stats['pages_per_second']} 页/秒, 失败 {stats['failed']} 篇"
+            )
+        return stats
+
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        """关闭已损坏的进程池；它已被新进程池替换时不做任何操作"""
+        if self._executor is executor:
+            self.shutdown()
+
+    def shutdown(self):
+        """关闭进程池，下次使用时重新创建"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# 全局特征提取服务实例
+pdf_feature_service = PdfFeatureService()
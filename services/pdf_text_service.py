@@ -0,0 +1,108 @@
+"""
+PDF 文本提取服务
+在专用线程池中逐页提取文本，以异步迭代器逐页返回，避免阻塞事件循环，也不必把整本书的文本放入内存。
+同时进行的提取数量受 PDF_EXTRACT_WORKERS 限制。
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Iterator, Optional
+
+from config import config
+from utils.async_iter import iterate_in_thread
+
+logger = logging.getLogger(__name__)
+
+
+class PdfTextService:
+    """逐页 PDF 文本提取"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or config.PDF_EXTRACT_WORKERS
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore = asyncio.Semaphore(self.max_workers)
+        # 工作线程中直接提取（如批量打包）时使用的并发限制，与线程池共同保证提取数量不超过上限
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """懒加载线程池"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pdf-text")
+        return self._executor
+
+    @staticmethod
+    def iter_pages_sync(file_path: str) -> Iterator[str]:
+        """同步逐页提取文本（在工作线程中执行）"""
+        import fitz  # PyMuPDF
+
+        doc = fitz.open(file_path)
+        try:
+            for page in doc:
+                yield page.get_text()
+        finally:
+            doc.close()
+
+    def _limited(self, pages: Iterator[str]) -> Iterator[str]:
+        """占用一个提取名额迭代页面，迭代结束或中断时释放"""
+        with self._slots:
+            try:
+                yield from pages
+            finally:
+                pages.close()
+
+    def extract_text_sync(self, file_path: str) -> Iterator[str]:
+        """在调用线程中逐页提取文本，超过并发上限时阻塞等待（供工作线程使用）"""
+        return self._limited(self.iter_pages_sync(file_path))
+
+    async def iter_pages(self, file_path: str, queue_size: int = 4,
+                         wrap: Optional[Callable[[Iterator[str]], Iterator[str]]] = None) -> AsyncIterator[str]:
+        """
+        逐页异步返回 PDF 文本，超过并发上限的请求排队等待
+
+        Args:
+            file_path: PDF 文件路径
+            queue_size: 已提取但未发送的页面数上限
+            wrap: 包装同步页面迭代器的函数（在工作线程中执行），例如边提取边写入文本缓存
+        """
+        def factory() -> Iterator[str]:
+            pages = self.extract_text_sync(file_path)
+            return wrap(pages) if wrap else pages
+
+        async with self._semaphore:
+            async for text in iterate_in_thread(factory, self.executor, queue_size):
+                yield text
+
+    async def iter_text_bytes(self, file_path: str,
+                              wrap: Optional[Callable[[Iterator[str]], Iterator[str]]] = None) -> AsyncIterator[bytes]:
+        """
+        逐页返回 UTF-8 编码的文本。先提取第一页再返回迭代器，
+        打开或解析失败时在开始响应之前就抛出异常，调用方可以返回正确的错误码。
+        """
+        pages = self.iter_pages(file_path, wrap=wrap)
+        try:
+            first = await pages.__anext__()
+        except StopAsyncIteration:
+            first = ""
+
+        async def chained() -> AsyncIterator[bytes]:
+            try:
+                yield first.encode("utf-8")
+                async for text in pages:
+                    yield text.encode("utf-8")
+            finally:
+                await pages.aclose()
+
+        return chained()
+
+    def shutdown(self):
+        """关闭线程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# 全局 PDF 文本提取服务实例
+pdf_text_service = PdfTextService()
@@ -3,6 +3,7 @@ from models.formula import Formula
 from models.trash import Trash
 from typing import List, Optional, Tuple, Dict, Any
 from bson import ObjectId
+from services.paper_search_service import PAPER_INTERNAL_FIELDS
 
 # ==================== 论文相关 ====================
 
@@ -27,7 +28,7 @@ async def list_valid_papers(page: int, page_size: int, sort_by: str = "timestamp
     # 清理数据，确保必要字段存在
     cleaned_papers = []
     for p in papers:
-        paper_dict = p.model_dump()
+        paper_dict = p.model_dump(exclude=set(PAPER_INTERNAL_FIELDS))
         # 确保 topics 字段存在且为列表
         if 'topics' not in paper_dict or paper_dict['topics'] is None:
             paper_dict['topics'] = []
@@ -46,10 +47,43 @@ async def detail_paper(paper_id: str) -> Optional[dict]:
     """
     try:
         paper = await Paper.get(ObjectId(paper_id))
-        return paper.model_dump() if paper else None
+        return paper.model_dump(exclude=set(PAPER_INTERNAL_FIELDS)) if paper else None
     except Exception:
         return None
 
+async def get_processing_statistics() -> dict:
+    """
+    获取数据处理统计：有效论文数、公式数、废弃数据数、特征提取完成率及字数/图片/页数合计。
+    """
+    from services.pdf_feature_service import pdf_feature_service
+
+    valid_papers = await Paper.find({"type": "valid"}).count()
+    processed_papers = await Paper.find({"type": "valid", "feature_fingerprint": {"$ne": None}}).count()
+    formulas = await Formula.count()
+    trash = await Trash.count()
+
+    totals = await Paper.get_motor_collection().aggregate([
+        {"$match": {"type": "valid"}},
+        {"$group": {
+            "_id": None,
+            "words": {"$sum": "$wordCount"},
+            "images": {"$sum": "$imageCount"},
+            "pages": {"$sum": "$pageCount"}
+        }}
+    ]).to_list(1)
+    totals = totals[0] if totals else {}
+
+    return {
+        "validPapers": valid_papers,
+        "formulas": formulas,
+        "trashData": trash,
+        "processingRate": round(processed_papers / valid_papers, 4) if valid_papers else 0.0,
+        "totalWords": totals.get("words", 0),
+        "totalImages": totals.get("images", 0),
+        "totalPages": totals.get("pages", 0),
+        "featureExtraction": pdf_feature_service.last_run
+    }
+
 # ==================== 公式图片相关 ====================
 
 async def list_formula_images(page: int, page_size: int, filters: Dict[str, Any] = None) -> Tuple[List[dict], int]:
@@ -65,6 +99,16 @@ async def list_formula_images(page: int, page_size: int, filters: Dict[str, Any]
     formulas = await query.skip((page-1)*page_size).limit(page_size).to_list()
     return [f.model_dump() for f in formulas], total
 
+async def list_formulas(page: int, page_size: int, filters: Dict[str, Any] = None) -> Tuple[List[dict], int]:
+    """
+    分页获取公式列表。
+    :param page: 页码，从1开始
+    :param page_size: 每页数量
+    :param filters: MongoDB查询条件（如 {"paper_id": "..."}）
+    :return: (公式列表, 总数)
+    """
+    return await list_formula_images(page, page_size, filters)
+
 async def detail_formula(formula_id: str) -> Optional[dict]:
     """
     获取单个公式图片详情。
@@ -0,0 +1,166 @@
+"""
+任务进度发布/订阅中心
+所有后台任务把进度事件发布到这里，SSE / WebSocket 接口从这里订阅并推送给前端，
+前端不再需要每秒轮询各个进度接口。
+以多个 worker 运行时，本进程发布的事件由 services/progress_relay.py 转发给其他 worker。
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Set, AsyncIterator, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+# 任务进入这些状态后，单任务订阅会自动结束
+FINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+class ProgressHub:
+    """进程内的任务进度发布/订阅中心"""
+
+    def __init__(self, queue_size: int = 100, max_snapshots: int = 1000):
+        """
+        Args:
+            queue_size: 每个订阅者的缓冲事件数，慢消费者会丢弃最旧的事件
+            max_snapshots: 保留最新状态快照的任务数量上限
+        """
+        self.queue_size = queue_size
+        self.max_snapshots = max_snapshots
+        # key 为 None 的订阅者接收所有任务的事件
+        self._subscribers: Dict[Optional[str], Set[asyncio.Queue]] = {}
+        self._latest: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._sequence = 0
+        # 本进程发布事件时调用的监听函数（如跨 worker 转发）
+        self._listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+
+    def add_listener(self, listener: Callable[[str, Dict[str, Any]], None]):
+        """注册监听函数，本进程发布事件时以 (task_id, event) 调用"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[str, Dict[str, Any]], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def publish(self, task_id: str, event: Dict[str, Any], local: bool = True):
+        """
+        发布一条任务进度事件（需在事件循环线程中调用）
+
+        Args:
+            task_id: 任务ID
+            event: 事件内容，通常包含 task_type、status、progress
+            local: 是否为本进程产生的事件，其他 worker 转发来的事件为 False，不再通知监听函数
+        """
+        self._sequence += 1
+        payload = {
+            "id": self._sequence,
+            "task_id": task_id,
+            "timestamp": datetime.now().isoformat(),
+            **event
+        }
+
+        # 合并到最新快照，新订阅者可以立即拿到当前状态
+        snapshot = {**self._latest.pop(task_id, {}), **payload}
+        self._latest[task_id] = snapshot
+        while len(self._latest) > self.max_snapshots:
+            self._latest.popitem(last=False)
+
+        for queue in self._subscribers.get(task_id, set()) | self._subscribers.get(None, set()):
+            self._put(queue, snapshot)
+
+        if local:
+            for listener in self._listeners:
+                try:
+                    listener(task_id, event)
+                except Exception as e:
+                    logger.warning(f"Progress listener failed: {e}")
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, event: Dict[str, Any]):
+        """非阻塞投递，队列满时丢弃最旧的事件"""
+        if queue.full():
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        queue.put_nowait(event)
+
+    def subscribe(self, task_id: Optional[str] = None) -> asyncio.Queue:
+        """订阅指定任务（task_id 为 None 时订阅全部任务）"""
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self._subscribers.setdefault(task_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue, task_id: Optional[str] = None):
+        """取消订阅"""
+        subscribers = self._subscribers.get(task_id)
+        if subscribers:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[task_id]
+
+    def latest(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务的最新状态快照"""
+        return self._latest.get(task_id)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """获取所有任务的最新状态快照"""
+        return list(self._latest.values())
+
+    def subscriber_count(self) -> int:
+        """当前订阅者数量"""
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    async def stream(
+        self,
+        task_id: Optional[str] = None,
+        heartbeat: float = 15.0,
+        initial: Optional[Dict[str, Any]] = None,
+        refresh: Optional[Callable[[], Awaitable[Optional[Dict[str, Any]]]]] = None
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        以异步迭代器的形式订阅事件
+
+        先输出当前快照，再持续输出新事件；超过 heartbeat 秒没有事件时输出 None 作为心跳。
+        订阅单个任务时，任务进入终止状态后自动结束。
+
+        Args:
+            task_id: 任务ID，None 表示所有任务
+            heartbeat: 心跳间隔(秒)
+            initial: 本中心没有该任务快照时使用的初始状态（如从数据库读取）
+            refresh: 订阅单个任务时，每次心跳调用以读取任务的持久化状态（如数据库中的 Task），
+                已进入终止状态时输出并结束，避免错过其他 worker 的完成事件时永远不结束
+        """
+        queue = self.subscribe(task_id)
+        try:
+            if task_id is None:
+                for event in self.snapshot():
+                    yield event
+            else:
+                current = self.latest(task_id) or initial
+                if current:
+                    yield current
+                    if current.get("status") in FINAL_STATUSES:
+                        return
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    if task_id is not None and refresh is not None:
+                        current = await refresh()
+                        if current and current.get("status") in FINAL_STATUSES:
+                            yield current
+                            return
+                    yield None
+                    continue
+                yield event
+                if task_id is not None and event.get("status") in FINAL_STATUSES:
+                    return
+        finally:
+            self.unsubscribe(queue, task_id)
+
+
+# 全局进度中心实例
+progress_hub = ProgressHub()
@@ -0,0 +1,137 @@
+"""
+跨 worker 进度转发
+ProgressHub 只在进程内分发事件。以多个 worker 运行时，本 worker 发布的事件按 PROGRESS_RELAY_INTERVAL_MS
+合并（同一任务只保留合并后的最新状态）后写入 MongoDB 固定集合 progress_events；
+每个 worker 用 tailable cursor 跟随该集合，把其他 worker 的事件发布到本进程的进度中心，
+SSE / WebSocket 订阅者无论连接到哪个 worker 都能收到所有任务的进度。
+固定集合在单机 mongod 上也可以使用，不依赖副本集的 Change Stream。
+"""
+
+import json
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+
+from config import config
+from services.progress_hub import ProgressHub, progress_hub
+from services.shared_state import worker_id
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = "progress_events"
+# 跟随游标出错后重新打开的最大退避时间(秒)
+RECONNECT_DELAY_MAX = 30.0
+
+
+class ProgressRelay:
+    """通过 MongoDB 固定集合在 worker 之间转发进度事件"""
+
+    def __init__(self, hub: ProgressHub, interval_ms: Optional[int] = None, size_mb: Optional[int] = None):
+        """
+        Args:
+            hub: 本进程的进度中心
+            interval_ms: 合并写入间隔，默认读取配置 PROGRESS_RELAY_INTERVAL_MS
+            size_mb: 固定集合大小，默认读取配置 PROGRESS_RELAY_COLLECTION_MB
+        """
+        self.hub = hub
+        self.interval = (interval_ms if interval_ms is not None else config.PROGRESS_RELAY_INTERVAL_MS) / 1000
+        self.size_mb = size_mb or config.PROGRESS_RELAY_COLLECTION_MB
+        self._collection = None
+        self._origin: Optional[str] = None
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self, database):
+        """创建（或复用）固定集合，从当前最新事件之后开始跟随"""
+        if self._tasks:
+            return
+        self._collection = await self._ensure_collection(database)
+        self._origin = worker_id()
+        self._wakeup = asyncio.Event()
+        latest = await self._collection.find_one({}, projection={"_id": 1}, sort=[("$natural", -1)])
+        last_id = latest["_id"] if latest else ObjectId()
+        self.hub.add_listener(self._on_publish)
+        self._tasks = [
+            asyncio.create_task(self._write_loop(), name="progress_relay_writer"),
+            asyncio.create_task(self._tail_loop(last_id), name="progress_relay_tail")
+        ]
+        logger.info("Relaying task progress between workers via MongoDB capped collection")
+
+    async def _ensure_collection(self, database):
+        try:
+            await database.create_collection(COLLECTION_NAME, capped=True, size=self.size_mb * 1024 * 1024)
+        except CollectionInvalid:
+            # 集合已由其他 worker 创建
+            pass
+        return database[COLLECTION_NAME]
+
+    def _on_publish(self, task_id: str, event: Dict[str, Any]):
+        """本进程发布事件时合并到待转发缓冲"""
+        self._pending[task_id] = {**self._pending.get(task_id, {}), **event}
+        self._wakeup.set()
+
+    async def _write_loop(self):
+        """有新事件时等待一个合并间隔，然后批量写入"""
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await asyncio.sleep(self.interval)
+            await self._flush()
+
+    async def _flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        docs = [
+            {"origin": self._origin, "task_id": task_id, "event": json.loads(json.dumps(event, default=str))}
+            for task_id, event in pending.items()
+        ]
+        try:
+            await self._collection.insert_many(docs, ordered=False)
+        except Exception as e:
+            logger.warning(f"Failed to relay progress events: {e}")
+            # 保留未转发的事件，与之后的更新合并后重试
+            for task_id, event in pending.items():
+                self._pending[task_id] = {**event, **self._pending.get(task_id, {})}
+            self._wakeup.set()
+
+    async def _tail_loop(self, last_id: ObjectId):
+        """跟随固定集合，把其他 worker 的事件发布到本进程"""
+        delay = 1.0
+        while True:
+            try:
+                cursor = self._collection.find({"_id": {"$gt": last_id}}, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    async for doc in cursor:
+                        last_id = doc["_id"]
+                        if doc.get("origin") != self._origin:
+                            self.hub.publish(doc["task_id"], doc.get("event") or {}, local=False)
+                    delay = 1.0
+                # 集合为空时游标会立即结束，稍后重新打开
+                await asyncio.sleep(1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Progress relay cursor failed: {e}, reopening in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_DELAY_MAX)
+
+    async def stop(self):
+        """停止转发，退出前写入缓冲中的事件"""
+        if not self._tasks:
+            return
+        self.hub.remove_listener(self._on_publish)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._flush()
+
+
+# 全局进度转发实例
+progress_relay = ProgressRelay(progress_hub)
@@ -0,0 +1,135 @@
+"""
+任务进度上报器
+进度先写入内存缓冲并立即推送到进度中心，数据库写入按时间间隔合并，
+状态变化（如 running -> completed）时立即落库，保证最终状态准确。
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Optional
+
+from bson import ObjectId
+
+from config import config
+from services.database import Task
+from services.progress_hub import progress_hub
+from services.task_notifier import task_notifier, TERMINAL_STATUSES
+
+logger = logging.getLogger(__name__)
+
+
+class TaskProgressReporter:
+    """合并写入的 Task 进度上报器"""
+
+    def __init__(self, task_id: str, task_type: str, flush_interval_ms: Optional[int] = None, **event_fields):
+        """
+        Args:
+            task_id: Task 文档ID
+            task_type: 任务类型，用于进度推送事件
+            flush_interval_ms: 两次数据库写入的最小间隔，默认读取配置 PROGRESS_FLUSH_INTERVAL_MS
+            event_fields: 附加到每条推送事件上的字段（如 source_type）
+        """
+        self.task_id = task_id
+        self.task_type = task_type
+        if flush_interval_ms is None:
+            flush_interval_ms = config.PROGRESS_FLUSH_INTERVAL_MS
+        self.flush_interval = flush_interval_ms / 1000
+        self.event_fields = event_fields
+
+        self._task_obj_id = ObjectId(task_id)
+        self._pending: Dict[str, Any] = {}
+        self._status: Optional[str] = None
+        self._progress: Optional[int] = None
+        self._last_flush = 0.0
+        self._flush_task: Optional[asyncio.Task] = None
+        # 延迟写入任务是否仍在等待（尚未开始写库）
+        self._flush_waiting = False
+        self._lock = asyncio.Lock()
+
+        # 统计：上报次数与实际写库次数
+        self.updates = 0
+        self.writes = 0
+
+    async def update(self, progress: Optional[int] = None, status: Optional[str] = None, **fields):
+        """
+        上报进度
+
+        Args:
+            progress: 进度 (0-100)
+            status: 任务状态，变化时立即写库
+            fields: 其他需要写入 Task 的字段（如 result、error、end_time）
+        """
+        self.updates += 1
+        changes: Dict[str, Any] = dict(fields)
+        if progress is not None:
+            changes["progress"] = self._progress = progress
+        status_changed = status is not None and status != self._status
+        if status is not None:
+            changes["status"] = self._status = status
+        self._pending.update(changes)
+
+        event = {**self.event_fields, "task_type": self.task_type, "status": self._status, "progress": self._progress}
+        if "error" in fields:
+            event["error"] = fields["error"]
+        progress_hub.publish(self.task_id, event)
+
+        if status_changed or time.monotonic() - self._last_flush >= self.flush_interval:
+            await self.flush()
+        else:
+            self._schedule_trailing_flush()
+
+    def _schedule_trailing_flush(self):
+        """安排一次延迟写入，保证进度停止变化后缓冲内容也会落库"""
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        delay = max(0.0, self.flush_interval - (time.monotonic() - self._last_flush))
+        self._flush_task = asyncio.create_task(self._delayed_flush(delay))
+
+    async def _delayed_flush(self, delay: float):
+        self._flush_waiting = True
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self._flush_waiting = False
+        await self.flush()
+
+    async def flush(self):
+        """将缓冲的更新写入数据库"""
+        async with self._lock:
+            if not self._pending:
+                return
+            changes, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+            try:
+                await Task.find_one(Task.id == self._task_obj_id).update({"$set": changes})
+                self.writes += 1
+            except Exception as e:
+                logger.error(f"Failed to flush progress for task {self.task_id}: {e}")
+                # 写入失败时保留更新，等待下一次写入
+                self._pending = {**changes, **self._pending}
+
+    async def finish(self, status: str = "completed", **fields):
+        """
+        结束任务：立即写入最终状态并通知等待方
+
+        Args:
+            status: 最终状态 (completed / failed / cancelled)
+            fields: 其他需要写入 Task 的字段
+        """
+        if self._flush_task is not None and not self._flush_task.done():
+            if self._flush_waiting:
+                # 还在等待时取消，缓冲内容随最终状态一起写入
+                self._flush_task.cancel()
+            else:
+                # 已在写库：取消会丢失已取出的缓冲内容，被取消的写入也可能晚于最终状态落库
+                await asyncio.gather(self._flush_task, return_exceptions=True)
+        if status == "completed":
+            fields.setdefault("progress", 100)
+        progress = fields.pop("progress", None)
+        await self.update(progress=progress, status=status, **fields)
+        # 状态未变化时 update 不会立即写入，这里确保最终状态落库
+        await self.flush()
+        if status in TERMINAL_STATUSES:
+            task_notifier.notify(self.task_id, status, error=fields.get("error"))
+        logger.debug(f"Task {self.task_id} progress reporter finished: {self.updates} updates, {self.writes} writes")
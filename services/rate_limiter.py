@@ -3,25 +3,39 @@ import time
 from typing import Dict, Any, Callable, Awaitable, Optional
 import logging
 
+from services.progress_hub import progress_hub
+from services.shared_state import SharedState, SharedTaskTable, shared_state
+
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class RateLimiter:
-    """请求限流器，控制API请求频率"""
+    """
+    请求限流器，控制API请求频率
+    计数保存在共享状态中，多个 worker 共用同一个限额（而不是每个 worker 各自限额）。
+    使用滑动窗口计数：上一个窗口的计数按未过去的比例折算后加上当前窗口的计数。
+    """
     
-    def __init__(self, max_requests: int = 10, time_window: int = 60):
+    def __init__(self, max_requests: int = 10, time_window: int = 60, state: Optional[SharedState] = None):
         """
         初始化限流器
         
         Args:
             max_requests: 时间窗口内允许的最大请求数
             time_window: 时间窗口大小(秒)
+            state: 保存计数的共享状态，默认使用全局共享状态
         """
         self.max_requests = max_requests
         self.time_window = time_window
-        self.request_timestamps: Dict[str, list] = {}  # 按endpoint存储请求时间戳
-        self._lock = asyncio.Lock()  # 用于线程安全操作
+        self._state = state
+
+    @property
+    def state(self) -> SharedState:
+        return self._state or shared_state
+
+    def _key(self, endpoint: str, window: int) -> str:
+        return f"rate:{endpoint}:{window}"
     
     async def check_rate_limit(self, endpoint: str) -> bool:
         """
@@ -33,30 +47,28 @@ class RateLimiter:
         Returns:
             bool: 如果未超过限制返回True，否则返回False
         """
-        async with self._lock:
-            current_time = time.time()
-            
-            # 初始化endpoint的时间戳列表
-            if endpoint not in self.request_timestamps:
-                self.request_timestamps[endpoint] = []
-            
-            # 清理过期的时间戳
-            self.request_timestamps[endpoint] = [
-                ts for ts in self.request_timestamps[endpoint]
-                if current_time - ts < self.time_window
-            ]
-            
-            # 检查是否超过限制
-            if len(self.request_timestamps[endpoint]) >= self.max_requests:
-                logger.warning(f"Rate limit exceeded for endpoint: {endpoint}")
-                return False
-            
-            # 添加新的时间戳
-            self.request_timestamps[endpoint].append(current_time)
-            return True
+        current_time = time.time()
+        window, offset = divmod(current_time, self.time_window)
+        key = self._key(endpoint, int(window))
+        ttl = self.time_window * 2
+
+        # 先计数再判断，并发请求不会同时通过最后一个名额
+        count = await self.state.incr(key, 1, ttl)
+        previous = await self.state.get(self._key(endpoint, int(window) - 1)) or 0
+        estimated = previous * (1 - offset / self.time_window) + count
+        if estimated > self.max_requests:
+            # 被拒绝的请求不占用名额
+            await self.state.incr(key, -1, ttl)
+            logger.warning(f"Rate limit exceeded for endpoint: {endpoint}")
+            return False
+        return True
 
 class TaskQueue:
-    """任务队列系统，用于处理长时间运行的任务"""
+    """
+    任务队列系统，用于处理长时间运行的任务
+    队列和执行都在接收请求的 worker 内（并发上限按 worker 计算），
+    任务状态写入共享任务表，在任意 worker 上都可以查询。
+    """
     
     def __init__(self, max_concurrent_tasks: int = 3):
         """
@@ -70,8 +82,13 @@ class TaskQueue:
         self.task_queue = asyncio.Queue()
         self._lock = asyncio.Lock()
         self._worker_task = None
-        self.task_results: Dict[str, Any] = {}
+        self.task_results = SharedTaskTable("queue_tasks")
     
+    def _set_result(self, task_id: str, **fields):
+        """更新本 worker 的任务状态并同步到共享任务表"""
+        self.task_results[task_id] = {"taskId": task_id, **fields}
+        self.task_results.sync(self.task_results[task_id])
+
     async def start_worker(self):
         """启动工作线程处理队列中的任务"""
         if self._worker_task is None:
@@ -90,20 +107,18 @@ class TaskQueue:
                     self.running_tasks += 1
                 
                 logger.info(f"Processing task {task_id}, current running tasks: {self.running_tasks}")
+                self._set_result(task_id, status="running", result=None)
+                progress_hub.publish(task_id, {"task_type": "queue", "status": "running"})
                 
                 try:
                     # 执行任务
                     result = await task_func(*args, **kwargs)
-                    self.task_results[task_id] = {
-                        "status": "completed",
-                        "result": result
-                    }
+                    self._set_result(task_id, status="completed", result=result)
+                    progress_hub.publish(task_id, {"task_type": "queue", "status": "completed", "progress": 100})
                 except Exception as e:
                     logger.error(f"Task {task_id} failed: {e}")
-                    self.task_results[task_id] = {
-                        "status": "failed",
-                        "error": str(e)
-                    }
+                    self._set_result(task_id, status="failed", error=str(e))
+                    progress_hub.publish(task_id, {"task_type": "queue", "status": "failed", "error": str(e)})
                 finally:
                     # 更新运行中的任务数
                     async with self._lock:
@@ -132,13 +147,11 @@ class TaskQueue:
         await self.start_worker()
         
         # 初始化任务结果
-        self.task_results[task_id] = {
-            "status": "pending",
-            "result": None
-        }
+        self._set_result(task_id, status="pending", result=None)
         
         # 将任务添加到队列
         await self.task_queue.put((task_id, task_func, args, kwargs))
+        progress_hub.publish(task_id, {"task_type": "queue", "status": "pending", "progress": 0})
         logger.info(f"Task {task_id} added to queue, queue size: {self.task_queue.qsize()}")
         
         return task_id
@@ -153,13 +166,14 @@ class TaskQueue:
         Returns:
             Dict: 任务状态信息
         """
-        if task_id not in self.task_results:
+        task = await self.task_results.load(task_id)
+        if task is None:
             return {
                 "status": "not_found",
                 "result": None
             }
         
-        return self.task_results[task_id]
+        return {key: value for key, value in task.items() if key != "taskId"}
 
 # 创建全局实例
 rate_limiter = RateLimiter()
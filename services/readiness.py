@@ -0,0 +1,59 @@
+"""
+服务就绪状态
+启动过程分为若干阶段（数据库、服务初始化、目录监听等），耗时的阶段在后台执行，
+各阶段完成后登记到这里，/health/ready 根据必需阶段是否全部完成返回就绪状态。
+"""
+
+import time
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    """启动阶段登记"""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self._stages: Dict[str, Dict[str, Any]] = {}
+
+    def register(self, name: str, required: bool = True):
+        """登记一个阶段，初始状态为 pending"""
+        self._stages[name] = {
+            "status": "pending",
+            "required": required,
+            "error": None,
+            "updated_at": datetime.now().isoformat()
+        }
+
+    def _update(self, name: str, status: str, error: Optional[str] = None, **detail):
+        stage = self._stages.setdefault(name, {"required": True})
+        stage.update(status=status, error=error, updated_at=datetime.now().isoformat(), **detail)
+
+    def mark_running(self, name: str, **detail):
+        self._update(name, "running", **detail)
+
+    def mark_ready(self, name: str, **detail):
+        self._update(name, "ready", **detail)
+        logger.info(f"Startup stage ready: {name}")
+
+    def mark_failed(self, name: str, error: str, **detail):
+        self._update(name, "failed", error=error, **detail)
+        logger.error(f"Startup stage failed: {name}: {error}")
+
+    @property
+    def is_ready(self) -> bool:
+        return all(stage["status"] == "ready" for stage in self._stages.values() if stage.get("required"))
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.is_ready,
+            "uptime": round(time.monotonic() - self.started_at, 1),
+            "stages": {name: dict(stage) for name, stage in self._stages.items()}
+        }
+
+
+# 全局就绪状态实例
+readiness = Readiness()
@@ -4,7 +4,8 @@ from typing import Dict, Any, List, Optional
 import asyncio
 
 from services.rate_limiter import rate_limiter, task_queue
-from services.resource_service import ResourceService, AnalysisTask
+from services.resource_service import ResourceService
+from services.task_notifier import task_notifier
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -74,12 +75,12 @@ class ResourceQueueService:
         # 调用原始的ResourceService方法
         task_id = await ResourceService.start_analysis_task(base_dir, file_list, options)
         
-        # 等待任务完成
-        while True:
-            task_status = await ResourceQueueService.get_task_status(task_id)
-            if task_status["status"] in ["completed", "failed"]:
-                return task_status
-            await asyncio.sleep(1)
+        # 等待任务完成：由完成通知唤醒，不再每秒轮询数据库
+        await task_notifier.wait_for_completion(
+            task_id,
+            check=lambda: ResourceService.get_task_status(task_id)
+        )
+        return await ResourceService.get_task_status(task_id)
     
     @staticmethod
     async def get_task_status(task_id: str) -> Dict[str, Any]:
@@ -97,15 +98,15 @@ class ResourceQueueService:
         if queue_status["status"] != "not_found":
             return queue_status
         
-        # 检查ResourceService中的任务
-        if task_id in ResourceService._analysis_tasks:
-            task = ResourceService._analysis_tasks[task_id]
+        # 检查ResourceService中的任务（可能运行在其他 worker 上）
+        task = await ResourceService.get_analysis_task(task_id)
+        if task:
             return {
                 "task_id": task_id,
-                "status": task.status,
-                "progress": task.progress,
-                "result": task.result,
-                "error": task.error
+                "status": task["status"],
+                "progress": task["progress"],
+                "result": task.get("result"),
+                "error": task.get("error")
             }
         
         return {
@@ -130,7 +131,7 @@ class ResourceQueueService:
             }
         
         # 检查是否已有自动分析任务在运行
-        if ResourceService._auto_analysis_running:
+        if await ResourceService.is_auto_analysis_running():
             return {
                 "status": "already_running",
                 "message": "自动分析任务已在运行中"
@@ -1,7 +1,5 @@
 import sys
 import os
-# 使用OpenAI客户端调用DeepSeek API
-from openai import OpenAI
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -11,18 +9,21 @@ from typing import List, Dict, Tuple, Any
 import random
 import json
 import hashlib
-import aiohttp
 import asyncio
 import logging
 from datetime import datetime, timedelta
 import uuid
 import time
-from concurrent.futures import ThreadPoolExecutor
 import re
 from bson import ObjectId
-import concurrent.futures
-import multiprocessing
 from services.database import DataSource, Task
+from services.progress_hub import progress_hub
+from services.progress_reporter import TaskProgressReporter
+from services.async_fs import async_fs
+from services.shared_state import shared_state
+from services.distributed_lock import DistributedLock
+from services.distributed_scan import partition_scan_units, scan_unit_mp, scan_coordinator
+from utils.async_iter import pool_apply
 from pymongo import UpdateOne
 # 导入配置
 from config import config
@@ -31,44 +32,54 @@ from config import config
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def collect_files_mp(base_dir):
-    result = []
-    try:
-        for root, _, files in os.walk(base_dir):
-            for file in files:
-                # ".json"
-                if file.lower().endswith((".pdf")):
-                    result.append(os.path.join(root, file))
-    except Exception as e:
-        print(f"Error walking {base_dir}: {e}")
-    print(f"Finish scanning: {base_dir}, found {len(result)} files")
-    return result
-
-def get_all_dirs(base_dirs, max_depth=1):
-    # 递归收集所有子目录，限制最大深度
-    all_dirs = []
-    for base in base_dirs:
-        for root, dirs, _ in os.walk(base):
-            depth = root[len(base):].count(os.sep)
-            if depth <= max_depth:
-                all_dirs.append(root)
-    return all_dirs
-
 class ResourceService:
     """资源服务类 - 使用MongoDB进行任务管理"""
     
-    # 缓存分类结果，避免频繁请求大模型API
-    _cache = {}
-    _cache_time = None
+    # 缓存分类结果，避免频繁请求大模型API（保存在共享状态中，多个 worker 共用）
+    _CACHE_KEY = "resource:data_cache"
     _cache_duration = timedelta(hours=1)  # 缓存有效期1小时
     
     # 添加类变量用于存储自动分析的结果
     _auto_analysis_result = None
     _auto_analysis_time = None
-    _auto_analysis_running = False
 
-    # 添加任务跟踪字典
-    _analysis_tasks = {}
+    # 自动分析的分布式锁，同一时间所有 worker 中只运行一个自动分析
+    _auto_analysis_lock = DistributedLock("auto_analysis")
+
+    # 自动分析任务的进度，按任务ID保存在共享状态中
+    _ANALYSIS_TASK_PREFIX = "resource:analysis_task:"
+    _ANALYSIS_TASK_TTL = 24 * 3600
+
+    @staticmethod
+    async def is_auto_analysis_running() -> bool:
+        """是否有 worker 正在运行自动分析"""
+        return await ResourceService._auto_analysis_lock.is_locked()
+
+    @staticmethod
+    async def stop_auto_analysis() -> bool:
+        """
+        撤销自动分析的锁，运行中的分析在下一个检查点停止，其旧 token 的写入会被拒绝
+
+        Returns:
+            之前是否有自动分析在运行
+        """
+        return await ResourceService._auto_analysis_lock.revoke()
+
+    @staticmethod
+    async def get_analysis_tasks() -> Dict[str, Dict[str, Any]]:
+        """所有 worker 上的自动分析任务进度，key 为任务ID"""
+        prefix = ResourceService._ANALYSIS_TASK_PREFIX
+        return {key[len(prefix):]: task for key, task in (await shared_state.items(prefix)).items()}
+
+    @staticmethod
+    async def get_analysis_task(task_id: str) -> Dict[str, Any] | None:
+        return await shared_state.get(ResourceService._ANALYSIS_TASK_PREFIX + task_id)
+
+    @staticmethod
+    async def _save_analysis_task(task_info: Dict[str, Any]):
+        await shared_state.set(
+            ResourceService._ANALYSIS_TASK_PREFIX + task_info["id"], task_info, ResourceService._ANALYSIS_TASK_TTL
+        )
 
     @staticmethod
     async def get_resource_data() -> list[ResourceItem]:
@@ -79,12 +90,11 @@ class ResourceService:
             return auto_analysis_result
         
         # 如果自动分析结果为空，则使用原有逻辑
-        # 检查缓存是否有效
-        now = datetime.now()
-        if (ResourceService._cache and ResourceService._cache_time and 
-            now - ResourceService._cache_time < ResourceService._cache_duration):
+        # 检查缓存是否有效（过期的缓存不会被读到）
+        cached = await shared_state.get(ResourceService._CACHE_KEY)
+        if cached:
             logger.info("Using cached resource data")
-            return ResourceService._cache
+            return [ResourceItem(**item) for item in cached]
         
         # 扫描目录路径 (可以从配置文件读取)
         base_dir = os.path.join(os.path.expanduser("~"), "Documents")
@@ -124,14 +134,22 @@ class ResourceService:
             ]
         
         # 更新缓存
-        ResourceService._cache = result
-        ResourceService._cache_time = now
+        await shared_state.set(
+            ResourceService._CACHE_KEY,
+            [item.model_dump() for item in result],
+            ResourceService._cache_duration.total_seconds()
+        )
         
         return result
     
     @staticmethod
     async def _collect_folder_info(base_dir: str) -> List[Dict]:
-        """收集目录中的文件夹信息"""
+        """收集目录中的文件夹信息（在文件系统线程池中遍历）"""
+        return await async_fs.run(ResourceService._collect_folder_info_sync, base_dir)
+
+    @staticmethod
+    def _collect_folder_info_sync(base_dir: str) -> List[Dict]:
+        """收集目录中的文件夹信息（同步实现）"""
         folder_info = []
         
         # 如果是C盘路径，直接返回空列表
@@ -332,9 +350,9 @@ class ResourceService:
     @staticmethod
     async def _run_analysis_task(task_id: str, base_dir: str, file_list=None, options=None):
         """运行分析任务，并更新数据库中的任务状态"""
-        task_obj_id = ObjectId(task_id)
+        reporter = TaskProgressReporter(task_id, "resource_analysis")
         try:
-            await Task.find_one(Task.id == task_obj_id).update({"$set": {"status": "running", "progress": 5}})
+            await reporter.update(progress=5, status="running")
             
             if file_list:
                 logger.info(f"Using provided file list with {len(file_list)} files")
@@ -359,12 +377,12 @@ class ResourceService:
                 task_progress = 90
             else:
                 folder_info = await ResourceService._collect_folder_info(base_dir)
-                await Task.find_one(Task.id == task_obj_id).update({"$set": {"progress": 50}})
+                await reporter.update(progress=50)
                 
-                categories = ResourceService._smart_categorize_folders(folder_info)
+                categories = await async_fs.run(ResourceService._smart_categorize_folders, folder_info)
                 task_progress = 90
             
-            await Task.find_one(Task.id == task_obj_id).update({"$set": {"progress": task_progress}})
+            await reporter.update(progress=task_progress)
 
             result = []
             for category, items in categories.items():
@@ -374,40 +392,44 @@ class ResourceService:
                     "folders": items if not file_list else []
                 })
             
-            await Task.find_one(Task.id == task_obj_id).update({"$set": {
-                "status": "completed", "progress": 100, 
-                "result": {"categories": result}, "end_time": datetime.now()
-            }})
+            await reporter.finish("completed", result={"categories": result}, end_time=datetime.now())
             
-            ResourceService._cache = result
-            ResourceService._cache_time = datetime.now()
+            # 缓存只保存资源概览字段，与 get_resources 一致，不包含文件夹列表
+            await shared_state.set(
+                ResourceService._CACHE_KEY,
+                [ResourceItem(**{k: item[k] for k in ("id", "name", "count", "icon", "color")}).model_dump() for item in result],
+                ResourceService._cache_duration.total_seconds()
+            )
             
         except Exception as e:
             logger.error(f"Analysis task failed: {e}", exc_info=True)
-            await Task.find_one(Task.id == task_obj_id).update({"$set": {
-                "status": "failed", "error": str(e), "end_time": datetime.now()
-            }})
+            await reporter.finish("failed", error=str(e), end_time=datetime.now())
 
     @staticmethod
     async def auto_analyze_local_directories(base_dir=None):
         """递归遍历指定目录，只收集 pdf 和 json 文件，LLM 分类，结果入库（分块递归+多进程优化+动态进度日志）"""
-        if ResourceService._auto_analysis_running:
+        # 获取分布式锁，其他 worker 正在分析时直接返回；锁被撤销（停止爬取）后在检查点停止
+        lock = await ResourceService._auto_analysis_lock.acquire()
+        if lock is None:
             logger.info("Auto analysis already running, skipping")
             return
+        task_id = str(uuid.uuid4())
+        task_info = {
+            "id": task_id,
+            "is_auto_analysis": True,
+            "progress": 0,
+            "status": "running",
+            "start_time": datetime.now().isoformat()
+        }
+        failed = False
+        # 导入完成后在释放锁之后提取新论文的特征
+        extract_features = False
         try:
-            ResourceService._auto_analysis_running = True
             logger.info("Starting automatic analysis of local directories (recursive, pdf/json only, multiprocess, fine-grained)")
 
-            # 创建任务对象并添加到任务跟踪字典
-            task_id = str(uuid.uuid4())
-            task_obj = type('AnalysisTask', (), {
-                'id': task_id,
-                'is_auto_analysis': True,
-                'progress': 0,
-                'status': 'running',
-                'start_time': datetime.now()
-            })()
-            ResourceService._analysis_tasks[task_id] = task_obj
+            # 登记任务进度，其他 worker 也能查询
+            await ResourceService._save_analysis_task(task_info)
+            progress_hub.publish(task_id, {"task_type": "auto_resource_analysis", "status": "running", "progress": 0})
 
             import multiprocessing
             # 新增：如果传入 base_dir，则只扫描该目录，否则使用配置中的默认目录
@@ -425,32 +447,55 @@ class ResourceService:
                     drive_dirs = [f"{d}:\\" for d in "DEFGHIJKLMNOPQRSTUVWXYZ" if os.path.exists(f"{d}:\\")]
                     scan_dirs = drive_dirs if drive_dirs else [home_dir]
             common_dirs = [d for d in scan_dirs if not d.startswith("C:")]
-            # 递归收集所有子目录（如到2级）
-            all_start_dirs = get_all_dirs(common_dirs, max_depth=2)
-            logger.info(f"Total start dirs to scan: {len(all_start_dirs)}")
-            # 用多进程池动态收集，主进程持续输出进度
+            # 划分为互不重叠的扫描单元：MAX_SCAN_DEPTH 层以内的目录只扫描自身，最深一层扫描整棵子树
+            scan_units = await async_fs.run(partition_scan_units, common_dirs, config.MAX_SCAN_DEPTH)
+            logger.info(f"Total scan units: {len(scan_units)}, scan mode: {config.SCAN_MODE}")
+
+            async def report_scan(done: int, total: int, collected: int):
+                logger.info(f"已完成 {done}/{total} 个目录，累计收集文件数: {collected}")
+                # 文件收集阶段占 0-30 的进度
+                task_info["progress"] = int(30 * done / total)
+                progress_hub.publish(task_id, {
+                    "task_type": "auto_resource_analysis", "status": "running",
+                    "progress": task_info["progress"], "scanned_dirs": done, "total_dirs": total,
+                    "collected_files": collected
+                })
+                await ResourceService._save_analysis_task(task_info)
+
             all_files = []
-            if all_start_dirs:
-                with multiprocessing.get_context("spawn").Pool(processes=min(16, os.cpu_count() or 1)) as pool:
-                    total = len(all_start_dirs)
-                    for idx, files in enumerate(pool.imap_unordered(collect_files_mp, all_start_dirs), 1):
+            if scan_units and config.SCAN_MODE == "distributed":
+                # 单元分发给各节点的扫描 worker（scan_worker.py），本 worker 也参与扫描
+                all_files = await scan_coordinator.scan(scan_units, on_progress=report_scan, should_stop=lambda: lock.lost)
+            elif scan_units:
+                # 用多进程池动态收集，主进程持续输出进度
+                with multiprocessing.get_context("spawn").Pool(processes=min(config.MAX_CONCURRENT_PROCESSES, os.cpu_count() or 1)) as pool:
+                    total = len(scan_units)
+                    # 子进程的结果通过回调送回事件循环，等待时不占用文件系统线程池
+                    pending_results = [pool_apply(pool, scan_unit_mp, unit) for unit in scan_units]
+                    for idx, pending in enumerate(asyncio.as_completed(pending_results), start=1):
+                        files = await pending
                         all_files.extend(files)
                         if idx % 10 == 0 or idx == total:
-                            logger.info(f"已完成 {idx}/{total} 个目录，累计收集文件数: {len(all_files)}")
+                            await report_scan(idx, total, len(all_files))
             logger.info(f"Total pdf/json files collected文件数量: {len(all_files)}")
 
+            if not await lock.check():
+                logger.info("Auto analysis stopped after file collection")
+                return
+
             # 更新任务进度：文件收集完成
-            if 'task_obj' in locals():
-                task_obj.progress = 30
-                task_obj.status = 'analyzing'
+            task_info.update(progress=30, status="analyzing")
+            await ResourceService._save_analysis_task(task_info)
+            progress_hub.publish(task_id, {"task_type": "auto_resource_analysis", "status": "analyzing", "progress": 30})
 
             try:
                 file_dicts = [{'name': os.path.basename(f), 'path': f} for f in all_files]
                 categories = await ResourceService._analyze_with_deepseek(file_dicts)
 
                 # 更新任务进度：分析完成
-                if 'task_obj' in locals():
-                    task_obj.progress = 70
+                task_info["progress"] = 70
+                await ResourceService._save_analysis_task(task_info)
+                progress_hub.publish(task_id, {"task_type": "auto_resource_analysis", "status": "analyzing", "progress": 70})
             except Exception as e:
                 logger.warning(f"DeepSeek analysis failed: {e}, falling back to basic categorization")
                 from services.alert_service import AlertService
@@ -459,10 +504,15 @@ class ResourceService:
                     level="warning",
                     extra={"task_type": "auto_resource_analysis"}
                 )
-                categories = ResourceService._smart_categorize_folders(
+                categories = await async_fs.run(
+                    ResourceService._smart_categorize_folders,
                     [{'name': os.path.basename(f), 'path': f} for f in all_files]
                 )
 
+            if not await lock.check():
+                logger.info("Auto analysis stopped before saving results")
+                return
+
             # 3. 整理分类结果
             result = [
                 {"id": i + 1, "name": cat, "count": len(files),
@@ -470,26 +520,20 @@ class ResourceService:
                  "files": files[:50]}
                 for i, (cat, files) in enumerate(categories.items())
             ]
-            # 4. 写入数据库
-            from services.alert_service import AlertService
-            existing_task = await Task.find_one(Task.task_type == "auto_resource_analysis")
-            if existing_task:
-                await Task.find_one(Task.id == existing_task.id).update({
-                    "$set": {
-                        "status": "completed",
-                        "progress": 100,
-                        "result": {"categories": result},
-                        "end_time": datetime.now()
-                    }
-                })
-            else:
-                new_task = Task(task_type="auto_resource_analysis", status="completed", start_time=datetime.now(), end_time=datetime.now(), result={"categories": result})
-                await new_task.insert()
+            # 4. 写入数据库（以 fencing token 为条件，失联后恢复的旧持有者不会覆盖新结果）
+            if not await ResourceService._save_auto_analysis_result(result, lock.token):
+                logger.warning(f"Auto analysis result with stale token {lock.token} discarded")
+                return
             logger.info("Auto analysis completed and categories saved to DB.")
 
             # 更新任务进度：数据保存完成
-            if 'task_obj' in locals():
-                task_obj.progress = 90
+            task_info["progress"] = 90
+            await ResourceService._save_analysis_task(task_info)
+            progress_hub.publish(task_id, {"task_type": "auto_resource_analysis", "status": "importing", "progress": 90})
+
+            if not await lock.check():
+                logger.info("Auto analysis stopped before importing papers")
+                return
 
             # 动态导入，避免循环依赖
             try:
@@ -498,15 +542,18 @@ class ResourceService:
                 logger.info(f"自动分析后已导入 {imported_count} 篇有效论文。")
 
                 # 更新任务进度：全部完成
-                if 'task_obj' in locals():
-                    task_obj.progress = 100
-                    task_obj.status = 'completed'
+                task_info["progress"] = 100
+                extract_features = True
 
             except Exception as e:
                 logger.error(f"自动导入有效论文失败: {e}")
+                failed = True
+                task_info["error"] = f"自动导入有效论文失败: {e}"
 
         except Exception as e:
             logger.error(f"Error in automatic analysis: {e}")
+            failed = True
+            task_info["error"] = str(e)
             from services.alert_service import AlertService
             await AlertService.add_alert(
                 message=f"自动分析任务异常: {str(e)}",
@@ -514,14 +561,56 @@ class ResourceService:
                 extra={"task_type": "auto_resource_analysis"}
             )
         finally:
-            ResourceService._auto_analysis_running = False
-            # 清理任务跟踪
-            if 'task_id' in locals():
-                if task_id in ResourceService._analysis_tasks:
-                    ResourceService._analysis_tasks[task_id].status = 'completed'
-                    # 可以选择保留任务一段时间或立即删除
-                    # del ResourceService._analysis_tasks[task_id]
-            logger.info("Auto analysis completed, reset running flag.")
+            # 锁已被撤销时视为被停止
+            task_info["status"] = "cancelled" if lock.lost else "failed" if failed else "completed"
+            await lock.release()
+            try:
+                await ResourceService._save_analysis_task(task_info)
+            except Exception as e:
+                logger.warning(f"Failed to save auto analysis task {task_id}: {e}")
+            progress_hub.publish(task_id, {
+                "task_type": "auto_resource_analysis", "status": task_info["status"],
+                "progress": task_info["progress"], "error": task_info.get("error")
+            })
+            logger.info("Auto analysis completed, released running lock.")
+
+        if extract_features:
+            # 特征提取可能耗时数小时，在 pdf_features 锁下后台运行，不占用自动分析锁
+            from services.pdf_feature_service import pdf_feature_service
+            pdf_feature_service.start_background()
+
+    @staticmethod
+    async def _save_auto_analysis_result(categories: List[Dict[str, Any]], token: int) -> bool:
+        """
+        写入自动分析结果，只接受不小于已写入 fencing token 的写入
+
+        Returns:
+            是否写入；token 已过期时返回 False
+        """
+        collection = Task.get_motor_collection()
+        now = datetime.now()
+        updated = await collection.update_one(
+            {
+                "task_type": "auto_resource_analysis",
+                "$or": [{"fencing_token": None}, {"fencing_token": {"$lte": token}}]
+            },
+            {"$set": {
+                "status": "completed",
+                "progress": 100,
+                "result": {"categories": categories},
+                "end_time": now,
+                "fencing_token": token
+            }}
+        )
+        if updated.matched_count:
+            return True
+        if await Task.find_one(Task.task_type == "auto_resource_analysis"):
+            return False
+        await Task(
+            task_type="auto_resource_analysis", status="completed", start_time=now, end_time=now,
+            result={"categories": categories}, fencing_token=token
+        ).insert()
+        return True
 
     @staticmethod
     async def get_auto_analysis_result():
@@ -564,6 +653,9 @@ class ResourceService:
     @staticmethod
     async def _analyze_with_ollama(folder_info: List[Dict]) -> Dict[str, List[Dict]]:
         """使用Ollama本地大模型分析文件夹并生成五大固定分类"""
+        # 按需加载 HTTP 客户端，避免拖慢服务启动
+        import aiohttp
+
         try:
             ollama_base_url = config.OLLAMA_BASE_URL
             ollama_model = config.OLLAMA_MODEL
@@ -802,6 +894,8 @@ class ResourceService:
 文件列表如下：
 {json.dumps([{'name': f['name'], 'path': f['path']} for f in sample_folders], ensure_ascii=False, indent=2)}
 """
+            # 使用OpenAI客户端调用DeepSeek API，按需加载，避免拖慢服务启动
+            from openai import OpenAI
             client = OpenAI(api_key=api_key, base_url="https://api.deepseek.com/v1")
 
             # 使用线程池执行器来避免事件循环问题
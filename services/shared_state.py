@@ -0,0 +1,330 @@
+"""
+多 worker 共享状态
+以多个 worker 进程运行时，类变量和模块级字典只在各自进程内可见，
+需要跨 worker 共享的运行标记、任务进度和缓存保存在这里：
+- MongoSharedState: 保存在 MongoDB 的 shared_state 集合，多个 worker / 多台机器共享
+- MemorySharedState: 进程内实现，单进程运行或调试时使用（SHARED_STATE_BACKEND=memory）
+
+租约（lease）是带持有者和过期时间的键，持有者定期续期；持有者异常退出后租约过期，其他 worker 可以接手。
+耗时任务的互斥使用带 fencing token 的分布式锁（services/distributed_lock.py）。
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import socket
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Set, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+_worker_ids: Dict[int, str] = {}
+
+
+def worker_id() -> str:
+    """当前 worker 的标识（主机名:进程号:随机后缀），fork 出的子进程会得到新的标识"""
+    pid = os.getpid()
+    if pid not in _worker_ids:
+        _worker_ids[pid] = f"{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:6]}"
+    return _worker_ids[pid]
+
+
+def _plain(value: Any) -> Any:
+    """转换为 JSON 兼容的普通对象，同时断开与调用方可变对象的引用"""
+    return json.loads(json.dumps(value, default=str, ensure_ascii=False))
+
+
+class SharedState(ABC):
+    """共享状态接口"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Any:
+        """读取键值，不存在或已过期时返回 None"""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """写入键值，ttl 为过期秒数，None 表示不过期"""
+
+    @abstractmethod
+    async def delete(self, key: str):
+        """删除键"""
+
+    @abstractmethod
+    async def items(self, prefix: str) -> Dict[str, Any]:
+        """读取指定前缀的所有未过期键值"""
+
+    @abstractmethod
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """
+        原子地增加计数并返回新值，键不存在时从 0 开始，ttl 只在创建键时设置。
+        计数键过期后可能还未被删除，按时间窗口计数时应把窗口编号放在键名中。
+        """
+
+    @abstractmethod
+    async def acquire(self, key: str, owner: str, ttl: float) -> bool:
+        """获取或续期租约：键不存在、已过期或已由 owner 持有时成功"""
+
+    @abstractmethod
+    async def release(self, key: str, owner: str) -> bool:
+        """释放 owner 持有的租约"""
+
+    @abstractmethod
+    async def holder(self, key: str) -> Optional[str]:
+        """租约当前的持有者"""
+
+
+class MemorySharedState(SharedState):
+    """进程内实现"""
+
+    def __init__(self):
+        # key -> (value, owner, 过期时刻 monotonic)
+        self._data: Dict[str, Tuple[Any, Optional[str], Optional[float]]] = {}
+
+    def _entry(self, key: str) -> Optional[Tuple[Any, Optional[str], Optional[float]]]:
+        entry = self._data.get(key)
+        if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    @staticmethod
+    def _expires(ttl: Optional[float]) -> Optional[float]:
+        return time.monotonic() + ttl if ttl else None
+
+    async def get(self, key: str) -> Any:
+        entry = self._entry(key)
+        return _plain(entry[0]) if entry else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        entry = self._entry(key)
+        self._data[key] = (_plain(value), entry[1] if entry else None, self._expires(ttl))
+
+    async def delete(self, key: str):
+        self._data.pop(key, None)
+
+    async def items(self, prefix: str) -> Dict[str, Any]:
+        return {
+            key: _plain(entry[0])
+            for key in [k for k in self._data if k.startswith(prefix)]
+            if (entry := self._entry(key)) is not None
+        }
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        entry = self._entry(key)
+        value = (entry[0] if entry else 0) + amount
+        self._data[key] = (value, None, entry[2] if entry else self._expires(ttl))
+        return value
+
+    async def acquire(self, key: str, owner: str, ttl: float) -> bool:
+        entry = self._entry(key)
+        if entry is not None and entry[1] != owner:
+            return False
+        self._data[key] = (entry[0] if entry else None, owner, self._expires(ttl))
+        return True
+
+    async def release(self, key: str, owner: str) -> bool:
+        entry = self._entry(key)
+        if entry is None or entry[1] != owner:
+            return False
+        del self._data[key]
+        return True
+
+    async def holder(self, key: str) -> Optional[str]:
+        entry = self._entry(key)
+        return entry[1] if entry else None
+
+
+class MongoSharedState(SharedState):
+    """MongoDB 实现，过期时间使用 UTC，过期文档由 TTL 索引清理，读取时也会过滤"""
+
+    @property
+    def _collection(self):
+        # 延迟导入，避免与 services.database 循环导入
+        from services.database import SharedStateEntry
+        return SharedStateEntry.get_motor_collection()
+
+    @staticmethod
+    def _now() -> datetime:
+        return datetime.now(timezone.utc)
+
+    @staticmethod
+    def _alive(now: datetime) -> Dict[str, Any]:
+        return {"$or": [{"expires_at": None}, {"expires_at": {"$gt": now}}]}
+
+    async def get(self, key: str) -> Any:
+        doc = await self._collection.find_one({"_id": key, **self._alive(self._now())}, {"value": 1})
+        return doc.get("value") if doc else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        now = self._now()
+        await self._collection.update_one(
+            {"_id": key},
+            {"$set": {
+                "value": _plain(value),
+                "expires_at": now + timedelta(seconds=ttl) if ttl else None,
+                "updated_at": now
+            }},
+            upsert=True
+        )
+
+    async def delete(self, key: str):
+        await self._collection.delete_one({"_id": key})
+
+    async def items(self, prefix: str) -> Dict[str, Any]:
+        cursor = self._collection.find(
+            {"_id": {"$regex": f"^{re.escape(prefix)}"}, **self._alive(self._now())},
+            {"value": 1}
+        )
+        return {doc["_id"]: doc.get("value") async for doc in cursor}
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        now = self._now()
+        update = {
+            "$inc": {"value": amount},
+            "$set": {"updated_at": now},
+            "$setOnInsert": {"expires_at": now + timedelta(seconds=ttl) if ttl else None}
+        }
+        for attempt in range(2):
+            try:
+                doc = await self._collection.find_one_and_update(
+                    {"_id": key}, update, upsert=True, return_document=ReturnDocument.AFTER
+                )
+                return doc["value"]
+            except DuplicateKeyError:
+                # 并发创建同一个键，另一方已插入，重试即可递增
+                if attempt:
+                    raise
+
+    async def acquire(self, key: str, owner: str, ttl: float) -> bool:
+        now = self._now()
+        try:
+            # 租约被他人持有且未过期时条件不匹配，upsert 会因 _id 重复而失败
+            await self._collection.update_one(
+                {"_id": key, "$or": [{"owner": owner}, {"expires_at": {"$lte": now}}]},
+                {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl), "updated_at": now}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def release(self, key: str, owner: str) -> bool:
+        result = await self._collection.delete_one({"_id": key, "owner": owner})
+        return result.deleted_count > 0
+
+    async def holder(self, key: str) -> Optional[str]:
+        doc = await self._collection.find_one(
+            {"_id": key, "expires_at": {"$gt": self._now()}}, {"owner": 1}
+        )
+        return doc.get("owner") if doc else None
+
+
+class SharedTaskTable(dict):
+    """
+    任务表
+    后台任务只在启动它的 worker 中运行并修改本地字典，调用 sync() 后快照在后台写入共享状态，
+    其他 worker 通过 load() / snapshot() 查询；停止其他 worker 上的任务时写入停止请求，
+    由运行任务的 worker 在下次同步时应用到本地任务。
+    """
+
+    def __init__(self, namespace: str, ttl: float = 86400, state: Optional[SharedState] = None):
+        super().__init__()
+        self.namespace = namespace
+        self.ttl = ttl
+        self._state = state
+        self._dirty: Set[str] = set()
+        self._flushers: Dict[str, asyncio.Task] = {}
+
+    @property
+    def state(self) -> SharedState:
+        return self._state or shared_state
+
+    def _key(self, task_id: str) -> str:
+        return f"{self.namespace}:{task_id}"
+
+    def _stop_key(self, task_id: str) -> str:
+        return f"{self.namespace}-stop:{task_id}"
+
+    async def load(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """读取任务：本 worker 的任务返回本地字典，否则返回共享快照"""
+        if task_id in self:
+            return self[task_id]
+        return await self.state.get(self._key(task_id))
+
+    async def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """所有 worker 的任务，本 worker 的任务使用本地的最新状态"""
+        prefix = f"{self.namespace}:"
+        tasks = {key[len(prefix):]: task for key, task in (await self.state.items(prefix)).items()}
+        tasks.update(self)
+        return tasks
+
+    async def save(self, task: Dict[str, Any]):
+        """立即写入任务快照"""
+        await self.state.set(self._key(task["taskId"]), task, self.ttl)
+
+    def sync(self, task: Dict[str, Any]):
+        """登记任务变化，后台合并写入共享状态（需在事件循环中调用）"""
+        task_id = task["taskId"]
+        self._dirty.add(task_id)
+        if task_id not in self._flushers:
+            self._flushers[task_id] = asyncio.create_task(self._flush(task_id))
+
+    async def _flush(self, task_id: str):
+        try:
+            while task_id in self._dirty:
+                self._dirty.discard(task_id)
+                task = self.get(task_id)
+                if task is None:
+                    break
+                stop_fields = await self.state.get(self._stop_key(task_id))
+                if stop_fields:
+                    task.update(stop_fields)
+                    await self.state.delete(self._stop_key(task_id))
+                await self.save(task)
+        except Exception as e:
+            logger.warning(f"Failed to sync task {task_id}: {e}")
+        finally:
+            self._flushers.pop(task_id, None)
+
+    async def stop(self, task_id: str, **fields) -> Optional[Dict[str, Any]]:
+        """
+        停止任务，fields 为要更新的状态字段
+
+        Returns:
+            更新后的任务，任务不存在时返回 None
+        """
+        if task_id in self:
+            task = self[task_id]
+            task.update(fields)
+            self.sync(task)
+            return task
+        task = await self.state.get(self._key(task_id))
+        if task is None:
+            return None
+        task.update(fields)
+        await self.state.set(self._stop_key(task_id), fields, self.ttl)
+        await self.state.set(self._key(task_id), task, self.ttl)
+        return task
+
+
+def _create_shared_state() -> SharedState:
+    backend = config.SHARED_STATE_BACKEND
+    if backend == "memory":
+        return MemorySharedState()
+    if backend != "mongo":
+        logger.warning(f"Unknown SHARED_STATE_BACKEND '{backend}', using mongo")
+    return MongoSharedState()
+
+
+# 全局共享状态实例
+shared_state = _create_shared_state()
@@ -1,14 +1,22 @@
 import os
 import logging
 import asyncio
-from typing import List, Dict, Any
+import uuid
+from typing import List, Dict, Any, Tuple
 from datetime import datetime
-from services.database import DataSource, AnalysisResult, AnalyzedFolder, AnalyzedFile, Task
+from pymongo.errors import DuplicateKeyError
+from services.database import DataSource, AnalysisResult, AnalysisResultFolder, AnalyzedFolder, AnalyzedFile, Task
 from bson import ObjectId
-from beanie.odm.operators.update.general import Set
+from services.progress_reporter import TaskProgressReporter
+from services.async_fs import async_fs
+from services.file_metadata import file_metadata
 
 logger = logging.getLogger(__name__)
 
+# 数据源分析关注的文件类型
+ANALYZED_EXTENSIONS = ('.pdf', '.doc', '.docx', '.txt', '.xls', '.xlsx', '.ppt', '.pptx', '.json')
+
+
 class SourceAnalysisService:
     """
     数据源分析服务 - 使用MongoDB进行持久化和统一任务管理。
@@ -87,33 +95,23 @@ class SourceAnalysisService:
     #         return task_id
     
     @staticmethod
-    async def _analyze_folders(sources: List[DataSource], task_id: str = None) -> List[AnalyzedFolder]:
+    async def _analyze_folders(sources: List[DataSource], task_id: str = None,
+                               reporter: TaskProgressReporter | None = None) -> List[AnalyzedFolder]:
         """
         分析文件夹内容。输入的是DataSource模型列表。支持进度更新。
+        进度通过 reporter 合并写入数据库，未传入时根据 task_id 创建。
         """
         results = []
         total = len(sources)
+        own_reporter = reporter is None and task_id is not None
+        if own_reporter:
+            reporter = TaskProgressReporter(task_id, "source_analysis")
         for idx, source in enumerate(sources):
-            if not source.path or not os.path.exists(source.path):
+            if not source.path or not await async_fs.exists(source.path):
                 logger.warning(f"Path does not exist or is invalid, skipping: {source.path}")
                 continue
             try:
-                files_info: List[AnalyzedFile] = []
-                for root, _, filenames in os.walk(source.path):
-                    for filename in filenames:
-                        file_path = os.path.join(root, filename)
-                        _, ext = os.path.splitext(filename)
-                        if ext.lower() in ['.pdf', '.doc', '.docx', '.txt', '.xls', '.xlsx', '.ppt', '.pptx', '.json']:
-                            try:
-                                files_info.append(AnalyzedFile(
-                                    name=filename,
-                                    path=file_path,
-                                    size=os.path.getsize(file_path),
-                                    type=ext.lower(),
-                                    modified=datetime.fromtimestamp(os.path.getmtime(file_path))
-                                ))
-                            except Exception as file_e:
-                                logger.warning(f"Could not process file {file_path}: {file_e}")
+                files_info = await async_fs.run(SourceAnalysisService._scan_folder_files, source.path)
                 results.append(AnalyzedFolder(
                     folder_name=source.name,
                     folder_path=source.path,
@@ -121,14 +119,116 @@ class SourceAnalysisService:
                     files=files_info[:20]
                 ))
                 # 进度更新
-                if task_id:
-                    progress = 30 + int(50 * (idx + 1) / total)
-                    await Task.find_one(Task.id == ObjectId(task_id)).update({"$set": {"progress": progress}})
+                if reporter:
+                    await reporter.update(progress=30 + int(50 * (idx + 1) / total))
             except Exception as e:
                 logger.error(f"Error analyzing folder {source.path}: {e}")
                 continue
+        if own_reporter:
+            await reporter.flush()
         return results
+
+    @staticmethod
+    def _scan_folder_files(folder_path: str) -> List[AnalyzedFile]:
+        """递归扫描文件夹中的目标文件（同步实现，在文件系统线程池中执行）"""
+        files_info: List[AnalyzedFile] = []
+        for meta in file_metadata.walk_files(folder_path, ANALYZED_EXTENSIONS):
+            files_info.append(AnalyzedFile(
+                name=meta.name,
+                path=meta.path,
+                size=meta.size,
+                type=os.path.splitext(meta.name)[1].lower(),
+                modified=datetime.fromtimestamp(meta.mtime)
+            ))
+        return files_info
+
+    @staticmethod
+    def _build_analyzed_files(files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """为历史任务中的文件补充大小和修改时间（同步实现，在文件系统线程池中执行）"""
+        analyzed_files = []
+        for f in files:
+            file_path = f.get("path", "")
+            file_name = f.get("name", "")
+
+            # 获取文件信息，如果文件不存在则使用默认值
+            try:
+                meta = file_metadata.lookup(file_path) if file_path else None
+                if meta:
+                    file_size = meta.size
+                    file_modified = datetime.fromtimestamp(meta.mtime)
+                else:
+                    file_size = 0
+                    file_modified = datetime.now()
+
+                # 从文件名获取文件类型
+                _, ext = os.path.splitext(file_name)
+                file_type = ext.lower() if ext else ".unknown"
+
+                analyzed_files.append({
+                    "name": file_name,
+                    "path": file_path,
+                    "size": file_size,
+                    "type": file_type,
+                    "modified": file_modified
+                })
+            except Exception as file_e:
+                logger.warning(f"Could not get file info for {file_path}: {file_e}")
+                # 使用默认值
+                analyzed_files.append({
+                    "name": file_name,
+                    "path": file_path,
+                    "size": 0,
+                    "type": ".unknown",
+                    "modified": datetime.now()
+                })
+        return analyzed_files
     
+    @staticmethod
+    async def _merge_task_files(limit: int, batch_size: int = 20) -> Dict[str, Dict[str, Dict[str, str]]]:
+        """
+        以游标分批读取最近的 auto_resource_analysis 任务（只投影文件路径和名称），
+        按文件路径去重，并按文件所在的真实文件夹分组。任务按结束时间倒序遍历，同一文件保留最新记录。
+
+        Returns:
+            文件夹路径 -> {文件路径 -> {"path", "name"}}
+        """
+        cursor = Task.get_motor_collection().find(
+            {"task_type": "auto_resource_analysis"},
+            projection={"_id": 0, "result.categories.files.path": 1, "result.categories.files.name": 1}
+        ).sort("end_time", -1).limit(limit).batch_size(batch_size)
+
+        folders: Dict[str, Dict[str, Dict[str, str]]] = {}
+        task_count = 0
+        async for doc in cursor:
+            task_count += 1
+            result = doc.get("result")
+            if not isinstance(result, dict):
+                continue
+            for category in result.get("categories") or []:
+                for f in category.get("files") or []:
+                    file_path = f.get("path") if isinstance(f, dict) else None
+                    if not file_path:
+                        continue
+                    folder = folders.setdefault(os.path.dirname(file_path), {})
+                    if file_path not in folder:
+                        folder[file_path] = {"path": file_path, "name": f.get("name") or os.path.basename(file_path)}
+        logger.info(f"Merged {sum(len(v) for v in folders.values())} distinct files in {len(folders)} folders from {task_count} tasks.")
+        return folders
+
+    @staticmethod
+    def _build_folder_records(folders: Dict[str, Dict[str, Dict[str, str]]]) -> List[Dict[str, Any]]:
+        """将去重后的文件按文件夹生成分析记录，每个文件只 stat 一次（同步实现，在文件系统线程池中执行）"""
+        records = []
+        for folder_path, files in folders.items():
+            analyzed_files = SourceAnalysisService._build_analyzed_files(list(files.values()))
+            records.append({
+                "folder_name": os.path.basename(folder_path) or folder_path,
+                "folder_path": folder_path,
+                "file_count": len(analyzed_files),
+                "files": analyzed_files
+            })
+        return records
+
     @staticmethod
     async def get_analysis_result(source_type: str) -> AnalysisResult | None:
         """
@@ -137,6 +237,102 @@ class SourceAnalysisService:
         # await AnalysisResult.find_all().delete()
         return await AnalysisResult.find_one(AnalysisResult.source_type == source_type)
 
+    @staticmethod
+    async def _switch_header(source_type: str, header: Dict[str, Any]):
+        """
+        头文档不存在时以本批次创建；已存在时只有本批次开始得更晚才替换。
+        首次保存使用 $setOnInsert 的 upsert，并发的首次保存中只有一个会插入，另一个按已存在处理。
+        """
+        collection = AnalysisResult.get_motor_collection()
+        try:
+            inserted = await collection.update_one(
+                {"source_type": source_type}, {"$setOnInsert": header}, upsert=True
+            )
+            if inserted.upserted_id is not None:
+                return
+        except DuplicateKeyError:
+            # 另一个首次保存刚刚插入了头文档
+            pass
+
+        started_at = header["run_started_at"]
+        switched = await collection.update_one(
+            {"source_type": source_type, "$or": [{"run_started_at": None}, {"run_started_at": {"$lt": started_at}}]},
+            {"$set": header}
+        )
+        if not switched.matched_count:
+            # 头文档已指向更晚开始的批次，本批次随后作为旧批次被清理
+            logger.info(f"Newer analysis result for {source_type} already saved, discarding run {header['run_id']}")
+
+    @staticmethod
+    async def save_analysis_result(source_type: str, folders: List[Dict[str, Any]], batch_size: int = 200):
+        """
+        保存分析结果：每个文件夹写入一个 AnalysisResultFolder 文档，全部写入后再切换
+        AnalysisResult 头文档的 run_id，最后删除旧批次，保证读取方始终看到完整的一批结果。
+        多个分析同时保存时，只有开始时间更晚的批次能替换头文档；清理时只删除比头文档
+        当前批次更早开始的批次，不会删除头文档指向的批次或仍在写入的更新批次。
+        """
+        run_id = uuid.uuid4().hex
+        started_at = datetime.now()
+        for start in range(0, len(folders), batch_size):
+            await AnalysisResultFolder.insert_many([
+                AnalysisResultFolder(source_type=source_type, run_id=run_id, run_started_at=started_at,
+                                     order=start + offset, **folder)
+                for offset, folder in enumerate(folders[start:start + batch_size])
+            ])
+
+        header = {
+            "status": "completed",
+            "timestamp": datetime.now(),
+            "results": [],
+            "analyzed_folders_count": len(folders),
+            "run_id": run_id,
+            "run_started_at": started_at
+        }
+        try:
+            await SourceAnalysisService._switch_header(source_type, header)
+        except Exception:
+            # 头文档没有切换到本批次，删除已写入的文件夹，避免留下无人引用的批次
+            await AnalysisResultFolder.get_motor_collection().delete_many({"run_id": run_id})
+            raise
+
+        current = await AnalysisResult.find_one(AnalysisResult.source_type == source_type)
+        if current is None or current.run_id is None:
+            return
+        stale = {"source_type": source_type, "run_id": {"$ne": current.run_id}}
+        if current.run_started_at is not None:
+            stale["$or"] = [{"run_started_at": None}, {"run_started_at": {"$lt": current.run_started_at}}]
+        await AnalysisResultFolder.get_motor_collection().delete_many(stale)
+
+    @staticmethod
+    async def get_analysis_result_page(source_type: str, page: int, page_size: int) -> Tuple[AnalysisResult | None, List[AnalyzedFolder], int]:
+        """
+        分页获取指定类型的分析结果，按 order 范围走索引查询，每次只加载一页文件夹。
+
+        Returns:
+            (结果头文档, 当前页文件夹列表, 文件夹总数)
+        """
+        analysis_doc = await SourceAnalysisService.get_analysis_result(source_type)
+        if not analysis_doc:
+            return None, [], 0
+
+        start = max(page - 1, 0) * page_size
+        end = start + page_size
+        if analysis_doc.run_id is None:
+            # 旧版数据：结果内嵌在头文档中
+            return analysis_doc, analysis_doc.results[start:end], len(analysis_doc.results)
+
+        folders = await AnalysisResultFolder.find(
+            AnalysisResultFolder.source_type == source_type,
+            AnalysisResultFolder.run_id == analysis_doc.run_id,
+            AnalysisResultFolder.order >= start,
+            AnalysisResultFolder.order < end
+        ).sort("order").to_list()
+        paged = [
+            AnalyzedFolder(folder_name=f.folder_name, folder_path=f.folder_path, file_count=f.file_count, files=f.files)
+            for f in folders
+        ]
+        return analysis_doc, paged, analysis_doc.analyzed_folders_count
+
     @staticmethod
     async def get_task_status(task_id: str) -> Dict:
         """
@@ -171,93 +367,24 @@ class SourceAnalysisService:
             if not task:
                 raise Exception(f"Task {task_id} not found")
         
+        reporter = TaskProgressReporter(task_id, "source_analysis", source_type=source_type)
         try:
-            await Task.find_one(Task.id == ObjectId(task_id)).update({"$set": {"status": "running", "progress": 5}})
+            await reporter.update(progress=5, status="running")
             logger.info(f"Starting analysis for source type: '{source_type}' (task_id={task_id})")
 
-            # 2. 查找Task表中同类型的已完成任务，提取所有文件数据
-            same_type_tasks = await Task.find({
-                "task_type": "auto_resource_analysis",
-            }).sort("-end_time").limit(limit).to_list()
-            logger.info(f"Found {len(same_type_tasks)} tasks in DB for source_type '{source_type}'.")
-
-            analysis_result_list = []
-            for task in same_type_tasks:
-                if hasattr(task, "result") and task.result:
-                    categories = task.result.get("categories", []) if isinstance(task.result, dict) else []
-                    for category in categories:
-                        files = category.get("files", [])
-                        if files:
-                            folder_name = category.get("name", "")
-                            folder_path = os.path.dirname(files[0]["path"]) if files and "path" in files[0] else ""
-                            file_count = len(files)
-
-                            # 构建符合 AnalyzedFile 模型要求的文件列表
-                            analyzed_files = []
-                            for f in files:
-                                file_path = f.get("path", "")
-                                file_name = f.get("name", "")
-
-                                # 获取文件信息，如果文件不存在则使用默认值
-                                try:
-                                    if os.path.exists(file_path):
-                                        file_size = os.path.getsize(file_path)
-                                        file_modified = datetime.fromtimestamp(os.path.getmtime(file_path))
-                                    else:
-                                        file_size = 0
-                                        file_modified = datetime.now()
-
-                                    # 从文件名获取文件类型
-                                    _, ext = os.path.splitext(file_name)
-                                    file_type = ext.lower() if ext else ".unknown"
-
-                                    analyzed_files.append({
-                                        "name": file_name,
-                                        "path": file_path,
-                                        "size": file_size,
-                                        "type": file_type,
-                                        "modified": file_modified
-                                    })
-                                except Exception as file_e:
-                                    logger.warning(f"Could not get file info for {file_path}: {file_e}")
-                                    # 使用默认值
-                                    analyzed_files.append({
-                                        "name": file_name,
-                                        "path": file_path,
-                                        "size": 0,
-                                        "type": ".unknown",
-                                        "modified": datetime.now()
-                                    })
-
-                            analysis_result_list.append({
-                                "folder_name": folder_name,
-                                "folder_path": folder_path,
-                                "file_count": file_count,
-                                "files": analyzed_files
-                            })
+            # 2. 流式读取同类型的历史任务，按文件路径去重并按真实文件夹合并
+            folders = await SourceAnalysisService._merge_task_files(limit)
+            await reporter.update(progress=50)
+            analysis_result_list = await async_fs.run(SourceAnalysisService._build_folder_records, folders)
             # print('analysis_result_list', analysis_result_list)
-            # 4. 写入分析结果
-            await AnalysisResult.find_one(AnalysisResult.source_type == source_type).upsert(
-                Set({
-                    AnalysisResult.status: "completed",
-                    AnalysisResult.timestamp: datetime.now(),
-                    AnalysisResult.results: analysis_result_list,
-                    AnalysisResult.analyzed_folders_count: len(analysis_result_list)
-                }),
-                on_insert=AnalysisResult(
-                    source_type=source_type,
-                    timestamp=datetime.now(),
-                    analyzed_folders_count=len(analysis_result_list),
-                    results=analysis_result_list,
-                    status="completed"
-                )
-            )
-            await Task.find_one(Task.id == ObjectId(task_id)).update({"$set": {"status": "completed", "progress": 100, "result": {"files": [f.get('path') for f in analysis_result_list]}, "end_time": datetime.now()}})
+            # 4. 写入分析结果（每个文件夹一个文档）
+            await SourceAnalysisService.save_analysis_result(source_type, analysis_result_list)
+            await reporter.finish("completed", result={"files": [f.get('folder_path') for f in analysis_result_list]}, end_time=datetime.now())
             logger.info(f"Successfully completed analysis for '{source_type}' (task_id={task_id}).")
             return task_id
         except Exception as e:
             logger.error(f"Error during analysis for '{source_type}': {e}", exc_info=True)
-            await Task.find_one(Task.id == ObjectId(task_id)).update({"$set": {"status": "failed", "error": str(e), "end_time": datetime.now()}})
+            await reporter.finish("failed", error=str(e), end_time=datetime.now())
             return task_id
 
 
@@ -0,0 +1,256 @@
+"""
+任务完成通知服务
+本进程启动的任务通过 Future 直接通知等待方；其他进程完成的任务通过 MongoDB Change Stream 监听。
+单机 mongod（非副本集）或测试环境不支持 Change Stream 时，使用本地变更流作为替代。
+Change Stream 因网络错误、主节点切换等中断时，按指数退避从最后的 resume token 重新打开。
+"""
+
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# 任务的终止状态
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+# Change Stream 中断后重新打开的退避时间(秒)
+RECONNECT_DELAY_INITIAL = 1.0
+RECONNECT_DELAY_MAX = 30.0
+
+
+class LocalTaskChangeStream:
+    """
+    本地任务变更流，接口与 Motor 的 change stream 保持一致（异步迭代 + close）。
+    事件格式与 MongoDB 变更事件相同，便于在测试中模拟其他进程完成任务。
+    """
+
+    def __init__(self, maxsize: int = 1000):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self._closed = False
+
+    def push(self, change: Dict[str, Any]):
+        """推送一条变更事件"""
+        if self._closed:
+            return
+        try:
+            self._queue.put_nowait(change)
+        except asyncio.QueueFull:
+            logger.warning("Local task change stream is full, dropping change event")
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        change = await self._queue.get()
+        if change is None:
+            raise StopAsyncIteration
+        return change
+
+    async def close(self):
+        """关闭变更流，结束迭代"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+
+class TaskCompletionNotifier:
+    """任务完成通知器"""
+
+    def __init__(self):
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+        self._watch_task: Optional[asyncio.Task] = None
+        self._stream = None
+        self._collection = None
+        self._resume_token: Optional[Dict[str, Any]] = None
+        self.local_stream: Optional[LocalTaskChangeStream] = None
+
+    @staticmethod
+    def _pipeline() -> List[Dict[str, Any]]:
+        """只关注状态变为终止状态的变更"""
+        return [{"$match": {"$or": [
+            {
+                "operationType": "update",
+                "updateDescription.updatedFields.status": {"$in": list(TERMINAL_STATUSES)}
+            },
+            {
+                "operationType": {"$in": ["insert", "replace"]},
+                "fullDocument.status": {"$in": list(TERMINAL_STATUSES)}
+            }
+        ]}}]
+
+    def notify(self, task_id: str, status: str, **fields):
+        """通知等待该任务的所有协程"""
+        payload = {"task_id": task_id, "status": status, **fields}
+        for future in self._waiters.pop(task_id, []):
+            if not future.done():
+                future.set_result(payload)
+
+    async def wait_for_completion(
+        self,
+        task_id: str,
+        timeout: Optional[float] = None,
+        check: Optional[Callable[[], Awaitable[Dict[str, Any]]]] = None
+    ) -> Dict[str, Any]:
+        """
+        等待任务进入终止状态
+
+        Args:
+            task_id: 任务ID
+            timeout: 超时时间(秒)，None 表示一直等待
+            check: 可选的状态查询函数，注册等待后调用一次，防止任务在注册前已经完成
+
+        Returns:
+            Dict: 完成通知内容，至少包含 task_id 和 status
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(task_id, []).append(future)
+        try:
+            if check is not None:
+                status = await check()
+                if status and status.get("status") in TERMINAL_STATUSES:
+                    return status
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            waiters = self._waiters.get(task_id)
+            if waiters and future in waiters:
+                waiters.remove(future)
+                if not waiters:
+                    del self._waiters[task_id]
+
+    def _handle_change(self, change: Dict[str, Any]):
+        """将 MongoDB 变更事件转换为完成通知"""
+        try:
+            document_key = change.get("documentKey") or {}
+            task_id = document_key.get("_id")
+            if change.get("operationType") == "update":
+                status = (change.get("updateDescription") or {}).get("updatedFields", {}).get("status")
+            else:
+                status = (change.get("fullDocument") or {}).get("status")
+            if task_id is None or status not in TERMINAL_STATUSES:
+                return
+            self.notify(str(task_id), status)
+        except Exception as e:
+            logger.error(f"Error handling task change event: {e}")
+
+    async def start_watching(self, collection=None):
+        """
+        开始监听任务完成事件
+
+        Args:
+            collection: Motor 集合（tasks），为 None 时直接使用本地变更流
+        """
+        if self._watch_task is not None:
+            return
+        if collection is not None:
+            try:
+                self._stream = await self._open_stream(collection)
+                self._collection = collection
+                logger.info("Watching task completions via MongoDB change stream")
+            except OperationFailure as e:
+                logger.warning(f"MongoDB change stream unavailable ({e}), using local task change stream")
+            except Exception as e:
+                logger.error(f"Failed to open MongoDB change stream: {e}, using local task change stream")
+        if self._stream is None:
+            self.local_stream = LocalTaskChangeStream()
+            self._stream = self.local_stream
+        self._watch_task = asyncio.create_task(self._watch_loop())
+
+    async def _open_stream(self, collection):
+        """
+        打开 Change Stream 并读取一次，有 resume token 时从该位置继续。
+        第一次读取时才会真正建立 Change Stream，单机 mongod 会在这里抛出 OperationFailure；
+        读取失败时关闭已打开的流再抛出异常。
+        """
+        stream = collection.watch(self._pipeline(), resume_after=self._resume_token)
+        try:
+            first_change = await stream.try_next()
+        except BaseException:
+            await self._close_stream(stream)
+            raise
+        if first_change:
+            self._handle_change(first_change)
+        self._remember_position(stream)
+        return stream
+
+    def _remember_position(self, stream):
+        """记录最后处理位置的 resume token"""
+        token = getattr(stream, "resume_token", None)
+        if token is not None:
+            self._resume_token = token
+
+    @staticmethod
+    async def _close_stream(stream):
+        try:
+            await stream.close()
+        except Exception as e:
+            logger.warning(f"Error closing task change stream: {e}")
+
+    async def _consume(self):
+        """消费当前变更流，直到流结束或出错"""
+        async for change in self._stream:
+            self._handle_change(change)
+            if self._collection is not None:
+                self._remember_position(self._stream)
+
+    async def _watch_loop(self):
+        """持续消费变更流，MongoDB Change Stream 中断后按退避时间重新打开"""
+        delay = RECONNECT_DELAY_INITIAL
+        while True:
+            try:
+                await self._consume()
+                if self._collection is None:
+                    return
+                logger.warning("Task change stream closed by server, reopening")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self._collection is None:
+                    logger.error(f"Task change stream stopped unexpectedly: {e}")
+                    return
+                logger.error(f"Task change stream interrupted: {e}, reopening in {delay:.0f}s")
+            await self._close_stream(self._stream)
+
+            while True:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_DELAY_MAX)
+                try:
+                    self._stream = await self._open_stream(self._collection)
+                    logger.info("Task change stream reopened")
+                    delay = RECONNECT_DELAY_INITIAL
+                    break
+                except OperationFailure as e:
+                    # resume token 已超出 oplog 范围等情况下无法继续，从当前位置重新开始
+                    if self._resume_token is not None:
+                        logger.warning(f"Cannot resume task change stream ({e}), restarting from now")
+                        self._resume_token = None
+                    else:
+                        logger.error(f"Failed to reopen task change stream: {e}, retrying in {delay:.0f}s")
+                except Exception as e:
+                    logger.error(f"Failed to reopen task change stream: {e}, retrying in {delay:.0f}s")
+
+    async def stop_watching(self):
+        """停止监听"""
+        # 先停止监听任务，再关闭变更流，避免关闭引起的异常触发重连
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except (asyncio.CancelledError, Exception):
+                pass
+        if self._stream is not None:
+            await self._close_stream(self._stream)
+        self._watch_task = None
+        self._collection = None
+        self._resume_token = None
+        self._stream = None
+        self.local_stream = None
+
+
+# 全局通知器实例
+task_notifier = TaskCompletionNotifier()
@@ -0,0 +1,131 @@
+"""
+论文文本缓存
+将 PDF 提取出的文本以 gzip 压缩文件保存在本地磁盘，按源文件指纹（路径、大小、修改时间）寻址，
+源文件变化后自动使用新的缓存项。缓存总大小超过上限时按最近使用时间淘汰。
+缓存在首次下载时边提取边写入，也可以在导入论文时预先生成。
+"""
+
+import os
+import gzip
+import hashlib
+import logging
+import time
+import tempfile
+import threading
+from typing import Iterator, Optional
+
+from config import config
+from utils.disk_cache import evict_lru_files
+
+logger = logging.getLogger(__name__)
+
+# 两次完整扫描缓存目录的最长间隔（秒），用于计入其他进程写入的缓存
+EVICT_SCAN_INTERVAL = 300
+# 超过上限时淘汰到上限的这个比例，留出余量避免每次写入都触发扫描
+EVICT_TARGET_RATIO = 0.9
+
+
+class TextCache:
+    """基于磁盘的 PDF 文本缓存"""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.cache_dir = cache_dir or config.TEXT_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else config.TEXT_CACHE_MAX_MB * 1024 * 1024
+        self._evict_lock = threading.Lock()
+        # 上次扫描得到的缓存总大小加上之后本进程写入的大小，None 表示尚未扫描
+        self._approx_bytes: Optional[int] = None
+        self._last_scan = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(file_path: str) -> str:
+        """源文件指纹：路径 + 大小 + 修改时间"""
+        stat = os.stat(file_path)
+        raw = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.txt.gz")
+
+    def lookup(self, file_path: str) -> Optional[str]:
+        """
+        查找源文件对应的缓存文件，命中时更新其修改时间作为最近使用时间
+
+        Returns:
+            缓存文件路径，未命中返回 None
+        """
+        entry = self._entry_path(self.fingerprint(file_path))
+        try:
+            os.utime(entry)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def tee(self, file_path: str, pages: Iterator[str]) -> Iterator[str]:
+        """
+        包装页面迭代器：原样返回每页文本，同时写入压缩的临时文件，
+        全部页面写完后原子替换为缓存文件；中途失败或被中断时丢弃临时文件。
+        """
+        entry = self._entry_path(self.fingerprint(file_path))
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(entry), suffix=".tmp")
+        completed = False
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as gz:
+                for text in pages:
+                    gz.write(text.encode("utf-8"))
+                    yield text
+            os.replace(tmp_path, entry)
+            completed = True
+            logger.debug(f"Cached extracted text for {file_path}")
+        finally:
+            close = getattr(pages, "close", None)
+            if close:
+                close()
+            if not completed and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._added(os.path.getsize(entry))
+
+    def _added(self, size: int):
+        """记录新写入的缓存项，估算总大小超过上限或距上次扫描过久时才扫描目录淘汰"""
+        with self._evict_lock:
+            if self._approx_bytes is not None:
+                self._approx_bytes += size
+            due = (self._approx_bytes is None or self._approx_bytes > self.max_bytes
+                   or time.monotonic() - self._last_scan >= EVICT_SCAN_INTERVAL)
+        if due:
+            self.evict()
+
+    def iter_decompressed(self, entry: str, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """读取缓存文件并解压，供不支持 gzip 的客户端使用"""
+        with gzip.open(entry, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def evict(self):
+        """缓存总大小超过上限时，按最近使用时间从旧到新删除"""
+        with self._evict_lock:
+            self._approx_bytes = evict_lru_files(
+                self.cache_dir, self.max_bytes, (".txt.gz",), int(self.max_bytes * EVICT_TARGET_RATIO)
+            )
+            self._last_scan = time.monotonic()
+
+    async def warm(self, file_path: str):
+        """预先提取文本并写入缓存（已缓存时跳过）"""
+        from services.async_fs import async_fs
+        from services.pdf_text_service import pdf_text_service
+
+        if await async_fs.run(self.lookup, file_path):
+            return
+        async for _ in pdf_text_service.iter_pages(file_path, wrap=lambda pages: self.tee(file_path, pages)):
+            pass
+
+
+# 全局文本缓存实例
+text_cache = TextCache()
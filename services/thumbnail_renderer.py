@@ -0,0 +1,106 @@
+"""
+缩略图渲染（在子进程中执行）
+用 PyMuPDF 渲染论文首页缩略图和公式区域截图，安装了 Pillow 时编码为 WebP，否则为 PNG。
+图片按内容哈希命名写入缓存目录，相同内容只保存一份，父进程只需要拿到文件名。
+"""
+
+import io
+import os
+import hashlib
+import tempfile
+from typing import List, Optional, Sequence, Tuple
+
+THUMBNAIL_SUFFIXES = (".webp", ".png")
+
+# 公式截图的缩放倍数和四周留白（PDF 坐标单位）
+FORMULA_ZOOM = 2.0
+FORMULA_PADDING = 2.0
+
+
+def image_path(cache_dir: str, name: str) -> str:
+    """缓存文件路径：按哈希前两位分目录"""
+    return os.path.join(cache_dir, name[:2], name)
+
+
+def _encode(pix) -> Tuple[bytes, str]:
+    """将 Pixmap 编码为 WebP（需要 Pillow）或 PNG"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return pix.tobytes("png"), ".png"
+    mode = "RGBA" if pix.alpha else "RGB"
+    image = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+    buffer = io.BytesIO()
+    image.save(buffer, "WEBP", quality=80, method=4)
+    return buffer.getvalue(), ".webp"
+
+
+def store_image(data: bytes, ext: str, cache_dir: str) -> str:
+    """按内容哈希写入缓存（已存在时跳过），返回文件名"""
+    name = hashlib.sha256(data).hexdigest() + ext
+    path = image_path(cache_dir, name)
+    if os.path.exists(path):
+        return name
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return name
+
+
+def render_page_thumbnail(page, width: int, cache_dir: str) -> str:
+    """渲染页面缩略图，宽度缩放到 width 像素"""
+    import fitz  # PyMuPDF
+
+    scale = width / page.rect.width if page.rect.width else 1.0
+    pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+    data, ext = _encode(pix)
+    return store_image(data, ext, cache_dir)
+
+
+def render_region(page, bbox: Sequence[float], cache_dir: str) -> str:
+    """渲染页面中的矩形区域（如公式）"""
+    import fitz  # PyMuPDF
+
+    x0, y0, x1, y1 = bbox
+    clip = fitz.Rect(x0 - FORMULA_PADDING, y0 - FORMULA_PADDING, x1 + FORMULA_PADDING, y1 + FORMULA_PADDING) & page.rect
+    pix = page.get_pixmap(matrix=fitz.Matrix(FORMULA_ZOOM, FORMULA_ZOOM), clip=clip, alpha=False)
+    data, ext = _encode(pix)
+    return store_image(data, ext, cache_dir)
+
+
+def render_images(file_path: str, cache_dir: str, width: int, page_thumbnail: bool = True,
+                  regions: Optional[List[Tuple[int, Sequence[float]]]] = None) -> dict:
+    """
+    渲染一篇论文的首页缩略图和指定区域截图（供按需重新生成使用）
+
+    Args:
+        file_path: PDF 文件路径
+        cache_dir: 缓存目录
+        width: 缩略图宽度
+        page_thumbnail: 是否渲染首页缩略图
+        regions: [(页码(从1开始), bbox)]
+
+    Returns:
+        {"page": 缩略图文件名或 None, "regions": [文件名或 None]}
+    """
+    import fitz  # PyMuPDF
+
+    result = {"page": None, "regions": []}
+    doc = fitz.open(file_path)
+    try:
+        if page_thumbnail and doc.page_count:
+            result["page"] = render_page_thumbnail(doc.load_page(0), width, cache_dir)
+        for page_number, bbox in regions or []:
+            if 1 <= page_number <= doc.page_count:
+                result["regions"].append(render_region(doc.load_page(page_number - 1), bbox, cache_dir))
+            else:
+                result["regions"].append(None)
+    finally:
+        doc.close()
+    return result
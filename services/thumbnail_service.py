@@ -0,0 +1,71 @@
+"""
+缩略图服务
+论文首页缩略图和公式截图在特征提取阶段由子进程渲染，按内容哈希保存在本地磁盘缓存中，
+文档中只保存图片 URL。缓存超过上限时按最近使用时间淘汰，被淘汰的图片在下次访问时重新渲染。
+"""
+
+import os
+import re
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from config import config
+from services.thumbnail_renderer import THUMBNAIL_SUFFIXES, image_path, render_images
+from utils.disk_cache import evict_lru_files
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_KINDS = ("papers", "formulas")
+_NAME_PATTERN = re.compile(r"^[0-9a-f]{64}\.(webp|png)$")
+
+
+class ThumbnailService:
+    """缩略图缓存与按需渲染"""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None, width: Optional[int] = None):
+        self.cache_dir = cache_dir or config.THUMBNAIL_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else config.THUMBNAIL_CACHE_MAX_MB * 1024 * 1024
+        self.width = width or config.THUMBNAIL_WIDTH
+        self._evict_lock = threading.Lock()
+
+    def render_options(self) -> Dict[str, Any]:
+        """传给特征提取子进程的渲染参数"""
+        return {"cache_dir": self.cache_dir, "width": self.width}
+
+    @staticmethod
+    def url(kind: str, doc_id: str, name: Optional[str]) -> Optional[str]:
+        """图片 URL，包含文档ID以便缓存被淘汰后重新渲染"""
+        return f"/thumbnails/{kind}/{doc_id}/{name}" if name else None
+
+    @staticmethod
+    def is_valid_name(name: str) -> bool:
+        return bool(_NAME_PATTERN.match(name))
+
+    def lookup(self, name: str) -> Optional[str]:
+        """查找缓存图片，命中时更新修改时间作为最近使用时间（同步实现）"""
+        path = image_path(self.cache_dir, name)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def evict(self):
+        """缓存总大小超过上限时按最近使用时间淘汰（同步实现）"""
+        with self._evict_lock:
+            evict_lru_files(self.cache_dir, self.max_bytes, THUMBNAIL_SUFFIXES)
+
+    async def render(self, file_path: str, page_thumbnail: bool = True, regions=None) -> Dict[str, Any]:
+        """在特征提取进程池中重新渲染缩略图或区域截图"""
+        from services.pdf_feature_service import pdf_feature_service
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            pdf_feature_service.executor, render_images, file_path, self.cache_dir, self.width, page_thumbnail, regions
+        )
+
+
+# 全局缩略图服务实例
+thumbnail_service = ThumbnailService()
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from concurrent.futures import Executor
+from typing import AsyncIterator, Callable, Iterator, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+async def iterate_in_thread(factory: Callable[[], Iterator[T]], executor: Executor,
+                            maxsize: int = 4) -> AsyncIterator[T]:
+    """
+    在线程池中运行同步生成器，并以异步迭代器的形式逐项返回结果。
+    队列有界：消费方处理慢时生产线程阻塞等待（背压）；消费方提前退出（如客户端断开）时通知生产线程停止。
+
+    Args:
+        factory: 返回同步迭代器的函数，在工作线程中调用
+        executor: 执行生产者的线程池
+        maxsize: 缓冲队列的最大长度
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        """在工作线程中放入队列，队列满时等待；返回 False 表示消费方已停止"""
+        future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while True:
+            try:
+                future.result(timeout=0.1)
+                return True
+            except concurrent.futures.TimeoutError:
+                if stop.is_set():
+                    future.cancel()
+                    return False
+
+    def produce():
+        try:
+            iterator = factory()
+            try:
+                for item in iterator:
+                    if stop.is_set() or not put((item, None)):
+                        return
+            finally:
+                close = getattr(iterator, "close", None)
+                if close:
+                    close()
+            put((_DONE, None))
+        except Exception as e:
+            if not stop.is_set():
+                put((_DONE, e))
+
+    producer = loop.run_in_executor(executor, produce)
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                break
+            yield item
+    finally:
+        stop.set()
+        # 等待生产线程退出，保证文件句柄等资源已释放
+        try:
+            await producer
+        except Exception as e:
+            logger.debug(f"Producer thread exited with error: {e}")
+
+
+def _resolve(future: asyncio.Future, result=None, error: BaseException = None):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+def pool_apply(pool, func: Callable[..., T], *args) -> "asyncio.Future[T]":
+    """
+    向 multiprocessing 进程池提交任务，返回可以 await 的 Future（需在事件循环中调用）。
+    结果由进程池的结果线程通过回调送回事件循环，等待期间不占用任何线程池的线程。
+
+    Args:
+        pool: multiprocessing.Pool
+        func: 在子进程中执行的函数（需可 pickle）
+        args: 函数参数
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    pool.apply_async(
+        func, args,
+        callback=lambda result: loop.call_soon_threadsafe(_resolve, future, result),
+        error_callback=lambda error: loop.call_soon_threadsafe(_resolve, future, None, error)
+    )
+    return future
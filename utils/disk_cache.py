@@ -0,0 +1,56 @@
+import os
+import logging
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def evict_lru_files(cache_dir: str, max_bytes: int, suffixes: Tuple[str, ...],
+                    target_bytes: Optional[int] = None) -> int:
+    """
+    按最近使用时间（文件修改时间）淘汰缓存文件，直到总大小不超过上限。
+    缓存目录结构为 cache_dir/<两位前缀>/<文件>。
+
+    Args:
+        cache_dir: 缓存根目录
+        max_bytes: 总大小上限（字节），超过时开始淘汰
+        suffixes: 参与统计和淘汰的文件后缀
+        target_bytes: 淘汰到的目标大小，默认等于 max_bytes；
+            设得更低可以留出余量，之后多次写入才会再次超过上限
+
+    Returns:
+        淘汰后缓存文件的总大小（字节）
+    """
+    entries = []
+    total = 0
+    try:
+        with os.scandir(cache_dir) as shards:
+            for shard in shards:
+                if not shard.is_dir():
+                    continue
+                with os.scandir(shard.path) as files:
+                    for f in files:
+                        if f.name.endswith(suffixes):
+                            stat = f.stat()
+                            entries.append((stat.st_mtime, stat.st_size, f.path))
+                            total += stat.st_size
+    except FileNotFoundError:
+        return 0
+    if total <= max_bytes:
+        return total
+
+    if target_bytes is None:
+        target_bytes = max_bytes
+    entries.sort()
+    removed = 0
+    for _, size, path in entries:
+        if total <= target_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+            removed += 1
+        except OSError:
+            continue
+    logger.info(f"Evicted {removed} files from {cache_dir}, {total} bytes remaining")
+    return total
@@ -0,0 +1,156 @@
+import os
+import logging
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Iterator, Mapping, Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from services.async_fs import async_fs
+from utils.async_iter import iterate_in_thread
+
+logger = logging.getLogger(__name__)
+
+RANGE_CHUNK_SIZE = 64 * 1024
+
+
+def content_disposition(filename: str, disposition_type: str = "attachment") -> str:
+    """生成 Content-Disposition 头，非 ASCII 文件名按 RFC 5987 编码"""
+    quoted = quote(filename)
+    if quoted == filename:
+        return f'{disposition_type}; filename="{filename}"'
+    fallback = filename.encode("ascii", "ignore").decode("ascii").strip() or "download"
+    return f"{disposition_type}; filename=\"{fallback}\"; filename*=UTF-8''{quoted}"
+
+
+def make_etag(stat_result: os.stat_result) -> str:
+    """由文件大小和修改时间生成 ETag"""
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match / If-Range 的弱比较"""
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def _not_modified_since(header: str, stat_result: os.stat_result) -> bool:
+    try:
+        since = parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(stat_result.st_mtime) <= since
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析单个字节范围
+
+    Returns:
+        (起始位置, 结束位置)，结束位置包含在内；范围无法满足时返回 None
+
+    Raises:
+        ValueError: 格式不支持（如多个范围），调用方应忽略 Range 返回完整内容
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        raise ValueError(f"Unsupported range: {header}")
+    start_str, sep, end_str = spec.strip().partition("-")
+    if not sep:
+        raise ValueError(f"Invalid range: {header}")
+    if not start_str:
+        # 后缀范围：最后 N 个字节
+        suffix = int(end_str)
+        if suffix <= 0 or size == 0:
+            return None
+        return max(size - suffix, 0), size - 1
+    start = int(start_str)
+    if end_str and int(end_str) < start:
+        raise ValueError(f"Invalid range: {header}")
+    if start >= size:
+        return None
+    end = int(end_str) if end_str else size - 1
+    return start, min(end, size - 1)
+
+
+def _iter_file_range(path: str, start: int, length: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def ranged_file_response(request: Request, path: str, stat_result: os.stat_result, media_type: str,
+                         filename: Optional[str] = None, headers: Optional[Mapping[str, str]] = None) -> Response:
+    """
+    返回支持条件请求和字节范围请求的文件响应：
+    - If-None-Match / If-Modified-Since 命中时返回 304
+    - 单个 Range 返回 206，范围无法满足时返回 416；If-Range 不匹配时返回完整文件
+    - 其他情况返回完整文件
+
+    Args:
+        request: 当前请求
+        path: 文件路径
+        stat_result: 文件的 os.stat 结果
+        media_type: 内容类型
+        filename: 下载文件名
+        headers: 附加响应头
+    """
+    etag = make_etag(stat_result)
+    validators = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Cache-Control": "private, no-cache",
+        "Accept-Ranges": "bytes",
+    }
+    response_headers = {**(headers or {}), **validators}
+    if filename:
+        response_headers["Content-Disposition"] = content_disposition(filename)
+
+    # 条件请求：If-None-Match 优先于 If-Modified-Since
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=validators)
+    elif request.headers.get("if-modified-since") and _not_modified_since(request.headers["if-modified-since"], stat_result):
+        return Response(status_code=304, headers=validators)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and if_range:
+        # If-Range 可以是 ETag 或日期，不匹配时忽略 Range
+        if if_range.strip().startswith(('"', "W/")):
+            if if_range.strip() != etag:
+                range_header = None
+        elif not _not_modified_since(if_range, stat_result):
+            range_header = None
+
+    if range_header:
+        size = stat_result.st_size
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError as e:
+            logger.debug(f"Ignoring range header: {e}")
+        else:
+            if byte_range is None:
+                return Response(status_code=416, headers={**validators, "Content-Range": f"bytes */{size}"})
+            start, end = byte_range
+            length = end - start + 1
+            response_headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response_headers["Content-Length"] = str(length)
+            return StreamingResponse(
+                iterate_in_thread(lambda: _iter_file_range(path, start, length), async_fs.executor),
+                status_code=206,
+                media_type=media_type,
+                headers=response_headers
+            )
+
+    return FileResponse(path=path, media_type=media_type, stat_result=stat_result, headers=response_headers)
@@ -0,0 +1,97 @@
+"""
+导入耗时分析
+在子进程中以 python -X importtime 导入指定模块，汇总耗时最多的模块和顶层包，用于排查冷启动慢的原因。
+
+用法:
+    python -m utils.import_profiler              # 分析 main
+    python -m utils.import_profiler main --top 30
+"""
+
+import os
+import re
+import sys
+import argparse
+import subprocess
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@dataclass
+class ImportRecord:
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(output: str) -> List[ImportRecord]:
+    """解析 -X importtime 的输出"""
+    records = []
+    for line in output.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            records.append(ImportRecord(name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return records
+
+
+def summarize(records: List[ImportRecord], top: int = 20) -> Dict[str, Any]:
+    """汇总：总耗时、累计耗时最多的模块、按顶层包合计的自身耗时"""
+    packages: Dict[str, int] = defaultdict(int)
+    for record in records:
+        packages[record.name.split(".")[0]] += record.self_us
+    total_us = sum(record.self_us for record in records)
+    slowest = sorted(records, key=lambda r: r.cumulative_us, reverse=True)[:top]
+    return {
+        "total_seconds": round(total_us / 1e6, 3),
+        "module_count": len(records),
+        "modules": [
+            {"name": r.name, "cumulative_ms": round(r.cumulative_us / 1000, 1), "self_ms": round(r.self_us / 1000, 1)}
+            for r in slowest
+        ],
+        "packages": [
+            {"name": name, "self_ms": round(us / 1000, 1)}
+            for name, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        ]
+    }
+
+
+def profile_imports(module: str = "main", top: int = 20, timeout: float = 120) -> Dict[str, Any]:
+    """在子进程中导入模块并汇总导入耗时"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=_ROOT_DIR,
+        capture_output=True,
+        text=True,
+        timeout=timeout
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Failed to import {module}: {result.stderr.strip().splitlines()[-1:]}")
+    report = summarize(parse_importtime(result.stderr), top)
+    report["module"] = module
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """格式化为便于阅读的文本"""
+    lines = [
+        f"Import profile for '{report.get('module', '?')}': "
+        f"{report['total_seconds']:.3f}s across {report['module_count']} modules",
+        "Slowest modules (cumulative / self ms):"
+    ]
+    lines += [f"  {m['cumulative_ms']:>9.1f} {m['self_ms']:>9.1f}  {m['name']}" for m in report["modules"]]
+    lines.append("Top-level packages (self ms):")
+    lines += [f"  {p['self_ms']:>9.1f}  {p['name']}" for p in report["packages"]]
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="汇总模块导入耗时")
+    parser.add_argument("module", nargs="?", default="main")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+    print(format_report(profile_imports(args.module, args.top)))
@@ -0,0 +1,73 @@
+import re
+import random
+import hashlib
+from typing import List, Optional, Sequence
+
+# 梅森素数 2^61-1，哈希值小于 2^63，可直接存入 MongoDB 的 int64
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = _MERSENNE_PRIME - 1
+
+_NON_WORD = re.compile(r"[^\w]+", re.UNICODE)
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """归一化文本：小写，去掉标点，合并空白"""
+    text = _NON_WORD.sub(" ", text.lower())
+    return _SPACES.sub(" ", text).strip()
+
+
+def shingles(text: str, k: int = 5) -> set:
+    """字符 k-gram 集合，对中英文都适用"""
+    text = normalize_text(text)
+    if len(text) < k:
+        return set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class MinHasher:
+    """
+    MinHash 签名与 LSH 分桶
+    num_perm 个哈希函数 h(x) = (a*x + b) mod p，签名按 bands 段切分，每段哈希为一个桶键，
+    两份文本只要有一段完全相同就会成为候选，再用签名估计的 Jaccard 相似度确认。
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 16, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm 必须是 bands 的整数倍")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = random.Random(seed)
+        self._params = [(rng.randint(1, _MAX_HASH), rng.randint(0, _MAX_HASH)) for _ in range(num_perm)]
+
+    def signature(self, text: str, k: int = 5) -> Optional[List[int]]:
+        """计算文本的 MinHash 签名，文本过短时返回 None"""
+        hashes = [_hash64(s) % _MERSENNE_PRIME for s in shingles(text, k)]
+        if not hashes:
+            return None
+        return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._params]
+
+    def band_keys(self, signature: Sequence[int]) -> List[str]:
+        """签名的 LSH 桶键，键中包含段号，不同段之间不会冲突"""
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(repr(tuple(rows)).encode("ascii"), digest_size=8).hexdigest()
+            keys.append(f"{band}:{digest}")
+        return keys
+
+    @staticmethod
+    def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+        """由签名估计的 Jaccard 相似度"""
+        if not a or len(a) != len(b):
+            return 0.0
+        return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+    def threshold(self) -> float:
+        """LSH 的近似相似度阈值 (1/b)^(1/r)，高于该值的文本大概率成为候选"""
+        return (1 / self.bands) ** (1 / self.rows)
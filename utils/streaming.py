@@ -0,0 +1,39 @@
+import io
+from typing import List
+
+
+class ChunkSink(io.RawIOBase):
+    """
+    只写、不可 seek 的内存输出流。写入方（如 zipfile、ParquetWriter）写入的字节暂存在内存中，
+    由调用方定期 drain 取出并发送，避免整个文件留在内存中。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self._pending = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        self._pending += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    @property
+    def pending(self) -> int:
+        """尚未取出的字节数"""
+        return self._pending
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        self._pending = 0
+        return data